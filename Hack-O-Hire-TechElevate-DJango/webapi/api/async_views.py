@@ -0,0 +1,128 @@
+import json
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+import structlog
+
+from .models import Product
+from .cache import aget_product, aget_product_page, ainvalidate_product
+from .views import clean_product_fields
+from .queries import parse_list_params, product_list_queryset, encode_cursor, list_cache_key
+from .middleware import log_request_body
+
+# Async counterparts of api.views for ASGI deployments: the ORM and cache
+# calls are awaited, so a worker serves other requests while one waits on
+# the database. Validation and responses match the sync views.
+
+logger = structlog.get_logger(__name__)
+
+
+def async_csrf_exempt(view):
+    # django.views.decorators.csrf.csrf_exempt wraps views in a sync
+    # function before Django 5.0, which would hide the coroutine
+    view.csrf_exempt = True
+    return view
+
+
+def parse_json(request):
+    return json.loads(request.body.decode("utf-8"))
+
+
+async def stream_ndjson(rows):
+    async for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + "\n"
+
+
+# Create Product
+@async_csrf_exempt
+async def create_product(request):
+    if request.method != "POST":
+        logger.warning("Invalid request method", method=request.method)
+        return JsonResponse({"error": "Invalid request method"}, status=405)
+    log_request_body(logger, request)
+    try:
+        fields = clean_product_fields(parse_json(request))
+    except json.JSONDecodeError:
+        logger.error("Invalid JSON format", error="JSONDecodeError")
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+    except ValidationError as e:
+        logger.error("Invalid product data", error=e.messages)
+        return JsonResponse({"error": e.messages}, status=400)
+
+    product = await Product.objects.acreate(**fields)
+    logger.info("Product created", product_id=product.id)
+    return JsonResponse({"message": "Product created", "id": product.id}, status=201)
+
+
+# List Products
+async def list_products(request):
+    """Async list_products: same ordering, filter, cursor, fields and NDJSON parameters"""
+    try:
+        query = parse_list_params(request.GET)
+    except ValueError as e:
+        logger.warning("Invalid product list parameters", error=str(e))
+        return JsonResponse({"error": str(e)}, status=400)
+
+    products = product_list_queryset(query)
+    limit = query["limit"]
+
+    if request.GET.get("format") == "ndjson":
+        logger.info("Streaming Product List", order=query["order"], fields=query["fields"])
+        rows = products.aiterator(chunk_size=settings.PRODUCT_STREAM_CHUNK_SIZE)
+        return StreamingHttpResponse(stream_ndjson(rows), content_type="application/x-ndjson")
+
+    async def load():
+        return [row async for row in products[:limit + 1]]
+
+    page = await aget_product_page(list_cache_key(query), load)
+    response = JsonResponse(page[:limit], safe=False)
+    if len(page) > limit:
+        response["X-Next-Cursor"] = encode_cursor(page[limit - 1], query["order"])
+    logger.info("Retrieved Product List", order=query["order"], count=min(len(page), limit))
+    return response
+
+
+# Retrieve Product
+async def product_detail(request, product_id):
+    product = await aget_product(product_id)
+    if product is None:
+        logger.warning("Product not found", product_id=product_id)
+        return JsonResponse({"error": "Product not found"}, status=404)
+    logger.info("Fetching product details", product_id=product["id"])
+    return JsonResponse(product, status=200)
+
+
+# Update Product
+@async_csrf_exempt
+async def update_product(request, product_id):
+    log_request_body(logger, request)
+    try:
+        fields = clean_product_fields(parse_json(request), partial=True)
+    except json.JSONDecodeError:
+        logger.error("Invalid JSON format", error="JSONDecodeError")
+        return JsonResponse({"error": "Invalid JSON format"}, status=400)
+    except ValidationError as e:
+        logger.error("Invalid product data", error=e.messages)
+        return JsonResponse({"error": e.messages}, status=400)
+
+    updated = await Product.objects.filter(id=product_id).aupdate(updated_at=timezone.now(), **fields)
+    if not updated:
+        return JsonResponse({"error": "Product not found"}, status=404)
+    await ainvalidate_product(product_id)
+
+    logger.info("Product updated", product_id=product_id, fields=sorted(fields))
+    return JsonResponse({"message": "Product updated!", "id": product_id}, status=200)
+
+
+# Delete Product
+@async_csrf_exempt
+async def delete_product(request, product_id):
+    product = await Product.objects.filter(id=product_id).afirst()
+    if product is None:
+        return JsonResponse({"error": "Product not found"}, status=404)
+
+    logger.info("Deleting product", product_id=product.id)
+    await product.adelete()  # post_delete invalidates the cache
+    return JsonResponse({"message": "Product deleted successfully!"}, status=200)
@@ -0,0 +1,143 @@
+from django.conf import settings
+from django.core.cache import caches
+from prometheus_client import Counter
+
+from .models import Product
+
+# Exported on /metrics/ through django_prometheus, which serves the default registry
+CACHE_HITS = Counter("product_cache_hits_total", "Product cache hits", ["kind"])
+CACHE_MISSES = Counter("product_cache_misses_total", "Product cache misses", ["kind"])
+
+LIST_VERSION_KEY = "products:list:version"
+
+
+def get_cache():
+    return caches[settings.PRODUCT_CACHE_ALIAS]
+
+
+def serialize_product(product):
+    return {
+        "id": product.id,
+        "name": product.name,
+        "description": product.description,
+        "price": str(product.price),  # Convert Decimal to string for JSON
+        "created_at": product.created_at.strftime("%Y-%m-%d %H:%M:%S"),
+        "updated_at": product.updated_at.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def detail_key(product_id):
+    return f"products:detail:{product_id}"
+
+
+def get_product(product_id):
+    """Serialized product, read through the cache; None if it does not exist"""
+    cache = get_cache()
+    data = cache.get(detail_key(product_id))
+    if data is not None:
+        CACHE_HITS.labels("detail").inc()
+        return data
+    CACHE_MISSES.labels("detail").inc()
+
+    product = Product.objects.filter(id=product_id).first()
+    if product is None:
+        return None
+    data = serialize_product(product)
+    cache.set(detail_key(product_id), data, settings.PRODUCT_CACHE_TIMEOUT)
+    return data
+
+
+def list_version():
+    cache = get_cache()
+    version = cache.get(LIST_VERSION_KEY)
+    if version is None:
+        cache.add(LIST_VERSION_KEY, 1, None)
+        version = cache.get(LIST_VERSION_KEY, 1)
+    return version
+
+
+def get_product_page(query_key, load):
+    """A list_products page, read through the cache.
+
+    Page keys embed a list version that every write bumps, so one write
+    retires all cached pages without having to find them.
+    """
+    cache = get_cache()
+    key = f"products:list:{list_version()}:{query_key}"
+    page = cache.get(key)
+    if page is not None:
+        CACHE_HITS.labels("list").inc()
+        return page
+    CACHE_MISSES.labels("list").inc()
+
+    page = load()
+    cache.set(key, page, settings.PRODUCT_CACHE_TIMEOUT)
+    return page
+
+
+def invalidate_product(product_id=None):
+    """Drop a product's detail entry (if given) and retire every cached list page"""
+    cache = get_cache()
+    if product_id is not None:
+        cache.delete(detail_key(product_id))
+    try:
+        cache.incr(LIST_VERSION_KEY)
+    except ValueError:
+        cache.add(LIST_VERSION_KEY, 1, None)
+
+
+def invalidate_products(product_ids):
+    """invalidate_product for many ids: one delete_many and one list version bump"""
+    get_cache().delete_many([detail_key(product_id) for product_id in product_ids])
+    invalidate_product()
+
+
+# Async variants for api.async_views, on the cache's a* methods and the async ORM
+
+async def aget_product(product_id):
+    cache = get_cache()
+    data = await cache.aget(detail_key(product_id))
+    if data is not None:
+        CACHE_HITS.labels("detail").inc()
+        return data
+    CACHE_MISSES.labels("detail").inc()
+
+    product = await Product.objects.filter(id=product_id).afirst()
+    if product is None:
+        return None
+    data = serialize_product(product)
+    await cache.aset(detail_key(product_id), data, settings.PRODUCT_CACHE_TIMEOUT)
+    return data
+
+
+async def alist_version():
+    cache = get_cache()
+    version = await cache.aget(LIST_VERSION_KEY)
+    if version is None:
+        await cache.aadd(LIST_VERSION_KEY, 1, None)
+        version = await cache.aget(LIST_VERSION_KEY, 1)
+    return version
+
+
+async def aget_product_page(query_key, aload):
+    cache = get_cache()
+    key = f"products:list:{await alist_version()}:{query_key}"
+    page = await cache.aget(key)
+    if page is not None:
+        CACHE_HITS.labels("list").inc()
+        return page
+    CACHE_MISSES.labels("list").inc()
+
+    page = await aload()
+    await cache.aset(key, page, settings.PRODUCT_CACHE_TIMEOUT)
+    return page
+
+
+async def ainvalidate_product(product_id=None):
+    cache = get_cache()
+    if product_id is not None:
+        await cache.adelete(detail_key(product_id))
+    try:
+        await cache.aincr(LIST_VERSION_KEY)
+    except ValueError:
+        await cache.aadd(LIST_VERSION_KEY, 1, None)
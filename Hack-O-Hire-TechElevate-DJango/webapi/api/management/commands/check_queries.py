@@ -0,0 +1,10 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = ("Run the product endpoint query checks (api.tests.ProductQueryTests): exact query "
+            "counts, and no query plan that falls back to a full table scan or a sort.")
+
+    def handle(self, *args, **options):
+        call_command("test", "api.tests.ProductQueryTests", verbosity=options["verbosity"])
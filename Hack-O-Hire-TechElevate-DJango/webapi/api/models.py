@@ -7,5 +7,16 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # One (field, id) index per list_products ordering and the name
+        # lookup: the trailing id serves the keyset cursor's tie-break, so
+        # filtered and ordered pages are index range scans without a sort
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="product_created_idx"),
+            models.Index(fields=["updated_at", "id"], name="product_updated_idx"),
+            models.Index(fields=["price", "id"], name="product_price_idx"),
+            models.Index(fields=["name", "id"], name="product_name_idx"),
+        ]
+
     def __str__(self):
         return self.name
\ No newline at end of file
@@ -0,0 +1,130 @@
+import json
+import base64
+import hashlib
+from decimal import Decimal, InvalidOperation
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from .models import Product
+
+PRODUCT_FIELDS = ("id", "name", "description", "price", "created_at", "updated_at")
+# Sort keys with a matching (field, id) index; see Product.Meta.indexes
+ORDERINGS = ("id", "created_at", "updated_at", "price")
+
+
+def parse_list_params(params):
+    """Validate the list_products query string; raises ValueError with a client message.
+
+    Returns a dict with after (cursor), limit, fields, order and filters.
+    """
+    order = params.get("order", "id")
+    if order.lstrip("-") not in ORDERINGS:
+        raise ValueError(f"order must be one of {', '.join(ORDERINGS)} (prefix - for descending)")
+
+    limit = params.get("limit", settings.PRODUCT_PAGE_SIZE)
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise ValueError("limit must be an integer")
+    if not 1 <= limit <= settings.PRODUCT_MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {settings.PRODUCT_MAX_PAGE_SIZE}")
+
+    fields = PRODUCT_FIELDS
+    if params.get("fields"):
+        fields = tuple(field.strip() for field in params["fields"].split(",") if field.strip())
+        unknown = set(fields) - set(PRODUCT_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    # The sort key and id make up the cursor, so they are always returned
+    required = ("id",) if order.lstrip("-") == "id" else ("id", order.lstrip("-"))
+    fields = required + tuple(field for field in fields if field not in required)
+
+    filters = {}
+    for name, lookup in (("min_price", "price__gte"), ("max_price", "price__lte")):
+        if params.get(name):
+            try:
+                filters[lookup] = Decimal(params[name])
+            except InvalidOperation:
+                raise ValueError(f"{name} must be a number")
+    if params.get("updated_since"):
+        updated_since = parse_datetime(params["updated_since"])
+        if updated_since is None:
+            raise ValueError("updated_since must be an ISO 8601 datetime")
+        filters["updated_at__gte"] = updated_since
+    if params.get("name"):
+        filters["name"] = params["name"]
+
+    return {
+        "after": decode_cursor(params.get("after"), order),
+        "limit": limit,
+        "fields": fields,
+        "order": order,
+        "filters": filters,
+    }
+
+
+def decode_cursor(cursor, order):
+    """Keyset position to continue after: a product id, or (sort value, id) for other orders"""
+    if cursor is None:
+        return None
+    if order.lstrip("-") == "id":
+        if not cursor.isdigit():
+            raise ValueError("after must be a product id")
+        return int(cursor)
+    try:
+        value, product_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        product_id = int(product_id)
+        # The sort value as product_list_queryset compares it: Decimal for price, datetime otherwise
+        if order.lstrip("-") == "price":
+            value = Decimal(value)
+            if not value.is_finite():
+                raise ValueError
+        else:
+            value = parse_datetime(value)
+            if value is None:
+                raise ValueError
+        return value, product_id
+    except (ValueError, TypeError, InvalidOperation):
+        raise ValueError("after must be the X-Next-Cursor of a previous page")
+
+
+def encode_cursor(row, order):
+    field = order.lstrip("-")
+    if field == "id":
+        return str(row["id"])
+    value = row[field]
+    value = value.isoformat() if hasattr(value, "isoformat") else str(value)
+    return base64.urlsafe_b64encode(json.dumps([value, row["id"]]).encode()).decode()
+
+
+def product_list_queryset(query):
+    """The list query: filters, keyset condition and ORDER BY (field, id) so an index serves it"""
+    field = query["order"].lstrip("-")
+    descending = query["order"].startswith("-")
+    products = Product.objects.filter(**query["filters"])
+
+    after = query["after"]
+    if after is not None:
+        if field == "id":
+            products = products.filter(**{"id__lt" if descending else "id__gt": after})
+        else:
+            value, product_id = after
+            op = "lt" if descending else "gt"
+            products = products.filter(
+                Q(**{f"{field}__{op}": value}) | Q(**{field: value, f"id__{op}": product_id})
+            )
+
+    ordering = ("-" if descending else "") + "id"
+    if field != "id":
+        ordering = (query["order"], ordering)
+    else:
+        ordering = (ordering,)
+    return products.order_by(*ordering).values(*query["fields"])
+
+
+def list_cache_key(query):
+    """Digest of the normalized query, safe for any cache backend's key rules"""
+    filters = ",".join(f"{name}={value}" for name, value in sorted(query["filters"].items()))
+    raw = f"{query['order']}:{query['after']}:{query['limit']}:{','.join(query['fields'])}:{filters}"
+    return hashlib.sha1(raw.encode()).hexdigest()
@@ -0,0 +1,16 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import invalidate_product
+from .models import Product
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_cache(sender, instance, **kwargs):
+    # After the commit: a read between an early invalidation and the commit would
+    # cache the old row again. Outside a transaction on_commit runs right away.
+    transaction.on_commit(partial(invalidate_product, instance.id))
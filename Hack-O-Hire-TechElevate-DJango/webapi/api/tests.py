@@ -0,0 +1,242 @@
+import json
+import base64
+import random
+from datetime import datetime
+from decimal import Decimal
+from django.core.cache import caches
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from .models import Product
+from .queries import decode_cursor, encode_cursor
+
+# A private cache, so tests never see or clear the configured one
+TEST_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "api-tests"}}
+
+
+def cursor_for(value, product_id):
+    return base64.urlsafe_b64encode(json.dumps([value, product_id]).encode()).decode()
+
+
+def explain(sql):
+    """Query plan lines of a statement on the product table, without running it"""
+    if Product._meta.db_table not in sql or not sql.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+        return []
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute("EXPLAIN QUERY PLAN " + sql)
+            return [row[-1] for row in cursor.fetchall()]
+        if connection.vendor == "mysql":
+            cursor.execute("EXPLAIN " + sql)
+            columns = [column[0] for column in cursor.description]
+            return [" ".join(f"{k}={v}" for k, v in zip(columns, row)) for row in cursor.fetchall()]
+    return []
+
+
+def plan_problem(sql, plan):
+    table = Product._meta.db_table
+    upper = sql.upper()
+    for line in plan:
+        if connection.vendor == "sqlite":
+            if "USE TEMP B-TREE FOR ORDER BY" in line:
+                return "sorts rows instead of reading an index in order"
+            # A bare SCAN reads the whole table; fine only for an unfiltered
+            # page read in rowid order that stops at its LIMIT
+            if line.startswith(f"SCAN {table}") and "USING" not in line:
+                if " WHERE " in upper or " LIMIT " not in upper:
+                    return "full table scan"
+        elif connection.vendor == "mysql":
+            if "type=ALL" in line and (" WHERE " in upper or " LIMIT " not in upper):
+                return "full table scan"
+            if "Using filesort" in line:
+                return "sorts rows instead of reading an index in order"
+    return None
+
+
+class DecodeCursorTests(SimpleTestCase):
+    def test_id_cursor(self):
+        self.assertEqual(decode_cursor("42", "id"), 42)
+        self.assertEqual(decode_cursor("42", "-id"), 42)
+        self.assertIsNone(decode_cursor(None, "price"))
+
+    def test_id_cursor_must_be_digits(self):
+        for cursor in ("", "-1", "4.2", "abc"):
+            with self.assertRaises(ValueError):
+                decode_cursor(cursor, "id")
+
+    def test_round_trip(self):
+        row = {"id": 7, "price": Decimal("12.50"), "updated_at": datetime(2026, 10, 18, 5, 19, 24)}
+        self.assertEqual(decode_cursor(encode_cursor(row, "price"), "price"), (Decimal("12.50"), 7))
+        self.assertEqual(decode_cursor(encode_cursor(row, "-updated_at"), "-updated_at"),
+                         (datetime(2026, 10, 18, 5, 19, 24), 7))
+
+    def test_malformed_cursor(self):
+        for cursor in ("not base64!", base64.urlsafe_b64encode(b"{}").decode(), cursor_for("1.00", "x")):
+            with self.assertRaises(ValueError):
+                decode_cursor(cursor, "price")
+
+    def test_bad_sort_value(self):
+        for value in ("abc", "NaN", "Infinity", None, [1]):
+            with self.assertRaises(ValueError):
+                decode_cursor(cursor_for(value, 1), "price")
+        for value in ("yesterday", "2026-13-45T00:00:00", 5, None):
+            with self.assertRaises(ValueError):
+                decode_cursor(cursor_for(value, 1), "updated_at")
+
+
+@override_settings(CACHES=TEST_CACHES, PRODUCT_CACHE_ALIAS="default")
+class ProductQueryTests(TestCase):
+    """Each product endpoint against a seeded table: an exact query count, and no
+    query plan that falls back to a full table scan or a sort.
+
+    Counts include the SAVEPOINT / RELEASE pairs that atomic blocks become
+    inside a test transaction.
+    """
+
+    PRODUCTS = 5000
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(0)
+        Product.objects.bulk_create(
+            [Product(name=f"product-{i}", description="seeded by api.tests",
+                     price=rng.randint(1, 99999) / 100) for i in range(cls.PRODUCTS)],
+            batch_size=1000
+        )
+        # updated_at is auto_now, so spread it out with a plain UPDATE
+        with connection.cursor() as cursor:
+            table = connection.ops.quote_name(Product._meta.db_table)
+            if connection.vendor == "sqlite":
+                cursor.execute(f"UPDATE {table} SET updated_at = datetime(updated_at, '-' || (id % 1000) || ' minutes')")
+                cursor.execute("ANALYZE")
+            elif connection.vendor == "mysql":
+                # No ANALYZE TABLE: it commits implicitly and would end the test transaction
+                cursor.execute(f"UPDATE {table} SET updated_at = updated_at - INTERVAL (id % 1000) MINUTE")
+        ids = list(Product.objects.order_by("id").values_list("id", flat=True))
+        cls.first, cls.second, cls.mid, cls.last = ids[0], ids[1], ids[len(ids) // 2], ids[-1]
+
+    def setUp(self):
+        caches["default"].clear()
+
+    def check_queries(self, queries, method, path, body=None):
+        with self.assertNumQueries(queries) as captured:
+            if method == "get":
+                response = self.client.get(path)
+            else:
+                data = json.dumps(body) if body is not None else ""
+                response = self.client.post(path, data=data, content_type="application/json")
+        self.assertLess(response.status_code, 400, response.content)
+        for query in captured.captured_queries:
+            plan = explain(query["sql"])
+            self.assertIsNone(plan_problem(query["sql"], plan), f"{query['sql']}\n" + "\n".join(plan))
+        return response
+
+    def test_list_first_page(self):
+        self.check_queries(1, "get", "/api/products/?limit=50")
+
+    def test_list_next_page(self):
+        self.check_queries(1, "get", f"/api/products/?limit=50&after={self.mid}")
+
+    def test_list_newest_updated(self):
+        response = self.check_queries(1, "get", "/api/products/?limit=50&order=-updated_at")
+        self.check_queries(1, "get", f"/api/products/?limit=50&order=-updated_at&after={response['X-Next-Cursor']}")
+
+    def test_list_updated_since(self):
+        since = Product.objects.order_by("-updated_at").values_list("updated_at", flat=True)[100]
+        self.check_queries(1, "get", f"/api/products/?order=updated_at&updated_since={since.isoformat()}"
+                           .replace("+", "%2B"))
+
+    def test_list_price_range(self):
+        response = self.check_queries(1, "get", "/api/products/?order=price&min_price=100&max_price=200&limit=10")
+        self.check_queries(1, "get", f"/api/products/?order=price&limit=10&after={response['X-Next-Cursor']}")
+
+    def test_list_by_name(self):
+        self.check_queries(1, "get", f"/api/products/?name=product-{self.mid}")
+
+    def test_list_bad_cursor(self):
+        response = self.client.get(f"/api/products/?order=price&after={cursor_for('abc', 1)}")
+        self.assertEqual(response.status_code, 400)
+
+    def test_detail(self):
+        self.check_queries(1, "get", f"/api/products/{self.mid}/")
+
+    def test_create(self):
+        self.check_queries(1, "post", "/api/products/create/", {"name": "check", "price": 10})
+
+    def test_update(self):
+        self.check_queries(1, "post", f"/api/products/{self.mid}/update/", {"price": 20})
+
+    def test_delete(self):
+        # get_object_or_404 and the DELETE; a single object needs no collector transaction
+        self.check_queries(2, "post", f"/api/products/{self.last}/delete/")
+
+    def test_bulk_create(self):
+        self.check_queries(3, "post", "/api/products/bulk/create/",
+                           [{"name": f"bulk-{i}", "price": i + 1} for i in range(50)])
+
+    def test_bulk_update(self):
+        # The id lookup and one UPDATE for the single set of changed fields
+        self.check_queries(4, "post", "/api/products/bulk/update/",
+                           [{"id": self.first, "price": 5}, {"id": self.mid, "price": 6}])
+
+    def test_bulk_delete(self):
+        # The id lookup, the delete collector's SELECT (post_delete receivers) and the DELETE
+        self.check_queries(5, "post", "/api/products/bulk/delete/", [self.first, self.second])
+
+
+@override_settings(CACHES=TEST_CACHES, PRODUCT_CACHE_ALIAS="default")
+class BulkEndpointTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Product.objects.bulk_create([Product(name=f"p{i}", price=i + 1) for i in range(3)])
+        cls.ids = list(Product.objects.order_by("id").values_list("id", flat=True))
+
+    def post(self, path, body):
+        response = self.client.post(path, data=json.dumps(body), content_type="application/json")
+        return response.status_code, json.loads(response.content)
+
+    def test_method_and_body_checks(self):
+        self.assertEqual(self.client.get("/api/products/bulk/create/").status_code, 405)
+        response = self.client.post("/api/products/bulk/create/", data="{", content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.post("/api/products/bulk/create/", {"items": []})[0], 400)
+        with self.settings(PRODUCT_BULK_MAX_ITEMS=2):
+            self.assertEqual(self.post("/api/products/bulk/delete/", [1, 2, 3])[0], 400)
+
+    def test_bulk_create_reports_invalid_items(self):
+        status, body = self.post("/api/products/bulk/create/", {"products": [
+            {"name": "ok", "price": "9.99"}, {"name": "no price"}, {"name": "bad", "price": "abc"}, "x",
+        ]})
+        self.assertEqual(status, 200)
+        self.assertEqual((body["created"], body["failed"]), (1, 3))
+        self.assertEqual([result["status"] for result in body["results"]], ["created", "error", "error", "error"])
+        self.assertTrue(Product.objects.filter(name="ok").exists())
+
+    def test_bulk_update_merges_items_per_id(self):
+        first, second = self.ids[:2]
+        status, body = self.post("/api/products/bulk/update/", [
+            {"id": first, "price": "5"}, {"id": first, "name": "renamed"}, {"id": second, "price": "-"},
+            {"id": 10 ** 9, "name": "missing"},
+        ])
+        self.assertEqual(status, 200)
+        self.assertEqual([result["status"] for result in body["results"]], ["updated", "updated", "error", "not_found"])
+        product = Product.objects.get(id=first)
+        self.assertEqual((product.name, product.price), ("renamed", Decimal("5")))
+
+    def test_bulk_update_rejects_non_integer_ids(self):
+        for bad in (True, False, "1", 1.0, None):
+            status, body = self.post("/api/products/bulk/update/", [{"id": self.ids[0], "price": 1}, {"id": bad}])
+            self.assertEqual(status, 400, bad)
+            self.assertEqual(body["indices"], [1])
+        self.assertEqual(Product.objects.get(id=self.ids[0]).price, Decimal("1"))
+
+    def test_bulk_delete(self):
+        status, body = self.post("/api/products/bulk/delete/", {"ids": [self.ids[0], 10 ** 9]})
+        self.assertEqual(status, 200)
+        self.assertEqual([result["status"] for result in body["results"]], ["deleted", "not_found"])
+        self.assertFalse(Product.objects.filter(id=self.ids[0]).exists())
+
+    def test_bulk_delete_rejects_booleans(self):
+        status, body = self.post("/api/products/bulk/delete/", [True, self.ids[1]])
+        self.assertEqual((status, body["indices"]), (400, [0]))
+        self.assertEqual(Product.objects.count(), 3)
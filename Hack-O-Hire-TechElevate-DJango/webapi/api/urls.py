@@ -1,5 +1,9 @@
 from django.urls import path
-from .views import create_product, list_products, product_detail, update_product, delete_product
+from . import async_views
+from .views import (
+    create_product, list_products, product_detail, update_product, delete_product,
+    bulk_create_products, bulk_update_products, bulk_delete_products
+)
 
 urlpatterns = [
     path("products/", list_products, name="list_products"),
@@ -7,4 +11,14 @@ urlpatterns = [
     path("products/<int:product_id>/", product_detail, name="product_detail"),
     path("products/<int:product_id>/update/", update_product, name="update_product"),
     path("products/<int:product_id>/delete/", delete_product, name="delete_product"),
+    path("products/bulk/create/", bulk_create_products, name="bulk_create_products"),
+    path("products/bulk/update/", bulk_update_products, name="bulk_update_products"),
+    path("products/bulk/delete/", bulk_delete_products, name="bulk_delete_products"),
+
+    # Async versions of the CRUD views, for ASGI servers
+    path("async/products/", async_views.list_products, name="async_list_products"),
+    path("async/products/create/", async_views.create_product, name="async_create_product"),
+    path("async/products/<int:product_id>/", async_views.product_detail, name="async_product_detail"),
+    path("async/products/<int:product_id>/update/", async_views.update_product, name="async_update_product"),
+    path("async/products/<int:product_id>/delete/", async_views.delete_product, name="async_delete_product"),
 ]
@@ -1,14 +1,23 @@
 import logging
 import json
+from functools import partial
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
 from django.shortcuts import render, get_object_or_404
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from .models import Product
+from .cache import get_product, get_product_page, invalidate_product, invalidate_products
+from .middleware import log_request_body
+from .queries import parse_list_params, product_list_queryset, encode_cursor, list_cache_key
 from django.views.decorators.csrf import csrf_exempt
 from opentelemetry import trace
 import structlog
 
 # Configure Logger
-logger = structlog.get_logger()
+logger = structlog.get_logger(__name__)
 tracer = trace.get_tracer(__name__)
 
 # Create Product
@@ -16,11 +25,8 @@ tracer = trace.get_tracer(__name__)
 def create_product(request):
     if request.method == "POST":
         try:
-            body_unicode = request.body.decode("utf-8")
-            logger.info("Raw request body", body=body_unicode)
-
-            data = json.loads(body_unicode)
-            logger.info("Parsed data", data=data)
+            log_request_body(logger, request)
+            data = json.loads(request.body.decode("utf-8"))
 
             name = data.get("name")
             description = data.get("description", "")
@@ -42,60 +48,132 @@ def create_product(request):
     logger.warning("Invalid request method", method=request.method)
     return JsonResponse({"error": "Invalid request method"}, status=405)
 
+EDITABLE_FIELDS = ("name", "description", "price")
+
+
+def clean_product_fields(data, partial=False):
+    """Validate the editable fields of one product payload with the model's own field rules.
+
+    Returns the cleaned values; raises ValidationError listing every
+    problem. With partial=True only the fields present are checked.
+    """
+    if not isinstance(data, dict):
+        raise ValidationError("Product must be a JSON object")
+    errors = []
+    if not partial:
+        if not data.get("name") or not data.get("price"):
+            errors.append("Name and price are required")
+        data = dict({"description": ""}, **data)
+
+    fields = {}
+    for name in EDITABLE_FIELDS:
+        if name not in data:
+            continue
+        try:
+            fields[name] = Product._meta.get_field(name).clean(data[name], None)
+        except ValidationError as e:
+            errors.extend(f"{name}: {message}" for message in e.messages)
+    if partial and not fields and not errors:
+        errors.append(f"Nothing to update; expected any of {', '.join(EDITABLE_FIELDS)}")
+    if errors:
+        raise ValidationError(errors)
+    return fields
+
+
+def update_product_fields(product_id, fields):
+    """UPDATE one product's given columns by id; returns False if no such product.
+
+    QuerySet.update() sends no signals and skips auto_now, so updated_at
+    and the cache are handled here; the cache entry is dropped once the
+    surrounding transaction (if any) commits.
+    """
+    updated = Product.objects.filter(id=product_id).update(updated_at=timezone.now(), **fields)
+    if updated:
+        transaction.on_commit(partial(invalidate_product, product_id))
+    return bool(updated)
+
+
+def stream_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + "\n"
+
+
 # List Products
 def list_products(request):
-    products = Product.objects.values()
-    
-    logger.info("Retrieved Product List")
-    return JsonResponse(list(products), safe=False)
+    """Keyset-paginated product list.
+
+    Pages are ordered by ?order= (id by default; created_at, updated_at,
+    price, each optionally descending with -) and cached until the next
+    product write; pass the X-Next-Cursor header of one page as ?after= to
+    get the next. ?min_price=, ?max_price=, ?updated_since= and ?name=
+    filter, ?fields=name,price limits the columns. ?format=ndjson streams
+    every matching product after the cursor as one JSON object per line,
+    reading the table in chunks instead of all at once.
+    """
+    try:
+        query = parse_list_params(request.GET)
+    except ValueError as e:
+        logger.warning("Invalid product list parameters", error=str(e))
+        return JsonResponse({"error": str(e)}, status=400)
+
+    products = product_list_queryset(query)
+    limit = query["limit"]
+
+    if request.GET.get("format") == "ndjson":
+        logger.info("Streaming Product List", order=query["order"], fields=query["fields"])
+        rows = products.iterator(chunk_size=settings.PRODUCT_STREAM_CHUNK_SIZE)
+        return StreamingHttpResponse(stream_ndjson(rows), content_type="application/x-ndjson")
+
+    page = get_product_page(list_cache_key(query), lambda: list(products[:limit + 1]))
+    response = JsonResponse(page[:limit], safe=False)
+    if len(page) > limit:
+        response["X-Next-Cursor"] = encode_cursor(page[limit - 1], query["order"])
+    logger.info("Retrieved Product List", order=query["order"], count=min(len(page), limit))
+    return response
 
 # Retrieve Product
 @csrf_exempt
 def product_detail(request, product_id):
     try:
-        product = get_object_or_404(Product, id=product_id)
+        product = get_product(product_id)
+        if product is None:
+            logger.warning("Product not found", product_id=product_id)
+            return JsonResponse({"error": "Product not found"}, status=404)
 
-        logger.info(f"Fetching product details: {product.id} - {product.name}")
+        logger.info("Fetching product details", product_id=product["id"])
 
-        return JsonResponse({
-            "id": product.id,
-            "name": product.name,
-            "description": product.description,
-            "price": str(product.price),  # Convert Decimal to string for JSON
-            "created_at": product.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-            "updated_at": product.updated_at.strftime("%Y-%m-%d %H:%M:%S"),
-        }, status=200)
+        return JsonResponse(product, status=200)
 
     except Exception as e:
-        logger.error(f"Error fetching product details: {str(e)}")
+        logger.error("Error fetching product details", product_id=product_id, error=str(e))
         return JsonResponse({"error": "Product not found"}, status=404)
 
 # Update Product
 @csrf_exempt
 def update_product(request, product_id):
     try:
-        body_unicode = request.body.decode("utf-8")
-        logger.info(f"Raw request body: {body_unicode}")  # Log raw request body
-
-        data = json.loads(body_unicode)
-        logger.info(f"Parsed data: {data}")  # Log parsed data
+        log_request_body(logger, request)
+        data = json.loads(request.body.decode("utf-8"))
 
-        product = get_object_or_404(Product, id=product_id)
+        try:
+            fields = clean_product_fields(data, partial=True)
+        except ValidationError as e:
+            logger.error("Invalid product data", error=e.messages)
+            return JsonResponse({"error": e.messages}, status=400)
 
-        product.name = data.get("name", product.name)
-        product.description = data.get("description", product.description)
-        product.price = data.get("price", product.price)
-        product.save()
+        # A single UPDATE ... WHERE id=; no SELECT of the current row first
+        if not update_product_fields(product_id, fields):
+            return JsonResponse({"error": "Product not found"}, status=404)
 
-        logger.info(f"Product updated: {product.id} - {product.name}")
-        return JsonResponse({"message": "Product updated!", "id": product.id}, status=200)
+        logger.info("Product updated", product_id=product_id, fields=sorted(fields))
+        return JsonResponse({"message": "Product updated!", "id": product_id}, status=200)
 
     except json.JSONDecodeError:
-        logger.error("Invalid JSON format")
+        logger.error("Invalid JSON format", error="JSONDecodeError")
         return JsonResponse({"error": "Invalid JSON format"}, status=400)
 
     except Exception as e:
-        logger.error(f"Unexpected error: {str(e)}")
+        logger.error("Unexpected error", product_id=product_id, error=str(e))
         return JsonResponse({"error": str(e)}, status=500)
 
 # Delete Product
@@ -104,11 +182,155 @@ def delete_product(request, product_id):
     try:
         product = get_object_or_404(Product, id=product_id)
 
-        logger.info(f"Deleting product: {product.id} - {product.name}")
+        logger.info("Deleting product", product_id=product.id)
         product.delete()
 
         return JsonResponse({"message": "Product deleted successfully!"}, status=200)
 
     except Exception as e:
-        logger.error(f"Error deleting product: {str(e)}")
+        logger.error("Error deleting product", product_id=product_id, error=str(e))
         return JsonResponse({"error": str(e)}, status=500)
+
+
+def parse_bulk_body(request, key):
+    """Items of a bulk request: a JSON array, or an object holding one under ``key``"""
+    data = json.loads(request.body.decode("utf-8"))
+    items = data.get(key) if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        raise ValueError(f"Expected a JSON array or an object with a '{key}' array")
+    if len(items) > settings.PRODUCT_BULK_MAX_ITEMS:
+        raise ValueError(f"At most {settings.PRODUCT_BULK_MAX_ITEMS} items per request")
+    return items
+
+
+def is_product_id(value):
+    """JSON integers only; true/false would otherwise pass as ids 1 and 0"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def invalid_id_response(indices):
+    logger.error("Invalid bulk request", error="id must be an integer", indices=indices)
+    return JsonResponse({"error": "id must be an integer", "indices": indices}, status=400)
+
+
+def bulk_request(key):
+    """Shared method check and body parsing for the bulk views"""
+    def decorator(view):
+        @csrf_exempt
+        def wrapper(request):
+            if request.method != "POST":
+                logger.warning("Invalid request method", method=request.method)
+                return JsonResponse({"error": "Invalid request method"}, status=405)
+            try:
+                items = parse_bulk_body(request, key)
+            except json.JSONDecodeError:
+                logger.error("Invalid JSON format", error="JSONDecodeError")
+                return JsonResponse({"error": "Invalid JSON"}, status=400)
+            except ValueError as e:
+                logger.error("Invalid bulk request", error=str(e))
+                return JsonResponse({"error": str(e)}, status=400)
+            return view(request, items)
+        wrapper.__name__ = view.__name__
+        wrapper.__doc__ = view.__doc__
+        return wrapper
+    return decorator
+
+
+# Bulk Create Products
+@bulk_request("products")
+def bulk_create_products(request, items):
+    """Validate every item, then INSERT the valid ones with one bulk_create.
+
+    Each result carries the item's index; ids are reported where the
+    database returns them from a bulk insert (not on MySQL).
+    """
+    results = [None] * len(items)
+    valid = []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, Product(**clean_product_fields(item))))
+        except ValidationError as e:
+            results[index] = {"index": index, "status": "error", "errors": e.messages}
+
+    with transaction.atomic():
+        created = Product.objects.bulk_create(
+            [product for _, product in valid], batch_size=settings.PRODUCT_BULK_BATCH_SIZE
+        )
+    for (index, _), product in zip(valid, created):
+        results[index] = {"index": index, "status": "created", "id": product.id}
+    if created:
+        invalidate_product()  # bulk_create sends no post_save
+
+    logger.info("Bulk products created", created_count=len(created), failed_count=len(items) - len(created))
+    return JsonResponse({"created": len(created), "failed": len(items) - len(created), "results": results},
+                        status=200)
+
+
+# Bulk Update Products
+@bulk_request("products")
+def bulk_update_products(request, items):
+    """Apply partial updates with one bulk_update per set of changed fields, in one transaction.
+
+    Items are merged per id first, a later item winning field by field as
+    sequential updates would, and one SELECT finds the ids that exist.
+    bulk_update skips auto_now and sends no signals, so updated_at and the
+    cache are handled here. An item without an integer id fails the whole
+    request with 400.
+    """
+    ids = [item.get("id") if isinstance(item, dict) else None for item in items]
+    invalid = [index for index, product_id in enumerate(ids) if not is_product_id(product_id)]
+    if invalid:
+        return invalid_id_response(invalid)
+
+    results = [None] * len(items)
+    changes = {}  # product id -> merged fields
+    for index, (item, product_id) in enumerate(zip(items, ids)):
+        try:
+            fields = clean_product_fields({k: v for k, v in item.items() if k != "id"}, partial=True)
+        except ValidationError as e:
+            results[index] = {"index": index, "id": product_id, "status": "error", "errors": e.messages}
+            continue
+        changes.setdefault(product_id, {}).update(fields)
+        results[index] = {"index": index, "id": product_id}
+
+    now = timezone.now()
+    with transaction.atomic():
+        existing = set(Product.objects.select_for_update().filter(id__in=changes).values_list("id", flat=True))
+        groups = {}
+        for product_id in existing:
+            fields = changes[product_id]
+            groups.setdefault(tuple(sorted(fields)), []).append(Product(id=product_id, updated_at=now, **fields))
+        for names, products in groups.items():
+            Product.objects.bulk_update(products, [*names, "updated_at"], batch_size=settings.PRODUCT_BULK_BATCH_SIZE)
+        if existing:
+            transaction.on_commit(partial(invalidate_products, existing))
+
+    for result in results:
+        if "status" not in result:
+            result["status"] = "updated" if result["id"] in existing else "not_found"
+    updated = sum(result["status"] == "updated" for result in results)
+    logger.info("Bulk products updated", updated_count=updated, failed_count=len(items) - updated)
+    return JsonResponse({"updated": updated, "failed": len(items) - updated, "results": results}, status=200)
+
+
+# Bulk Delete Products
+@bulk_request("ids")
+def bulk_delete_products(request, items):
+    """Delete a list of ids with one set-based DELETE ... WHERE id IN (...); any non-integer id is a 400"""
+    invalid = [index for index, item in enumerate(items) if not is_product_id(item)]
+    if invalid:
+        return invalid_id_response(invalid)
+
+    with transaction.atomic():
+        products = Product.objects.filter(id__in=items)
+        existing = set(products.values_list("id", flat=True))
+        products.delete()
+
+    results = [
+        {"index": index, "id": item, "status": "deleted" if item in existing else "not_found"}
+        for index, item in enumerate(items)
+    ]
+
+    logger.info("Bulk products deleted", deleted_count=len(existing), requested_count=len(items))
+    return JsonResponse({"deleted": len(existing), "failed": len(items) - len(existing), "results": results},
+                        status=200)
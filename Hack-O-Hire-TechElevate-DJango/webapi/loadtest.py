@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+"""Compare WSGI and ASGI throughput and latency of the product API.
+
+By default the script starts both servers itself against a local SQLite
+database (DB_ENGINE=sqlite), seeds products, and drives each with the
+same closed-loop load: every client thread keeps one keep-alive
+connection and sends the next request as soon as the previous answer
+arrives.
+
+    python loadtest.py --products 5000 --concurrency 32 --duration 20
+
+The WSGI server hits the sync views (/api/products/...) and the ASGI
+server the async ones (/api/async/products/...). Point DB_ENGINE/DB_*
+at a local MySQL container to measure against MySQL instead, or pass
+--target name=http://host:port/path to load servers you started yourself.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import subprocess
+import http.client
+from urllib.parse import urlsplit
+
+SERVERS = {
+    "wsgi": {
+        "command": "gunicorn webapi.wsgi:application --bind 127.0.0.1:{port} --workers {workers} "
+                   "--threads {threads} --log-level warning",
+        "prefix": "/api/products/",
+    },
+    "asgi": {
+        "command": "uvicorn webapi.asgi:application --host 127.0.0.1 --port {port} --workers {workers} "
+                   "--log-level warning --no-access-log",
+        "prefix": "/api/async/products/",
+        "env": {"DB_CONN_MAX_AGE": "0"},  # persistent connections pile up under ASGI; see settings
+    },
+}
+
+
+def setup_database(products):
+    """Migrate the configured database and make sure it holds at least ``products`` rows"""
+    import django
+    django.setup()
+    from django.core.management import call_command
+    from api.models import Product
+
+    call_command("migrate", verbosity=0)
+    missing = products - Product.objects.count()
+    if missing > 0:
+        Product.objects.bulk_create(
+            [Product(name=f"load-test-{i}", description="seeded by loadtest.py", price=random.randint(1, 999))
+             for i in range(missing)],
+            batch_size=1000
+        )
+    return list(Product.objects.values_list("id", flat=True))
+
+
+def wait_until_up(url, timeout=30):
+    parts = urlsplit(url)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=2)
+            conn.request("GET", parts.path)
+            conn.getresponse().read()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def run_load(base_url, paths, concurrency, duration, warmup):
+    """Closed-loop load; returns latency samples (seconds) and error count after warmup"""
+    parts = urlsplit(base_url)
+    started = time.monotonic()
+    measure_from = started + warmup
+    stop_at = measure_from + duration
+    latencies = [[] for _ in range(concurrency)]
+    errors = [0] * concurrency
+
+    def client(n):
+        rng = random.Random(n)
+        conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+        while True:
+            now = time.monotonic()
+            if now >= stop_at:
+                break
+            try:
+                conn.request("GET", rng.choice(paths))
+                response = conn.getresponse()
+                response.read()
+                ok = response.status < 500
+            except (OSError, http.client.HTTPException):
+                ok = False
+                conn.close()
+                conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+            finished = time.monotonic()
+            if finished >= measure_from:
+                latencies[n].append(finished - now)
+                errors[n] += not ok
+        conn.close()
+
+    threads = [threading.Thread(target=client, args=(n,), daemon=True) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return [sample for samples in latencies for sample in samples], sum(errors)
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(q / 100 * len(sorted_values)))]
+
+
+def summarize(latencies, errors, duration):
+    ms = sorted(sample * 1000 for sample in latencies)
+    return {
+        "requests": len(ms),
+        "errors": errors,
+        "rps": round(len(ms) / duration, 1),
+        "p50_ms": round(percentile(ms, 50), 2) if ms else None,
+        "p99_ms": round(percentile(ms, 99), 2) if ms else None,
+    }
+
+
+def request_paths(prefix, ids, mix):
+    detail = [f"{prefix}{product_id}/" for product_id in ids]
+    if mix == "detail":
+        return detail
+    pages = [f"{prefix}?limit=100&after={product_id}" for product_id in ids[::100]]
+    if mix == "list":
+        return pages
+    return detail * 4 + pages * max(1, len(detail) // len(pages))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--target", action="append", default=[],
+                        help="name=http://host:port/api/products/ to load an already running server")
+    parser.add_argument("--servers", default="wsgi,asgi", help="Servers to start when no --target is given")
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--mix", choices=["detail", "list", "mixed"], default="detail")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--warmup", type=float, default=3)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=8, help="Threads per gunicorn worker")
+    parser.add_argument("--port", type=int, default=8101)
+    parser.add_argument("--output", help="Write the results as JSON")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "webapi.settings")
+    os.environ.setdefault("DB_ENGINE", "sqlite")
+    ids = setup_database(args.products)
+
+    targets = []
+    for target in args.target:
+        name, url = target.split("=", 1)
+        targets.append((name, url, None, {}))
+    if not targets:
+        for offset, name in enumerate(args.servers.split(",")):
+            server = SERVERS[name]
+            port = args.port + offset
+            command = server["command"].format(port=port, workers=args.workers, threads=args.threads)
+            targets.append((name, f"http://127.0.0.1:{port}{server['prefix']}", command, server.get("env", {})))
+
+    results = {}
+    for name, url, command, env in targets:
+        process = None
+        if command:
+            process = subprocess.Popen(command.split(), env=dict(os.environ, **env))
+        try:
+            if not wait_until_up(url):
+                print(f"{name}: server did not come up at {url}", file=sys.stderr)
+                continue
+            parts = urlsplit(url)
+            paths = request_paths(parts.path, ids, args.mix)
+            latencies, errors = run_load(url, paths, args.concurrency, args.duration, args.warmup)
+            results[name] = summarize(latencies, errors, args.duration)
+            print(f"{name:>6}: {results[name]['rps']:>9,.1f} req/s  p50 {results[name]['p50_ms']} ms  "
+                  f"p99 {results[name]['p99_ms']} ms  errors {errors}")
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait(10)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"params": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
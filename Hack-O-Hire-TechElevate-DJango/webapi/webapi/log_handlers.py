@@ -0,0 +1,51 @@
+import queue
+import atexit
+import logging
+import logging.handlers
+from prometheus_client import Counter
+
+LOG_RECORDS_DROPPED = Counter("log_records_dropped_total", "Log records dropped because the log queue was full")
+
+
+class QueueFileHandler(logging.handlers.QueueHandler):
+    """Hands records to a background thread that formats and writes them.
+
+    The request thread only puts the record on a bounded in-memory queue;
+    JSON formatting and the file write happen in a QueueListener thread.
+    When the writer falls behind and the queue is full, records are
+    dropped and counted instead of blocking the request.
+    """
+
+    def __init__(self, filename, queue_size=10000, encoding="utf-8"):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.file_handler = logging.FileHandler(filename, encoding=encoding, delay=True)
+        self.listener = logging.handlers.QueueListener(self.queue, self.file_handler, respect_handler_level=True)
+        self.listener.start()
+        self._running = True
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Flush queued records and stop the writer thread"""
+        if self._running:
+            self._running = False
+            self.listener.stop()
+
+    def setFormatter(self, fmt):
+        # dictConfig sets the formatter on this handler; formatting runs in the writer thread
+        self.file_handler.setFormatter(fmt)
+
+    def prepare(self, record):
+        # Records never leave the process, so skip QueueHandler's eager
+        # formatting and pickling-safe copy; the writer formats them
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+    def close(self):
+        self.stop()
+        self.file_handler.close()
+        super().close()
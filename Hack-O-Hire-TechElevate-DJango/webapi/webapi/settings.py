@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,6 +44,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django_prometheus.middleware.PrometheusBeforeMiddleware',
+    'api.middleware.RequestLoggingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -79,20 +81,42 @@ WSGI_APPLICATION = 'webapi.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.mysql',  # MySQL database backend
-        'NAME': 'api_gateway',          # Replace with your MySQL database name
-        'USER': 'root',          # Replace with your MySQL username
-        'PASSWORD': 'shreyas',  # Replace with your MySQL password
-        'HOST': 'db',                   # Use 'localhost' for local MySQL server
-        'PORT': '3306',                        # Default MySQL port
-        'OPTIONS': {
-            'init_command': "SET sql_mode='STRICT_TRANS_TABLES'"
+# DB_ENGINE=sqlite runs against a local file (tests, load tests) instead of MySQL.
+# Under WSGI, connections are kept for DB_CONN_MAX_AGE seconds and reused by
+# later requests on the same worker thread; CONN_HEALTH_CHECKS pings a reused
+# connection before the first query of a request so a dropped one is replaced
+# instead of failing the request. Under ASGI every request runs its ORM calls
+# in a fresh thread context, so persistent connections are never reused and
+# pile up: webapi/asgi.py defaults DB_CONN_MAX_AGE to 0, so ASGI opens a
+# connection per request; put a MySQL-side pooler (e.g. ProxySQL) behind it.
+DB_ENGINE = os.getenv('DB_ENGINE', 'mysql')
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', '60'))
+
+if DB_ENGINE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('DB_NAME', str(BASE_DIR / 'db.sqlite3')),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.mysql',  # MySQL database backend
+            'NAME': os.getenv('DB_NAME', 'api_gateway'),          # Replace with your MySQL database name
+            'USER': os.getenv('DB_USER', 'root'),          # Replace with your MySQL username
+            'PASSWORD': os.getenv('DB_PASSWORD', 'shreyas'),  # Replace with your MySQL password
+            'HOST': os.getenv('DB_HOST', 'db'),                   # Use 'localhost' for local MySQL server
+            'PORT': os.getenv('DB_PORT', '3306'),                        # Default MySQL port
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'init_command': "SET sql_mode='STRICT_TRANS_TABLES'"
+            }
         }
     }
-}
-
 
 
 # Password validation
@@ -136,16 +160,49 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-import os
+# Product listing (api.views.list_products)
+PRODUCT_PAGE_SIZE = 100
+PRODUCT_MAX_PAGE_SIZE = 1000
+PRODUCT_STREAM_CHUNK_SIZE = 2000  # rows fetched per round trip in NDJSON mode
+PRODUCT_BULK_MAX_ITEMS = 1000  # items per bulk create/update/delete request
+PRODUCT_BULK_BATCH_SIZE = 500  # rows per INSERT / UPDATE statement in bulk create and update
+PRODUCT_CACHE_ALIAS = 'default'
+PRODUCT_CACHE_TIMEOUT = 300  # seconds; writes invalidate entries earlier
+
 import structlog
 from pythonjsonlogger import jsonlogger
 
+# Cache
+# locmem is per process and fine for tests and a single worker; point
+# CACHE_BACKEND/CACHE_LOCATION at a shared backend (e.g.
+# django.core.cache.backends.redis.RedisCache, redis://cache:6379/1) so
+# invalidations reach every worker in production.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'webapi-products'),
+    }
+}
+
+# Request logging
+# Share of create/update requests whose raw body is logged, and the cut-off
+LOG_BODY_SAMPLE_RATE = float(os.getenv('LOG_BODY_SAMPLE_RATE', '0.01'))
+LOG_BODY_MAX_BYTES = int(os.getenv('LOG_BODY_MAX_BYTES', '1024'))
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+
 # Structlog Configuration
+# structlog hands its events to stdlib logging instead of printing them, so
+# they share the queued JSON file handler below. Disabled levels are
+# dropped before any processing; key-value fields become JSON keys.
 structlog.configure(
     processors=[
-        structlog.processors.TimeStamper(fmt="iso"),  # Adds timestamp
-        structlog.processors.JSONRenderer(),  # Converts log to JSON
-    ]
+        structlog.stdlib.filter_by_level,
+        structlog.contextvars.merge_contextvars,  # request_id, method, path
+        structlog.stdlib.render_to_log_kwargs,
+    ],
+    logger_factory=structlog.stdlib.LoggerFactory(),
+    wrapper_class=structlog.stdlib.BoundLogger,
+    cache_logger_on_first_use=True,
 )
 
 LOGGING = {
@@ -160,8 +217,10 @@ LOGGING = {
     "handlers": {
         "file": {
             "level": "INFO",
-            "class": "logging.FileHandler",
+            # Formats and writes on a background thread; requests only enqueue
+            "()": "webapi.log_handlers.QueueFileHandler",
             "filename": os.path.join(BASE_DIR, "logs/django_api.log"),
+            "queue_size": 10000,
             "formatter": "json",  # ✅ JSON Formatter
         },
     },
@@ -171,7 +230,10 @@ LOGGING = {
             "level": "INFO",
             "propagate": True,
         },
+        "api": {
+            "handlers": ["file"],
+            "level": LOG_LEVEL,
+            "propagate": False,
+        },
     },
 }
-
-
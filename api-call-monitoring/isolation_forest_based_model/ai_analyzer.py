@@ -1,12 +1,122 @@
+import re
+import time
+import asyncio
 import google.generativeai as genai
 import pandas as pd
 from config import Config
+from alert_cache import AlertCache, anomaly_signature
 import logging
 
+
+def anomaly_details(anomaly):
+    """(label, value) pairs that tell an anomaly apart, after its service, environment and type"""
+    if anomaly.get('rate_key'):
+        # Rate anomalies have no status or latency; the user or endpoint and its rates are the alert
+        column = 'user_id' if anomaly['rate_key'] == 'user' else 'endpoint'
+        return [
+            ('Rate Key', f"{anomaly['rate_key']} ({column} {anomaly.get(column, 'unknown')})"),
+            ('Request Rate', f"{anomaly.get('request_rate_rpm', 'unknown')} req/min "
+                             f"(baseline {anomaly.get('baseline_rate_rpm', 'unknown')} req/min)"),
+        ]
+    return [
+        ('Status Code', anomaly.get('status_code', 'unknown')),
+        ('Response Time', f"{anomaly.get('response_time', 'unknown')}ms"),
+    ]
+
+
+def build_alert_prompt(anomaly):
+    details = "".join(f"\n            {label}: {value}" for label, value in anomaly_details(anomaly))
+    return f"""
+            Create a concise alert message for this API anomaly:
+            Service: {anomaly.get('service', 'unknown')}
+            Environment: {anomaly.get('environment', 'unknown')}
+            Type: {anomaly.get('anomaly_type', 'unknown')}{details}
+            Timestamp: {anomaly.get('timestamp', 'unknown')}
+
+            Provide:
+            1. One-line summary (start with 'ALERT:')
+            2. Probable cause
+            3. Recommended action
+            """
+
+
+def build_batch_alert_prompt(anomalies):
+    """Fold several anomalies into one prompt; the reply is split on the [n] headers"""
+    items = "\n".join(
+        f"            [{i}] Service: {a.get('service', 'unknown')}, "
+        f"Environment: {a.get('environment', 'unknown')}, Type: {a.get('anomaly_type', 'unknown')}, "
+        + "".join(f"{label}: {value}, " for label, value in anomaly_details(a))
+        + f"Timestamp: {a.get('timestamp', 'unknown')}"
+        for i, a in enumerate(anomalies, 1)
+    )
+    return f"""
+            Create a concise alert message for each of these API anomalies:
+{items}
+
+            For every anomaly, start a section with its number in brackets on its own line
+            (for example '[1]') and provide:
+            1. One-line summary (start with 'ALERT:')
+            2. Probable cause
+            3. Recommended action
+            """
+
+
+def split_batch_response(text, count):
+    """Split a batched reply into per-anomaly messages; missing sections are None"""
+    messages = [None] * count
+    parts = re.split(r'^\s*\[(\d+)\]\s*$', text or '', flags=re.MULTILINE)
+    for number, body in zip(parts[1::2], parts[2::2]):
+        index = int(number) - 1
+        if 0 <= index < count and body.strip():
+            messages[index] = body.strip()
+    return messages
+
+
+def fallback_alert(anomaly):
+    return f"ALERT: Anomaly detected in {anomaly.get('service', 'unknown service')}"
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubGenerativeModel:
+    """Offline stand-in for genai.GenerativeModel with a fixed response latency"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def _respond(self, prompt):
+        self.calls += 1
+        numbers = re.findall(r'^\s*\[(\d+)\] Service:', prompt, flags=re.MULTILINE)
+        body = "ALERT: Stub alert\nProbable cause: stub model\nRecommended action: none"
+        if numbers:
+            return StubResponse("\n".join(f"[{n}]\n{body}" for n in numbers))
+        return StubResponse(body)
+
+    def generate_content(self, prompt):
+        time.sleep(self.latency)
+        return self._respond(prompt)
+
+    async def generate_content_async(self, prompt):
+        await asyncio.sleep(self.latency)
+        return self._respond(prompt)
+
+
 class AIAnalyzer:
-    def __init__(self):
+    def __init__(self, model=None):
         self.config = Config()
         self.logger = logging.getLogger(__name__)
+        self.cache = AlertCache()
+        if model is not None:
+            self.model = model
+            return
+        if self.config.GEMINI_USE_STUB:
+            self.model = StubGenerativeModel(self.config.GEMINI_STUB_LATENCY)
+            self.logger.info("Using stub Gemini model")
+            return
         try:
             genai.configure(api_key=self.config.GEMINI_API_KEY)
             self.model = genai.GenerativeModel(self.config.GEMINI_MODEL)
@@ -16,27 +126,21 @@ class AIAnalyzer:
             raise RuntimeError(f"Gemini initialization failed: {str(e)}")
 
     def generate_alert_message(self, anomaly):
+        signature = anomaly_signature(anomaly)
+        cached = self.cache.get(signature)
+        if cached is not None:
+            return cached
         try:
-            prompt = f"""
-            Create a concise alert message for this API anomaly:
-            Service: {anomaly.get('service', 'unknown')}
-            Environment: {anomaly.get('environment', 'unknown')}
-            Type: {anomaly.get('anomaly_type', 'unknown')}
-            Status Code: {anomaly.get('status_code', 'unknown')}
-            Response Time: {anomaly.get('response_time', 'unknown')}ms
-            Timestamp: {anomaly.get('timestamp', 'unknown')}
-
-            Provide:
-            1. One-line summary (start with 'ALERT:')
-            2. Probable cause
-            3. Recommended action
-            """
+            prompt = build_alert_prompt(anomaly)
             
             response = self.model.generate_content(prompt)
-            return response.text if response.text else "Could not generate alert message"
+            if not response.text:
+                return "Could not generate alert message"
+            self.cache.put(signature, response.text)
+            return response.text
         except Exception as e:
             self.logger.error(f"Failed to generate alert: {str(e)}")
-            return f"ALERT: Anomaly detected in {anomaly.get('service', 'unknown service')}"
+            return fallback_alert(anomaly)
 
     def generate_anomaly_report(self, anomalies):
         if not anomalies:
@@ -69,4 +173,4 @@ class AIAnalyzer:
             }
         except Exception as e:
             self.logger.error(f"Failed to generate report: {str(e)}")
-            return {"analysis": "Failed to generate analysis report"}
\ No newline at end of file
+            return {"analysis": "Failed to generate analysis report"}
@@ -0,0 +1,115 @@
+import time
+import threading
+from collections import OrderedDict
+from config import Config
+
+
+def anomaly_signature(anomaly, latency_bucket_ms=None):
+    """Normalized key for anomalies that would produce the same alert text"""
+    bucket_ms = latency_bucket_ms or Config.ALERT_LATENCY_BUCKET_MS
+    try:
+        latency_bucket = int(float(anomaly.get('response_time')) // bucket_ms) * bucket_ms
+    except (TypeError, ValueError):
+        latency_bucket = None
+    signature = (
+        anomaly.get('service'),
+        anomaly.get('environment'),
+        anomaly.get('anomaly_type'),
+        anomaly.get('status_code'),
+        latency_bucket
+    )
+    if anomaly.get('rate_key'):
+        # No status or latency on rate anomalies: the offending user or endpoint tells them apart
+        signature += (anomaly['rate_key'], anomaly.get('user_id'), anomaly.get('endpoint'))
+    return signature
+
+
+class AlertCache:
+    """LRU cache of generated alert messages with a time-to-live per entry"""
+
+    def __init__(self, maxsize=None, ttl=None):
+        self.config = Config()
+        self.maxsize = maxsize or self.config.ALERT_CACHE_SIZE
+        self.ttl = ttl or self.config.ALERT_CACHE_TTL
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, signature):
+        with self._lock:
+            entry = self._entries.get(signature)
+            if entry is not None:
+                expires_at, message = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(signature)
+                    self.hits += 1
+                    return message
+                del self._entries[signature]
+                self.expirations += 1
+            self.misses += 1
+            return None
+
+    def put(self, signature, message):
+        with self._lock:
+            self._entries[signature] = (time.monotonic() + self.ttl, message)
+            self._entries.move_to_end(signature)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+
+class AlertDeduplicator:
+    """Folds repeated anomalies into one alert per signature and window.
+
+    Anomalies in a batch that share a signature become a single anomaly
+    with ``count``, ``first_seen`` and ``last_seen`` fields. A signature
+    that was already alerted within the last ``window`` seconds is
+    suppressed entirely and only counted.
+    """
+
+    def __init__(self, window=None):
+        self.config = Config()
+        self.window = window or self.config.ALERT_DEDUP_WINDOW
+        self._alerted = {}
+        self.grouped = 0
+        self.suppressed = 0
+
+    def group(self, anomalies):
+        now = time.monotonic()
+        self._alerted = {sig: t for sig, t in self._alerted.items() if now - t < self.window}
+
+        groups = OrderedDict()
+        for anomaly in anomalies:
+            signature = anomaly_signature(anomaly)
+            if signature in self._alerted:
+                self.suppressed += 1
+                continue
+            group = groups.get(signature)
+            if group is None:
+                groups[signature] = dict(anomaly, count=1, first_seen=anomaly.get('timestamp'),
+                                         last_seen=anomaly.get('timestamp'))
+            else:
+                group['count'] += 1
+                group['last_seen'] = anomaly.get('timestamp')
+                self.grouped += 1
+
+        for signature in groups:
+            self._alerted[signature] = now
+        return list(groups.values())
+
+    def stats(self):
+        return {'grouped': self.grouped, 'suppressed': self.suppressed, 'open_signatures': len(self._alerted)}
@@ -0,0 +1,38 @@
+import numpy as np
+from config import Config
+
+
+def rule_mask(rule, columns, response_time_threshold):
+    """Boolean mask of the rows matching every condition of one rule"""
+    status = np.asarray(columns['status_code'])
+    response_time = np.asarray(columns['response_time'], dtype=np.float64)
+    mask = np.ones(len(status), dtype=bool)
+
+    if 'status_min' in rule:
+        mask &= status >= rule['status_min']
+    if 'status_max' in rule:
+        mask &= status <= rule['status_max']
+    if 'latency_multiplier' in rule:
+        mask &= response_time > response_time_threshold * rule['latency_multiplier']
+    if 'latency_min_ms' in rule:
+        mask &= response_time > rule['latency_min_ms']
+    if 'error_rate_min' in rule:
+        mask &= np.asarray(columns['error_rate'], dtype=np.float64) >= rule['error_rate_min']
+    return mask
+
+
+def classify_anomalies(columns, rules=None, default=None):
+    """Label a whole batch of anomalous rows at once.
+
+    Rules are checked in order and the first match wins, as with the
+    former if/elif chain; rows matching no rule get the default type.
+    """
+    config = Config()
+    rules = config.ANOMALY_RULES if rules is None else rules
+    default = default or config.ANOMALY_DEFAULT_TYPE
+    n = len(columns['anomaly_score'])
+    if n == 0 or not rules:
+        return np.full(n, default, dtype=object)
+
+    masks = [rule_mask(rule, columns, config.RESPONSE_TIME_THRESHOLD) for rule in rules]
+    return np.select(masks, [rule['type'] for rule in rules], default=default).astype(object)
@@ -1,8 +1,17 @@
 import pandas as pd
+from collections import Counter
 import numpy as np
-from sklearn.ensemble import IsolationForest
-from statsmodels.tsa.seasonal import STL
+from concurrent.futures import ProcessPoolExecutor
 from config import Config
+from batch_scorer import to_columns, build_features, iter_partitions, score_batch, columns_to_records
+from feature_engineering import FeatureEngineer, INPUT_COLUMNS
+from partition_training import fit_partition, fit_stored_partition, traffic_baseline
+from hierarchical_model import HierarchicalModels, GLOBAL_KEY, calibrate, key_normalizer, normalizer, model_nbytes
+from model_registry import ModelRegistry
+from model_refresh import ModelRefresher
+from anomaly_classifier import classify_anomalies
+from traffic_monitor import StreamingSpikeDetector
+from rate_monitor import RateAnomalyDetector
 import logging
 
 class AnomalyDetector:
@@ -10,100 +19,303 @@ class AnomalyDetector:
         self.config = Config()
         self.models = {}
         self.traffic_baselines = {}
+        self.training_stats = []
+        self.fallback_rows = Counter()  # rows per key scored with the fallback model
+        self.skipped_rows = Counter()  # rows per key left unscored, with no fallback either
+        self.refresher = None
+        self.features = FeatureEngineer() if self.config.FEATURE_ENGINEERING else None
+        self.traffic_monitor = StreamingSpikeDetector(self.traffic_baselines)
+        self.rate_monitor = RateAnomalyDetector() if self.config.RATE_DETECTION else None
         self.logger = logging.getLogger(__name__)
         
-    def train_models(self, historical_logs):
-        """Train models using historical log data"""
-        df = pd.DataFrame(historical_logs)
+    def train_models(self, historical_logs, n_workers=None):
+        """Train models using historical log data.
+
+        With n_workers > 1 the (service, environment) partitions are fitted
+        in a process pool. Every partition gets its own fixed seed, so the
+        result does not depend on the worker count.
+        """
+        n_workers = n_workers or self.config.TRAINING_WORKERS
+        columns = to_columns(historical_logs)
+        if self.features is not None:
+            self.features.fit(columns)
+        X = self.build_features(columns, stateful=False)
+        params = self._training_params()
+        tasks = [
+            (key, X[idx], columns['timestamp'][idx], params)
+            for key, idx in iter_partitions(columns)
+        ]
+        if self.refresher is not None:
+            for key, X_part, _, _ in tasks:
+                self.refresher.set_reference(key, X_part)
         
-        for (service, env), group in df.groupby(['service', 'environment']):
-            # Features for anomaly detection
-            X = group[['response_time']].copy()
-            X['error_flag'] = group['status_code'].apply(lambda x: 1 if x >= 400 else 0)
-            
-            # Train Isolation Forest
-            clf = IsolationForest(
-                n_estimators=self.config.ISOLATION_FOREST_ESTIMATORS,
-                contamination=self.config.CONTAMINATION,
-                random_state=42
+        if self.config.MODEL_MODE == 'hierarchical':
+            self._train_hierarchical(
+                ((key, X_part, timestamps) for key, X_part, timestamps, _ in tasks),
+                lambda keys: self._fit_tasks(fit_partition, [task for task in tasks if task[0] in keys], n_workers)
             )
-            clf.fit(X)
-            self.models[(service, env)] = clf
-            
-            # Establish traffic baselines (using 'min' instead of 'T')
-            group['timestamp'] = pd.to_datetime(group['timestamp'])
-            traffic = group.set_index('timestamp').resample('5min').size()
-            self.traffic_baselines[(service, env)] = {
-                'mean': traffic.mean(),
-                'std': traffic.std()
-            }
-            
+        else:
+            self._install_models(self._fit_tasks(fit_partition, tasks, n_workers))
+            self._fit_fallback((X_part for _, X_part, _, _ in tasks), len(tasks))
+        self.traffic_monitor.fit(columns)
         self.logger.info(f"Trained models for {len(self.models)} service-environment combinations")
     
+    def train_from_store(self, store, start=None, end=None, n_workers=None):
+        """Train from a LogStore time range without loading it into memory at once.
+
+        Each worker reads just its (service, environment) partition and
+        the feature columns, with the time range pushed down to Parquet;
+        the parent reads one partition at a time for the feature statistics
+        and the seasonal traffic baselines.
+        """
+        from log_store import FEATURE_COLUMNS
+        
+        n_workers = n_workers or self.config.TRAINING_WORKERS
+        params = self._training_params()
+        if self.features is not None:
+            # Endpoint and language statistics span environments, so they
+            # are accumulated here before the partitions are fitted
+            self.features.reset()
+            for _, part in store.iter_partitions(start, end, columns=INPUT_COLUMNS):
+                self.features.partial_fit(part)
+            params['features'] = self.features
+        tasks = [(store.root, key, start, end, params) for key in store.partitions()]
+        
+        def fit_stored(tasks):
+            return [result for result in self._fit_tasks(fit_stored_partition, tasks, n_workers) if result is not None]
+        
+        if self.config.MODEL_MODE == 'hierarchical':
+            names = INPUT_COLUMNS if self.features is not None else FEATURE_COLUMNS
+            self._train_hierarchical(
+                ((key, self.build_features(part, stateful=False), part['timestamp'])
+                 for key, part in store.iter_partitions(start, end, columns=names)),
+                lambda keys: fit_stored([task for task in tasks if task[1] in keys])
+            )
+        else:
+            self._install_models(fit_stored(tasks))
+            names = INPUT_COLUMNS if self.features is not None else FEATURE_COLUMNS
+            self._fit_fallback(
+                (self.build_features(part, stateful=False) for _, part in store.iter_partitions(start, end, columns=names)),
+                len(tasks)
+            )
+        for key, part in store.iter_partitions(start, end, columns=['timestamp']):
+            self.traffic_monitor.fit_key(key, part['timestamp'].astype('datetime64[s]').astype(np.int64))
+        if self.refresher is not None:
+            names = INPUT_COLUMNS if self.features is not None else FEATURE_COLUMNS
+            for key, part in store.iter_partitions(start, end, columns=names):
+                X = self.build_features(part, stateful=False)
+                self.refresher.set_reference(key, X[-self.config.REFRESH_WINDOW_SIZE:])
+        self.logger.info(f"Trained models for {len(self.models)} service-environment combinations from {store.root}")
+    
+    def _fit_tasks(self, fit, tasks, n_workers):
+        if n_workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=min(n_workers, len(tasks))) as pool:
+                return list(pool.map(fit, *zip(*tasks)))
+        return [fit(*task) for task in tasks]
+    
+    def _train_hierarchical(self, partitions, fit_dedicated):
+        """Fit the shared model and per-key offsets, then dedicated models within the memory budget.
+
+        ``partitions`` yields (key, X, timestamps) one key at a time; only
+        a sample of up to HIERARCHICAL_CALIBRATION_ROWS rows per key is
+        kept. ``fit_dedicated(keys)`` fits full models for the chosen keys
+        and returns fit_partition results.
+        """
+        rng = np.random.default_rng(self.config.RANDOM_SEED)
+        samples, rows, baselines = {}, {}, {}
+        for key, X, timestamps in partitions:
+            rows[key] = len(X)
+            if len(X) > self.config.HIERARCHICAL_CALIBRATION_ROWS:
+                X = X[np.sort(rng.choice(len(X), self.config.HIERARCHICAL_CALIBRATION_ROWS, replace=False))]
+            samples[key] = X
+            baselines[key] = traffic_baseline(timestamps)
+        if not samples:
+            return
+        
+        per_key = max(1, self.config.HIERARCHICAL_GLOBAL_ROWS // len(samples))
+        pooled = np.concatenate([X[:per_key] for X in samples.values()])
+        center, scale = normalizer(pooled)
+        fallback = {'center': center, 'scale': scale, 'offset': 0.0, 'rows': len(pooled)}
+        # Per-key normalization first, so the shared model learns one "normal" shape
+        norms = {key: key_normalizer(X, self.config.HIERARCHICAL_PRIOR_ROWS, fallback)
+                 for key, X in samples.items()}
+        global_X = np.concatenate([(X[:per_key] - norms[key][0]) / norms[key][1] for key, X in samples.items()])
+        _, global_model, _, stats = fit_partition(GLOBAL_KEY, global_X, None, self._training_params())
+        calibration = {
+            key: calibrate(global_model, X, self.config.CONTAMINATION, self.config.HIERARCHICAL_PRIOR_ROWS, fallback)
+            for key, X in samples.items()
+        }
+        
+        # Every forest has the same shape, so the shared one sizes the rest
+        slots = int(self.config.MODEL_MEMORY_BUDGET_MB * 2**20 // model_nbytes(global_model)) - 1
+        candidates = sorted(
+            (key for key, n in rows.items() if n >= self.config.HIERARCHICAL_DEDICATED_MIN_ROWS),
+            key=lambda key: (-rows[key], key)
+        )[:max(slots, 0)]
+        self.training_stats = [stats]
+        dedicated = {}
+        if candidates:
+            for key, clf, baseline, part_stats in fit_dedicated(set(candidates)):
+                dedicated[key] = clf
+                self.training_stats.append(part_stats)
+        
+        self.models = HierarchicalModels(global_model, calibration, fallback, dedicated)
+        self.traffic_baselines.update(baselines)
+        self.logger.info(
+            f"Trained shared model on {len(global_X)} rows with offsets for {len(calibration)} keys "
+            f"and {len(dedicated)} dedicated models, ~{self.models.nbytes() / 2**20:.1f}MB"
+        )
+    
+    def _fit_fallback(self, partitions, n_keys):
+        """Fit the per_key mode's fallback model on an even sample of every key's rows.
+
+        It is stored under GLOBAL_KEY and scores keys that have no model of
+        their own, such as services first seen after training.
+        """
+        rng = np.random.default_rng(self.config.RANDOM_SEED)
+        per_key = max(1, self.config.FALLBACK_MODEL_ROWS // max(n_keys, 1))
+        samples = [
+            X if len(X) <= per_key else X[np.sort(rng.choice(len(X), per_key, replace=False))]
+            for X in partitions
+        ]
+        if not samples:
+            return
+        _, model, _, stats = fit_partition(GLOBAL_KEY, np.concatenate(samples), None, self._training_params())
+        self.models[GLOBAL_KEY] = model
+        self.training_stats.append(stats)
+        self.logger.info(f"Trained the fallback model on {stats['rows']} rows in {stats['fit_seconds']:.2f}s")
+    
+    def _training_params(self):
+        return {
+            'n_estimators': self.config.ISOLATION_FOREST_ESTIMATORS,
+            'contamination': self.config.CONTAMINATION,
+            'seed': self.config.RANDOM_SEED,
+            'trace_memory': self.config.TRAINING_TRACE_MEMORY
+        }
+    
+    def _install_models(self, results):
+        self.training_stats = []
+        for key, clf, baseline, stats in results:
+            self.models[key] = clf
+            self.traffic_baselines[key] = baseline
+            self.training_stats.append(stats)
+            self.logger.info(
+                f"Trained {key[0]}/{key[1]}: {stats['rows']} rows in {stats['fit_seconds']:.2f}s, "
+                f"worker peak RSS {stats['peak_rss_mb']}MB"
+                + (f", peak alloc {stats['peak_alloc_mb']}MB" if 'peak_alloc_mb' in stats else "")
+            )
+    
+    def save_models(self, registry=None):
+        """Persist the current models and baselines as a new registry version"""
+        registry = registry or ModelRegistry()
+        models, shared = self.models, None
+        if isinstance(models, HierarchicalModels):
+            models, shared = models.dedicated, models.shared_state()
+        return registry.save(models, self.traffic_baselines, metadata={
+            'n_estimators': self.config.ISOLATION_FOREST_ESTIMATORS,
+            'contamination': self.config.CONTAMINATION
+        }, features=self.features, shared=shared)
+    
+    def load_models(self, registry=None, version=None, keys=None):
+        """Warm start from the registry; models are read lazily on first use"""
+        registry = registry or ModelRegistry()
+        loaded = registry.load(version=version, keys=keys)
+        if loaded is None:
+            return False
+        self.models, self.traffic_baselines, manifest = loaded
+        shared = registry.load_shared(manifest)
+        if shared is not None:
+            self.models = HierarchicalModels(
+                shared['global_model'], shared['calibration'], shared['fallback'], dedicated=self.models
+            )
+        elif not len(self.models):
+            return False
+        # Versions saved without a feature stage were trained on build_features
+        self.features = registry.load_features(manifest)
+        self.traffic_monitor = StreamingSpikeDetector(self.traffic_baselines)
+        self.logger.info(f"Loaded {len(self.models)} models from registry version {manifest['version']}")
+        return True
+    
+    def enable_refresh(self, interval=None, registry=None):
+        """Start sliding-window refresh of drifted partitions in the background"""
+        if self.refresher is None:
+            self.refresher = ModelRefresher(self, registry=registry)
+            self.refresher.start(interval)
+        return self.refresher
+    
     def detect_anomalies(self, new_logs):
         """Detect anomalies in new logs"""
-        anomalies = []
-        df = pd.DataFrame(new_logs)
-        
-        for (service, env), group in df.groupby(['service', 'environment']):
-            if (service, env) not in self.models:
-                continue
-                
-            X = group[['response_time']].copy()
-            X['error_flag'] = group['status_code'].apply(lambda x: 1 if x >= 400 else 0)
-            
-            # Predict anomalies
-            preds = self.models[(service, env)].predict(X)
-            scores = self.models[(service, env)].decision_function(X)
-            
-            # Add results to group
-            group['anomaly_score'] = scores
-            group['is_anomaly'] = preds == -1
-            
-            # Format anomalies
-            for _, row in group[group['is_anomaly']].iterrows():
-                anomaly = row.to_dict()
-                anomaly['anomaly_type'] = self._determine_anomaly_type(row)
-                anomalies.append(anomaly)
-                
+        return self.classify(self.score(new_logs))
+    
+    def classify(self, result):
+        """Turn columnar scoring output into typed anomaly dicts"""
+        result = dict(result, anomaly_type=classify_anomalies(result))
+        anomalies = columns_to_records(result)
+        for anomaly in anomalies:
+            anomaly['is_anomaly'] = True
         return anomalies
     
+    def build_features(self, columns, stateful=True):
+        """Model input for a batch: the feature stage, or (response_time, error_flag) without one"""
+        if self.features is None:
+            return build_features(columns)
+        return self.features.transform(columns, stateful=stateful)
+    
+    def feature_stats(self):
+        return self.features.stats() if self.features is not None else None
+    
+    def score(self, new_logs):
+        """Score a batch in one pass per partition and return anomalous rows as columns"""
+        columns = to_columns(new_logs)
+        if not columns:
+            return score_batch(self.models, columns)
+        # Built once: the user-rate windows advance with every transform
+        X = self.build_features(columns)
+        # Versions saved before the fallback model existed have none
+        fallback = self.models.get(GLOBAL_KEY)
+        unmatched = Counter()
+        result = score_batch(self.models, columns, features=lambda _: X, fallback=fallback, unmatched=unmatched)
+        self._count_unmatched(unmatched, fallback is not None)
+        if self.refresher is not None:
+            self.refresher.observe(columns, X)
+        return result
+    
+    def _count_unmatched(self, unmatched, has_fallback):
+        counts = self.fallback_rows if has_fallback else self.skipped_rows
+        for key, rows in unmatched.items():
+            if key not in counts:
+                if has_fallback:
+                    self.logger.info(f"No model for {key[0]}/{key[1]}; scoring it with the fallback model")
+                else:
+                    self.logger.warning(f"No model for {key[0]}/{key[1]}; its rows are not scored")
+            counts[key] += rows
+    
+    def coverage_stats(self):
+        """Rows scored with the fallback model or skipped for lack of a model, per service/environment"""
+        return {
+            'fallback_rows': {f"{service}/{env}": rows for (service, env), rows in self.fallback_rows.items()},
+            'skipped_rows': {f"{service}/{env}": rows for (service, env), rows in self.skipped_rows.items()},
+        }
+    
     def detect_traffic_spikes(self, logs):
-        """Detect unusual traffic patterns"""
-        df = pd.DataFrame(logs)
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        spikes = []
-        
-        for (service, env), group in df.groupby(['service', 'environment']):
-            if (service, env) not in self.traffic_baselines:
-                continue
-                
-            # Use 'min' instead of deprecated 'T'
-            traffic = group.set_index('timestamp').resample('5min').size()
-            baseline = self.traffic_baselines[(service, env)]
-            
-            # Calculate z-scores
-            z_scores = (traffic - baseline['mean']) / baseline['std']
-            spike_periods = z_scores[z_scores > 3].index
-            
-            for ts in spike_periods:
-                spikes.append({
-                    'timestamp': ts.isoformat(),
-                    'service': service,
-                    'environment': env,
-                    'request_count': traffic[ts],
-                    'z_score': z_scores[ts],
-                    'anomaly_type': 'traffic_spike'
-                })
-                
-        return spikes
-    
-    def _determine_anomaly_type(self, row):
-        """Classify the type of anomaly"""
-        if row['status_code'] >= 500:
-            return 'server_error'
-        elif row['response_time'] > self.config.RESPONSE_TIME_THRESHOLD * 2:
-            return 'high_latency'
-        elif row['status_code'] >= 400:
-            return 'client_error'
-        return 'behavioral'
\ No newline at end of file
+        """Detect unusual traffic patterns.
+
+        Feeds the logs into the streaming counters and returns spikes for
+        5-minute buckets (possibly still open) that exceed their seasonal
+        expectation.
+        """
+        return self.traffic_monitor.observe(to_columns(logs))
+    
+    def detect_rate_anomalies(self, logs):
+        """Per-user and per-endpoint request rate anomalies.
+
+        Counts the logs in fixed-size decayed sketches and returns keys
+        whose short-window rate jumped above their own baseline or a
+        hard ceiling; keys are not reported again within RATE_ALERT_INTERVAL.
+        """
+        if self.rate_monitor is None:
+            return []
+        return self.rate_monitor.observe(to_columns(logs))
+    
+    def rate_stats(self):
+        return self.rate_monitor.stats() if self.rate_monitor is not None else None
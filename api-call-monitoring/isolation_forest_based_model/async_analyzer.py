@@ -0,0 +1,118 @@
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+from ai_analyzer import AIAnalyzer, build_alert_prompt, build_batch_alert_prompt, split_batch_response, fallback_alert
+from alert_cache import anomaly_signature
+
+
+class AsyncAIAnalyzer:
+    """Concurrent alert generation on top of AIAnalyzer's model.
+
+    A fixed pool of worker tasks (the concurrency limit) drains a bounded
+    queue; the producer blocks once the queue is full, which is the
+    backpressure towards the caller. Every model call has its own timeout
+    and falls back to the static alert text when it fails. In batched mode
+    each call carries up to batch_size anomalies in a single prompt.
+    Replies are shared with the wrapped analyzer's AlertCache, so cached
+    signatures never reach the model.
+
+    Models without ``generate_content_async`` run in a thread pool of the
+    analyzer's own, one thread per concurrency slot. A call that times out
+    cannot be interrupted, so it keeps its thread until the request
+    returns and later calls wait for a free one: stuck requests never add
+    up to more than ``concurrency`` threads.
+    """
+
+    def __init__(self, analyzer=None, concurrency=None, timeout=None, queue_size=None, batch_size=None):
+        self.config = Config()
+        self.analyzer = analyzer or AIAnalyzer()
+        self.concurrency = concurrency or self.config.GEMINI_CONCURRENCY
+        self.timeout = timeout or self.config.GEMINI_TIMEOUT
+        self.queue_size = queue_size or self.config.GEMINI_QUEUE_SIZE
+        self.batch_size = batch_size or self.config.GEMINI_BATCH_SIZE
+        self.stats = {'calls': 0, 'timeouts': 0, 'failures': 0, 'call_seconds': 0.0}
+        self._executor = None
+        self.logger = logging.getLogger(__name__)
+
+    def close(self):
+        """Drop queued blocking calls; calls already running finish in the background"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _generate(self, prompt):
+        model = self.analyzer.model
+        if hasattr(model, 'generate_content_async'):
+            call = model.generate_content_async(prompt)
+        else:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='gemini')
+            # Cancelling the wrapper on timeout only drops a call that has not started yet
+            call = asyncio.wrap_future(self._executor.submit(model.generate_content, prompt))
+
+        start = time.perf_counter()
+        self.stats['calls'] += 1
+        try:
+            response = await asyncio.wait_for(call, self.timeout)
+            return response.text
+        except asyncio.TimeoutError:
+            self.stats['timeouts'] += 1
+            self.logger.error(f"Gemini call timed out after {self.timeout}s")
+        except Exception as e:
+            self.stats['failures'] += 1
+            self.logger.error(f"Failed to generate alert: {str(e)}")
+        finally:
+            self.stats['call_seconds'] += time.perf_counter() - start
+        return None
+
+    async def alert(self, anomaly):
+        signature = anomaly_signature(anomaly)
+        text = self.analyzer.cache.get(signature)
+        if text is None:
+            text = await self._generate(build_alert_prompt(anomaly))
+            if text:
+                self.analyzer.cache.put(signature, text)
+        return text or fallback_alert(anomaly)
+
+    async def alert_batch(self, anomalies):
+        signatures = [anomaly_signature(anomaly) for anomaly in anomalies]
+        messages = [self.analyzer.cache.get(signature) for signature in signatures]
+        missing = [i for i, message in enumerate(messages) if message is None]
+        if missing:
+            text = await self._generate(build_batch_alert_prompt([anomalies[i] for i in missing]))
+            for i, message in zip(missing, split_batch_response(text, len(missing))):
+                if message:
+                    messages[i] = message
+                    self.analyzer.cache.put(signatures[i], message)
+        return [message or fallback_alert(anomaly) for message, anomaly in zip(messages, anomalies)]
+
+    async def generate_alerts_async(self, anomalies, batched=None):
+        """Return one alert message per anomaly, in input order"""
+        batched = self.config.GEMINI_BATCH_MODE if batched is None else batched
+        size = self.batch_size if batched else 1
+        chunks = [anomalies[i:i + size] for i in range(0, len(anomalies), size)]
+        results = [None] * len(chunks)
+        queue = asyncio.Queue(maxsize=self.queue_size)
+
+        async def worker():
+            while True:
+                index = await queue.get()
+                if index is None:
+                    return
+                chunk = chunks[index]
+                results[index] = await self.alert_batch(chunk) if batched else [await self.alert(chunk[0])]
+
+        workers = [asyncio.create_task(worker()) for _ in range(min(self.concurrency, len(chunks)))]
+        for index in range(len(chunks)):
+            await queue.put(index)
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+        return [message for chunk in results for message in chunk]
+
+    def generate_alerts(self, anomalies, batched=None):
+        if not anomalies:
+            return []
+        return asyncio.run(self.generate_alerts_async(anomalies, batched))
@@ -0,0 +1,121 @@
+import warnings
+import numpy as np
+import pandas as pd
+
+PARTITION_COLUMNS = ('service', 'environment')
+
+
+def to_columns(logs):
+    """Convert a list of log dicts (or a DataFrame or Arrow table) into a dict of NumPy columns"""
+    if isinstance(logs, dict):
+        return {name: np.asarray(values) for name, values in logs.items()}
+    if hasattr(logs, 'column_names'):
+        return {name: logs.column(name).to_numpy() for name in logs.column_names}
+    if not isinstance(logs, pd.DataFrame):
+        logs = pd.DataFrame(logs)
+    return {name: logs[name].to_numpy() for name in logs.columns}
+
+
+def columns_to_records(columns):
+    """Convert columnar results back into a list of plain-Python dicts"""
+    names = list(columns)
+    if not names:
+        return []
+    values = [np.asarray(columns[name]).tolist() for name in names]
+    return [dict(zip(names, row)) for row in zip(*values)]
+
+
+def columns_to_recarray(columns):
+    """Convert columnar results into a NumPy record array"""
+    names = list(columns)
+    return np.rec.fromarrays([np.asarray(columns[name]) for name in names], names=names)
+
+
+def build_features(columns):
+    """Build the (response_time, error_flag) feature matrix the models are trained on"""
+    response_time = np.asarray(columns['response_time'], dtype=np.float64)
+    error_flag = np.asarray(columns['status_code']) >= 400
+    return np.column_stack((response_time, error_flag.astype(np.float64)))
+
+
+def iter_partitions(columns):
+    """Yield ((service, environment), row_indices) for each partition.
+
+    Partitions come out in sorted key order and rows keep their original
+    order inside a partition, matching ``DataFrame.groupby``.
+    """
+    service_codes, services = pd.factorize(columns['service'], sort=True)
+    env_codes, environments = pd.factorize(columns['environment'], sort=True)
+    codes = service_codes.astype(np.int64) * len(environments) + env_codes
+    if len(codes) == 0:
+        return
+
+    order = np.argsort(codes, kind='stable')
+    sorted_codes = codes[order]
+    bounds = np.flatnonzero(np.diff(sorted_codes)) + 1
+    starts = np.concatenate(([0], bounds))
+    ends = np.concatenate((bounds, [len(order)]))
+
+    for start, end in zip(starts, ends):
+        code = sorted_codes[start]
+        key = (services[code // len(environments)], environments[code % len(environments)])
+        yield key, order[start:end]
+
+
+def decision_scores(model, X):
+    """Score X once; negative scores are the anomalies ``predict`` would return"""
+    if hasattr(model, 'feature_names_in_'):
+        # Models fitted on a DataFrame warn when given a bare array
+        with warnings.catch_warnings():
+            warnings.filterwarnings('ignore', message='X does not have valid feature names')
+            return model.decision_function(X)
+    return model.decision_function(X)
+
+
+def score_batch(models, columns, features=build_features, fallback=None, unmatched=None):
+    """Score every partition once and return the anomalous rows as columns.
+
+    Rows whose (service, environment) has no model are scored with
+    ``fallback``, or skipped without one; ``unmatched``, a Counter if
+    given, gets the number of such rows per key. The result
+    holds every input column for the anomalous rows plus ``anomaly_score``
+    and ``error_rate``, the share of 4xx/5xx rows in the row's partition
+    of this batch.
+    """
+    if not columns or len(next(iter(columns.values()))) == 0:
+        result = {name: col[:0] for name, col in columns.items()}
+        result['anomaly_score'] = np.empty(0, dtype=np.float64)
+        result['error_rate'] = np.empty(0, dtype=np.float64)
+        return result
+
+    X = features(columns)
+    selected = []
+    scores = []
+    error_rates = []
+    for key, idx in iter_partitions(columns):
+        model = models.get(key)
+        if model is None:
+            if unmatched is not None:
+                unmatched[key] += len(idx)
+            model = fallback
+        if model is None:
+            continue
+        part_scores = decision_scores(model, X[idx])
+        mask = part_scores < 0
+        selected.append(idx[mask])
+        scores.append(part_scores[mask])
+        error_rates.append(np.full(mask.sum(), X[idx, 1].mean()))
+
+    if selected:
+        rows = np.concatenate(selected)
+        anomaly_scores = np.concatenate(scores)
+        row_error_rates = np.concatenate(error_rates)
+    else:
+        rows = np.empty(0, dtype=np.int64)
+        anomaly_scores = np.empty(0, dtype=np.float64)
+        row_error_rates = np.empty(0, dtype=np.float64)
+
+    result = {name: col[rows] for name, col in columns.items()}
+    result['anomaly_score'] = anomaly_scores
+    result['error_rate'] = row_error_rates
+    return result
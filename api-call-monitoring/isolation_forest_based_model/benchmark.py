@@ -0,0 +1,599 @@
+import os
+import json
+import logging
+import tempfile
+import threading
+import http.client
+import argparse
+import time
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from log_generator import APILogGenerator
+from anomaly_detector import AnomalyDetector
+from ai_analyzer import AIAnalyzer, StubGenerativeModel
+from async_analyzer import AsyncAIAnalyzer
+from batch_scorer import to_columns, columns_to_records
+from traffic_monitor import StreamingSpikeDetector, to_epoch_seconds
+from rate_monitor import RateAnomalyDetector
+from monitoring_system import MonitoringSystem
+from hierarchical_model import HierarchicalModels, model_nbytes
+from model_registry import ModelRegistry
+from sharded_detection import ShardedDetector, detect_shard
+from http_ingestion import HttpIngestor
+from evaluation import (
+    load_dataset, replay_detector, ReplaySource, detection_report, latency_summary,
+    peak_rss_mb, write_results, compare_results
+)
+
+
+def legacy_anomaly_type(detector, row):
+    if row['status_code'] >= 500:
+        return 'server_error'
+    elif row['response_time'] > detector.config.RESPONSE_TIME_THRESHOLD * 2:
+        return 'high_latency'
+    elif row['status_code'] >= 400:
+        return 'client_error'
+    return 'behavioral'
+
+
+def legacy_detect_anomalies(detector, new_logs):
+    """The original pandas path: per-row apply, predict + decision_function, iterrows"""
+    anomalies = []
+    df = pd.DataFrame(new_logs)
+    for (service, env), group in df.groupby(['service', 'environment']):
+        if (service, env) not in detector.models:
+            continue
+        X = group[['response_time']].copy()
+        X['error_flag'] = group['status_code'].apply(lambda x: 1 if x >= 400 else 0)
+        X = X.to_numpy()
+        preds = detector.models[(service, env)].predict(X)
+        scores = detector.models[(service, env)].decision_function(X)
+        group['anomaly_score'] = scores
+        group['is_anomaly'] = preds == -1
+        for _, row in group[group['is_anomaly']].iterrows():
+            anomaly = row.to_dict()
+            anomaly['anomaly_type'] = legacy_anomaly_type(detector, row)
+            anomalies.append(anomaly)
+    return anomalies
+
+
+def _throughput(fn, rows, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return rows / best, best
+
+
+def bench_scoring(args):
+    generator = APILogGenerator()
+    detector = AnomalyDetector()
+    # The legacy path only knows (response_time, error_flag); compare all paths on that model
+    detector.features = None
+    detector.train_models(generator.generate_logs(count=args.train_rows))
+    logs = generator.generate_logs(count=args.rows, anomaly_ratio=0.05)
+
+    paths = {
+        'legacy': lambda: legacy_detect_anomalies(detector, logs),
+        'detect_anomalies': lambda: detector.detect_anomalies(logs),
+        'score (columnar)': lambda: detector.score(logs),
+    }
+    print(f"Scoring {args.rows} rows, best of {args.repeats}")
+    baseline = None
+    for name, fn in paths.items():
+        rate, seconds = _throughput(fn, args.rows, args.repeats)
+        baseline = baseline or rate
+        print(f"{name:>18}: {rate:>12,.0f} rows/sec  {seconds * 1000:>9.1f} ms  x{rate / baseline:.1f}")
+
+
+def bench_analyzer(args):
+    anomalies = APILogGenerator().generate_logs(count=args.anomalies, anomaly_ratio=1.0)
+    for anomaly in anomalies:
+        anomaly['anomaly_type'] = 'high_latency'
+
+    print(f"Alerting on {args.anomalies} anomalies, stub latency {args.latency * 1000:.0f}ms")
+    runs = {
+        'serial': lambda a: [a.generate_alert_message(x) for x in anomalies],
+        'async': lambda a: AsyncAIAnalyzer(a, concurrency=args.concurrency).generate_alerts(anomalies, batched=False),
+        'async batched': lambda a: AsyncAIAnalyzer(
+            a, concurrency=args.concurrency, batch_size=args.batch_size
+        ).generate_alerts(anomalies, batched=True),
+    }
+    for name, run in runs.items():
+        if name == 'serial' and args.skip_serial:
+            continue
+        model = StubGenerativeModel(latency=args.latency)
+        start = time.perf_counter()
+        run(AIAnalyzer(model=model))
+        seconds = time.perf_counter() - start
+        print(f"{name:>14}: {args.anomalies / seconds:>9,.1f} alerts/sec  {seconds:>7.2f}s  {model.calls} model calls")
+
+
+def bench_generator(args):
+    generator = APILogGenerator(seed=args.seed)
+    print(f"Generating logs, {args.rows} rows in bulk mode")
+    start = time.perf_counter()
+    generator.generate_logs(count=args.dict_rows)
+    seconds = time.perf_counter() - start
+    print(f"{'generate_logs':>16}: {args.dict_rows / seconds:>12,.0f} rows/sec")
+    start = time.perf_counter()
+    generator.generate_frame(count=args.rows)
+    seconds = time.perf_counter() - start
+    print(f"{'generate_frame':>16}: {args.rows / seconds:>12,.0f} rows/sec")
+
+
+def bench_spikes(args):
+    generator = APILogGenerator(seed=args.seed)
+    profile = generator.config.TRAFFIC_PROFILE
+    start = datetime.now().replace(microsecond=0) - timedelta(seconds=args.seconds)
+
+    history, _ = generator.generate_event_stream(
+        start - timedelta(days=args.history_days), args.history_days * 86400,
+        dict(profile, incidents=[]), resolution=10
+    )
+    monitor = StreamingSpikeDetector()
+    monitor.fit(to_columns(history))
+    events, incidents = generator.generate_event_stream(start, args.seconds, profile)
+    print(f"Seeded from {len(history):,} historical events; replaying {len(events):,} events "
+          f"in {args.batch_seconds}s micro-batches")
+
+    columns = to_columns(events)
+    epochs = to_epoch_seconds(columns['timestamp'])
+    bounds = np.searchsorted(epochs, np.arange(epochs[0], epochs[-1] + args.batch_seconds, args.batch_seconds))
+    detections = []
+    elapsed = 0.0
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        if lo == hi:
+            continue
+        batch = {name: col[lo:hi] for name, col in columns.items()}
+        t0 = time.perf_counter()
+        spikes = monitor.observe(batch)
+        elapsed += time.perf_counter() - t0
+        detections.extend((pd.Timestamp(epochs[hi - 1], unit='s'), spike) for spike in spikes)
+
+    matched = set()
+    for incident in (i for i in incidents if i['type'] == 'traffic_spike'):
+        begin, end = pd.Timestamp(incident['start_time']), pd.Timestamp(incident['end_time'])
+        hits = [
+            (seen_at, n) for n, (seen_at, spike) in enumerate(detections)
+            if (spike['service'], spike['environment']) == (incident['service'], incident['environment'])
+            and begin.floor('5min') <= pd.Timestamp(spike['timestamp']) < end
+        ]
+        matched.update(n for _, n in hits)
+        latency = f"{(hits[0][0] - begin).total_seconds():.0f}s" if hits else "missed"
+        print(f"incident {incident['incident_id']} {incident['service']}/{incident['environment']} "
+              f"x{incident.get('multiplier')}: detection latency {latency}")
+    print(f"false positives: {len(detections) - len(matched)}, "
+          f"throughput {len(events) / elapsed:,.0f} events/sec")
+
+
+def _user_stream(generator, rng, rows, users, seconds, storm_qps, start):
+    """Uniform traffic from ``users`` distinct users plus one user storming user-service/aws-cloud"""
+    offsets = np.sort(rng.random(rows) * seconds)
+    storm = start + seconds / 2 + np.sort(rng.random(rng.poisson(storm_qps * 300)) * 300)
+    n_storm = len(storm)
+    endpoints = np.array([generator.endpoints[s] for s in generator.services], dtype=object)
+    service_idx = rng.integers(0, len(generator.services), rows)
+    columns = {
+        'timestamp': np.concatenate((start + offsets, storm)),
+        'service': np.concatenate((np.array(generator.services, dtype=object)[service_idx],
+                                   np.full(n_storm, 'user-service', dtype=object))),
+        'environment': np.concatenate((np.array(generator.environments, dtype=object)[
+                                           rng.integers(0, len(generator.environments), rows)],
+                                       np.full(n_storm, 'aws-cloud', dtype=object))),
+        'user_id': np.concatenate((np.array([f"user_{n}" for n in rng.integers(0, users, rows)], dtype=object),
+                                   np.full(n_storm, 'storm-user', dtype=object))),
+        'endpoint': np.concatenate((endpoints[service_idx, rng.integers(0, endpoints.shape[1], rows)],
+                                    np.full(n_storm, '/users/search', dtype=object))),
+    }
+    order = np.argsort(columns['timestamp'], kind='stable')
+    columns = {name: values[order] for name, values in columns.items()}
+    epochs = columns['timestamp']
+    columns['timestamp'] = np.datetime_as_string((epochs * 1e6).astype('datetime64[us]'), unit='us').astype(object)
+    return columns, epochs
+
+
+def bench_rates(args):
+    generator = APILogGenerator(seed=args.seed)
+    start = datetime.now().replace(microsecond=0).timestamp() - args.seconds
+    for users in (int(n) for n in args.users.split(',')):
+        rng = np.random.default_rng(args.seed)
+        columns, epochs = _user_stream(generator, rng, args.rows, users, args.seconds, args.storm_qps, start)
+        storm_start = start + args.seconds / 2
+        monitor = RateAnomalyDetector()
+        bounds = np.searchsorted(epochs, np.arange(epochs[0], epochs[-1] + args.batch_seconds, args.batch_seconds))
+        anomalies = []
+        elapsed = 0.0
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            if lo == hi:
+                continue
+            batch = {name: col[lo:hi] for name, col in columns.items()}
+            t0 = time.perf_counter()
+            found = monitor.observe(batch)
+            elapsed += time.perf_counter() - t0
+            anomalies.extend((epochs[hi - 1], anomaly) for anomaly in found)
+
+        hits = [seen_at for seen_at, anomaly in anomalies if anomaly.get('user_id') == 'storm-user']
+        latency = f"{hits[0] - storm_start:.0f}s" if hits else "missed"
+        stats = monitor.stats()
+        # The stream itself dominates process RSS, so the detector's state is reported instead
+        print(f"{len(set(columns['user_id'])):>9,} distinct users: sketches {stats['sketch_mb']}MB, "
+              f"tracked keys {sum(stats['heavy_hitters'].values()) + stats['reported_keys']}, "
+              f"{len(epochs) / elapsed:>9,.0f} rows/s, storm detected after {latency}, "
+              f"other anomalies {len(anomalies) - len(hits)}")
+
+
+def _replay_data(args, generator):
+    """(training frame, labelled replay frame) from files or the event-stream generator"""
+    start = datetime.now().replace(microsecond=0) - timedelta(seconds=args.seconds)
+    if args.dataset:
+        frame = load_dataset(args.dataset)
+    else:
+        frame, _ = generator.generate_event_stream(start, args.seconds)
+    if args.train:
+        history = load_dataset(args.train)
+    else:
+        history, _ = generator.generate_event_stream(
+            start - timedelta(days=args.history_days), args.history_days * 86400,
+            dict(generator.config.TRAFFIC_PROFILE, incidents=[]), resolution=10
+        )
+    return history.drop(columns=['label', 'incident_id'], errors='ignore'), frame
+
+
+def _replay_system(args, detector, frame):
+    """Push the frame through MonitoringSystem's threaded pipeline with a stub LLM.
+
+    Scoring stays in this process, and refreshed models go to a temporary
+    registry, never to the real MODEL_DIR.
+    """
+    model = StubGenerativeModel(latency=args.latency)
+    source = ReplaySource(frame, args.batch_size)
+    with tempfile.TemporaryDirectory() as root:
+        system = MonitoringSystem(detector=detector, analyzer=AIAnalyzer(model=model), ingestor=source,
+                                  workers=1, registry=ModelRegistry(root))
+        pipeline = system.build_pipeline(interval=0.05)
+
+        start = time.perf_counter()
+        pipeline.start()
+        idle_checks = 0
+        # Two consecutive idle checks guard against an item caught between queue and stage
+        while idle_checks < 2:
+            time.sleep(0.05)
+            idle_checks = idle_checks + 1 if source.exhausted and pipeline.idle() else 0
+        seconds = time.perf_counter() - start
+        pipeline.stop()
+        system.alerter.close()
+        if detector.refresher is not None:
+            detector.refresher.stop()
+
+    stages = pipeline.metrics()
+    return {
+        'rows_per_sec': round(len(frame) / seconds, 1),
+        'seconds': round(seconds, 3),
+        'batches': source.emitted,
+        # Every batch passes classify; only batches with anomalies reach alert
+        'batch_latency_ms': {
+            'p50_ms': stages['classify']['end_to_end_p50'] * 1000,
+            'p99_ms': stages['classify']['end_to_end_p99'] * 1000
+        },
+        'alert_latency_ms': {
+            'p50_ms': stages['alert']['end_to_end_p50'] * 1000,
+            'p99_ms': stages['alert']['end_to_end_p99'] * 1000
+        },
+        'model_calls': model.calls,
+        'alert_cache': system.analyzer.cache.stats(),
+        'dedup': system.deduplicator.stats(),
+        'stages': stages
+    }
+
+
+def bench_replay(args):
+    logging.basicConfig(level=logging.ERROR)
+    generator = APILogGenerator(seed=args.seed)
+    history, frame = _replay_data(args, generator)
+    print(f"Training on {len(history):,} rows, replaying {len(frame):,} rows in batches of {args.batch_size}")
+
+    detector = AnomalyDetector()
+    start = time.perf_counter()
+    detector.train_models(history)
+    train_seconds = time.perf_counter() - start
+    del history
+
+    start = time.perf_counter()
+    predicted, batch_seconds = replay_detector(detector, frame, args.batch_size)
+    seconds = time.perf_counter() - start
+    results = {
+        'train_seconds': round(train_seconds, 3),
+        'detector': {
+            'rows_per_sec': round(len(frame) / seconds, 1),
+            'seconds': round(seconds, 3),
+            'batch_latency_ms': latency_summary(batch_seconds),
+            'features': detector.feature_stats(),
+            'peak_rss_mb': peak_rss_mb()
+        }
+    }
+    if 'label' in frame:
+        results['quality'] = detection_report(frame['label'].to_numpy(), predicted)
+    if not args.skip_system:
+        # Fresh spike counters: the detector pass already consumed this stream
+        detector.traffic_monitor.counters.clear()
+        results['system'] = _replay_system(args, detector, frame)
+        results['system']['peak_rss_mb'] = peak_rss_mb()
+
+    print(json.dumps(results, indent=2, default=str))
+    params = {name: value for name, value in vars(args).items() if name != 'func'}
+    if args.output:
+        document = write_results(args.output, 'replay', params, results)
+        print(f"Results written to {args.output}")
+    else:
+        document = {'results': results}
+    if args.baseline:
+        with open(args.baseline) as f:
+            changes = compare_results(json.load(f), document)
+        for key, change in changes.items():
+            if change['change']:
+                print(f"{key:>60}: {change['baseline']:>12} -> {change['current']:>12} ({change['change']:+.1%})")
+
+
+def _spread_services(columns, copies, rng, prefix=''):
+    """Relabel generated rows over ``copies`` synthetic services per base service"""
+    suffix = rng.integers(0, copies, len(columns['service']))
+    columns['service'] = np.array([f"{prefix}{service}-{n}" for service, n in zip(columns['service'], suffix)],
+                                  dtype=object)
+    return columns
+
+
+def bench_models(args):
+    logging.basicConfig(level=logging.ERROR)
+    generator = APILogGenerator(seed=args.seed)
+    # A separate stream: the generator's own draws would pick correlated suffixes
+    rng = np.random.default_rng(args.seed + 1)
+    copies = max(1, args.services // len(generator.services))
+    train = _spread_services(generator.generate_columns(args.train_rows, anomaly_ratio=0), copies, rng)
+    test = _spread_services(generator.generate_columns(args.rows, anomaly_ratio=0.02, with_labels=True), copies, rng)
+    # Services that never appeared in training
+    unseen = _spread_services(
+        generator.generate_columns(args.rows // 10, anomaly_ratio=0.02, with_labels=True), 2, rng, prefix='new-'
+    )
+    test = {name: np.concatenate((test[name], unseen[name])) for name in test}
+    labels = test.pop('label')
+    is_new = np.char.startswith(test['service'].astype(str), 'new-')
+    test['row_id'] = np.arange(len(labels))
+    n_keys = len(set(zip(train['service'], train['environment'])))
+    print(f"{n_keys} service-environment keys, {args.train_rows:,} training rows, "
+          f"scoring {len(labels):,} rows ({is_new.sum():,} from unseen services)")
+
+    for mode in args.modes.split(','):
+        detector = AnomalyDetector()
+        detector.config.MODEL_MODE = mode
+        detector.config.MODEL_MEMORY_BUDGET_MB = args.budget_mb
+        start = time.perf_counter()
+        detector.train_models(train)
+        train_seconds = time.perf_counter() - start
+        if isinstance(detector.models, HierarchicalModels):
+            nbytes = detector.models.nbytes()
+        else:
+            nbytes = sum(model_nbytes(model) for model in detector.models.values())
+
+        start = time.perf_counter()
+        result = detector.score(test)
+        score_seconds = time.perf_counter() - start
+        flagged = np.zeros(len(labels), dtype=bool)
+        flagged[result['row_id']] = True
+        # traffic_spike labels mark no change in the row itself
+        anomalous = np.isin(labels, ['response_time', 'error_rate'])
+        seen = ~is_new
+        print(f"{mode:>13}: train {train_seconds:6.1f}s  models {nbytes / 2**20:7.1f}MB  "
+              f"score {len(labels) / score_seconds:>9,.0f} rows/s  "
+              f"recall {flagged[anomalous & seen].mean():.3f}  false positive rate {flagged[(labels == 'normal') & seen].mean():.4f}  "
+              f"unseen-service recall {flagged[anomalous & is_new].mean():.3f}")
+
+
+def _run_sharded(sharded, batches, kill_at=None):
+    """Push every batch through, optionally killing shard 0's worker after ``kill_at`` submissions"""
+    ids = []
+    for n, batch in enumerate(batches):
+        ids.append(sharded.submit(batch))
+        if n == kill_at:
+            sharded.workers[0][0].kill()
+    return sum(len(sharded.result(batch_id)) for batch_id in ids)
+
+
+def bench_shards(args):
+    logging.basicConfig(level=logging.ERROR)
+    generator = APILogGenerator(seed=args.seed)
+    rng = np.random.default_rng(args.seed + 1)
+    copies = max(1, args.services // len(generator.services))
+    train = _spread_services(generator.generate_columns(args.train_rows, anomaly_ratio=0), copies, rng)
+    test = _spread_services(generator.generate_columns(args.rows, anomaly_ratio=0.02), copies, rng)
+    batches = [{name: col[lo:lo + args.batch_size] for name, col in test.items()}
+               for lo in range(0, args.rows, args.batch_size)]
+
+    with tempfile.TemporaryDirectory() as root:
+        registry = ModelRegistry(root)
+        detector = AnomalyDetector()
+        detector.config.MODEL_MODE = args.mode
+        detector.train_models(train)
+        detector.save_models(registry)
+        print(f"{len(registry.version_keys(registry.load()[2]))} service-environment keys ({args.mode}), "
+              f"{args.rows:,} rows in batches of {args.batch_size}, {os.cpu_count()} CPUs")
+
+        detector = AnomalyDetector()
+        detector.load_models(registry)
+        detect_shard(detector, batches[0])
+        start = time.perf_counter()
+        found = sum(len(detect_shard(detector, batch)) for batch in batches)
+        single = args.rows / (time.perf_counter() - start)
+        print(f"{'in-process':>12}: {single:>9,.0f} rows/s  anomalies {found}")
+
+        base = None
+        for workers in (int(n) for n in args.workers.split(',')):
+            with ShardedDetector(workers, registry) as sharded:
+                sharded.detect(batches[0])  # worker start-up and lazy model loads
+                start = time.perf_counter()
+                found = _run_sharded(sharded, batches)
+                rate = args.rows / (time.perf_counter() - start)
+            base = base or rate
+            print(f"{workers:>4} workers: {rate:>9,.0f} rows/s  efficiency {rate / (workers * base):.2f}  "
+                  f"anomalies {found}")
+
+        if args.kill:
+            with ShardedDetector(workers, registry) as sharded:
+                sharded.detect(batches[0])
+                found = _run_sharded(sharded, batches, kill_at=len(batches) // 2)
+                metrics = sharded.metrics()
+            print(f"killed shard 0 mid-run: {metrics['restarts']} restart(s), {metrics['dropped_parts']} dropped "
+                  f"sub-batches, anomalies {found}")
+
+
+def _post_bodies(port, bodies, latencies, throttled):
+    """One client: post every body over a keep-alive connection, retrying on 429"""
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    for body in bodies:
+        while True:
+            start = time.perf_counter()
+            connection.request('POST', '/ingest', body, {'Content-Type': 'application/x-ndjson'})
+            response = connection.getresponse()
+            response.read()
+            latencies.append(time.perf_counter() - start)
+            if response.status != 429:
+                break
+            throttled.append(1)
+            time.sleep(0.01)
+    connection.close()
+
+
+def bench_http(args):
+    logging.basicConfig(level=logging.ERROR)
+    generator = APILogGenerator(seed=args.seed)
+    records = columns_to_records(generator.generate_columns(args.records))
+    lines = [json.dumps(record).encode() for record in records]
+    bodies = [b'\n'.join(lines[lo:lo + args.request_records]) for lo in range(0, len(lines), args.request_records)]
+    print(f"{len(records):,} records in {len(bodies):,} NDJSON requests of {args.request_records} from "
+          f"{args.clients} clients, detector cost {args.consumer_ms}ms per batch")
+
+    ingestor = HttpIngestor(port=0, queue_size=args.queue_size).start()
+    consumed, batch_sizes, depths = [0], [], []
+
+    def consume():
+        while consumed[0] < len(records):
+            batch = ingestor.poll()
+            if batch:
+                batch_sizes.append(len(batch))
+                consumed[0] += len(batch)
+                depths.append(len(ingestor.queue))
+                time.sleep(args.consumer_ms / 1000)
+
+    consumer = threading.Thread(target=consume, daemon=True)
+    latencies, throttled = [], []
+    clients = [threading.Thread(target=_post_bodies, args=(ingestor.port, bodies[n::args.clients], latencies, throttled))
+               for n in range(args.clients)]
+    start = time.perf_counter()
+    consumer.start()
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    consumer.join()
+    seconds = time.perf_counter() - start
+    metrics = ingestor.metrics()
+    ingestor.close()
+
+    print(f"ingested {metrics['accepted']:,} records in {seconds:.2f}s: {metrics['accepted'] / seconds:,.0f} records/s, "
+          f"{metrics['requests'] / seconds:,.0f} requests/s")
+    print(f"429 responses {len(throttled)}, request latency {latency_summary(latencies)}")
+    print(f"micro-batches {len(batch_sizes)}, mean size {np.mean(batch_sizes):.0f}, "
+          f"max queue depth {max(depths)}/{args.queue_size}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Monitoring pipeline benchmarks')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    scoring = subparsers.add_parser('scoring', help='Batch scoring throughput vs the legacy pandas path')
+    scoring.add_argument('--rows', type=int, default=50000)
+    scoring.add_argument('--train-rows', type=int, default=5000)
+    scoring.add_argument('--repeats', type=int, default=3)
+    scoring.set_defaults(func=bench_scoring)
+
+    analyzer = subparsers.add_parser('analyzer', help='Alert generation throughput against a stub model')
+    analyzer.add_argument('--anomalies', type=int, default=200)
+    analyzer.add_argument('--latency', type=float, default=0.2, help='Stub model latency in seconds')
+    analyzer.add_argument('--concurrency', type=int, default=8)
+    analyzer.add_argument('--batch-size', type=int, default=20)
+    analyzer.add_argument('--skip-serial', action='store_true')
+    analyzer.set_defaults(func=bench_analyzer)
+
+    gen = subparsers.add_parser('generator', help='Synthetic log generation throughput')
+    gen.add_argument('--rows', type=int, default=1_000_000)
+    gen.add_argument('--dict-rows', type=int, default=20000)
+    gen.add_argument('--seed', type=int, default=42)
+    gen.set_defaults(func=bench_generator)
+
+    spikes = subparsers.add_parser('spikes', help='Spike detection latency on a labelled event stream')
+    spikes.add_argument('--seconds', type=int, default=3600)
+    spikes.add_argument('--history-days', type=int, default=3)
+    spikes.add_argument('--batch-seconds', type=int, default=5)
+    spikes.add_argument('--seed', type=int, default=42)
+    spikes.set_defaults(func=bench_spikes)
+
+    rates = subparsers.add_parser('rates', help='Per-user rate anomalies and sketch memory vs distinct users')
+    rates.add_argument('--users', default='10000,1000000', help='Comma-separated distinct user counts')
+    rates.add_argument('--rows', type=int, default=2_000_000)
+    rates.add_argument('--seconds', type=int, default=3600)
+    rates.add_argument('--batch-seconds', type=int, default=5)
+    rates.add_argument('--storm-qps', type=float, default=20, help='Request rate of the one storming user')
+    rates.add_argument('--seed', type=int, default=42)
+    rates.set_defaults(func=bench_rates)
+
+    shards = subparsers.add_parser('shards', help='Sharded multi-process detection, 1 to N workers')
+    shards.add_argument('--workers', default='1,2,4', help='Comma-separated worker counts')
+    shards.add_argument('--services', type=int, default=16)
+    shards.add_argument('--mode', default='per_key', help='MODEL_MODE of the trained models')
+    shards.add_argument('--train-rows', type=int, default=100_000)
+    shards.add_argument('--rows', type=int, default=200_000)
+    shards.add_argument('--batch-size', type=int, default=2000)
+    shards.add_argument('--kill', action='store_true', help='Also kill a worker mid-run and check recovery')
+    shards.add_argument('--seed', type=int, default=42)
+    shards.set_defaults(func=bench_shards)
+
+    ingest = subparsers.add_parser('http', help='HTTP NDJSON ingestion throughput and backpressure')
+    ingest.add_argument('--records', type=int, default=200_000)
+    ingest.add_argument('--request-records', type=int, default=500, help='Records per POST body')
+    ingest.add_argument('--clients', type=int, default=4)
+    ingest.add_argument('--queue-size', type=int, default=64, help='INGEST_HTTP_QUEUE_SIZE')
+    ingest.add_argument('--consumer-ms', type=float, default=0, help='Simulated detector time per micro-batch')
+    ingest.add_argument('--seed', type=int, default=42)
+    ingest.set_defaults(func=bench_http)
+
+    replay = subparsers.add_parser('replay', help='Detection quality and throughput on a labelled replay')
+    replay.add_argument('--dataset', help='CSV/Parquet to replay, with an optional label column '
+                                          '(default: a generated event stream with incidents)')
+    replay.add_argument('--train', help='CSV/Parquet to train on (default: generated incident-free history)')
+    replay.add_argument('--seconds', type=int, default=3600, help='Length of the generated replay stream')
+    replay.add_argument('--history-days', type=int, default=3)
+    replay.add_argument('--batch-size', type=int, default=500)
+    replay.add_argument('--latency', type=float, default=0.05, help='Stub model latency in seconds')
+    replay.add_argument('--seed', type=int, default=42)
+    replay.add_argument('--skip-system', action='store_true', help='Only replay through AnomalyDetector')
+    replay.add_argument('--output', help='Write machine-readable results to this JSON file')
+    replay.add_argument('--baseline', help='Earlier --output file to compare against')
+    replay.set_defaults(func=bench_replay)
+
+    models = subparsers.add_parser('models', help='Per-key vs hierarchical models over many services')
+    models.add_argument('--services', type=int, default=100)
+    models.add_argument('--train-rows', type=int, default=400_000)
+    models.add_argument('--rows', type=int, default=100_000)
+    models.add_argument('--modes', default='per_key,hierarchical')
+    models.add_argument('--budget-mb', type=float, default=64, help='MODEL_MEMORY_BUDGET_MB for hierarchical mode')
+    models.add_argument('--seed', type=int, default=42)
+    models.set_defaults(func=bench_models)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
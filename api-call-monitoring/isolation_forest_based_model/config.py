@@ -9,17 +9,165 @@ class Config:
     NORMAL_TRAFFIC_STD = 20
     ANOMALY_RATIO = 0.01  # 1% anomalies in generated logs
     
+    # Event-stream Traffic Model (APILogGenerator.generate_event_stream)
+    TRAFFIC_PROFILE = {
+        "service_qps": {"user-service": 4.0, "payment-service": 1.5, "inventory-service": 3.0, "auth-service": 6.0},
+        "environment_share": {"on-prem": 0.4, "aws-cloud": 0.3, "azure-cloud": 0.15, "gcp-cloud": 0.15},
+        "diurnal_amplitude": 0.6,  # +/- share of the mean rate over the day
+        "peak_hour": 14,
+        "weekend_factor": 0.5,
+        "burst_rate_per_hour": 0.5,  # unlabelled short bursts across all keys
+        "burst_multiplier": 2.0,
+        "burst_seconds": 30,
+        # Offsets in seconds from the stream start
+        "incidents": [
+            {"type": "traffic_spike", "service": "payment-service", "environment": "aws-cloud",
+             "start": 1200, "duration": 600, "multiplier": 8},
+            {"type": "high_latency", "service": "inventory-service", "environment": "on-prem",
+             "start": 2400, "duration": 300, "latency_multiplier": 12},
+            {"type": "server_error", "service": "auth-service", "environment": "gcp-cloud",
+             "start": 3000, "duration": 300, "error_rate": 0.5},
+            {"type": "user_storm", "service": "user-service", "environment": "aws-cloud",
+             "start": 1800, "duration": 300, "user_id": "user_7", "endpoint": "/users/search", "qps": 5},
+        ],
+    }
+    
     # Anomaly Detection Settings
     ISOLATION_FOREST_ESTIMATORS = 100
     CONTAMINATION = 0.01
+    RANDOM_SEED = 42
+    TRAINING_WORKERS = int(os.getenv('TRAINING_WORKERS', '1'))  # >1 fits partitions in a process pool
+    TRAINING_TRACE_MEMORY = False  # per-partition tracemalloc peak; slows fitting ~10x
+    
+    # Hierarchical Models (hierarchical_model.py)
+    # per_key: one IsolationForest per service-environment, plus a shared fallback model for
+    # keys not seen in training (e.g. the Django API's own logs) until refresh trains their own.
+    # hierarchical: one shared model with a score offset per key, plus dedicated models for
+    # the largest keys while they fit in MODEL_MEMORY_BUDGET_MB; unseen keys use the shared model
+    MODEL_MODE = os.getenv('MODEL_MODE', 'per_key')
+    MODEL_MEMORY_BUDGET_MB = float(os.getenv('MODEL_MEMORY_BUDGET_MB', '64'))
+    FALLBACK_MODEL_ROWS = 200000  # per_key mode: training rows of the fallback model, sampled evenly across keys
+    HIERARCHICAL_GLOBAL_ROWS = 200000  # training rows of the shared model, sampled evenly across keys
+    HIERARCHICAL_CALIBRATION_ROWS = 5000  # rows per key scored to set its offset
+    HIERARCHICAL_PRIOR_ROWS = 200  # keys with few rows lean on the shared model's threshold
+    HIERARCHICAL_DEDICATED_MIN_ROWS = 5000  # smaller keys never get a dedicated model
+    
+    # Feature Engineering (feature_engineering.py)
+    FEATURE_ENGINEERING = True  # False trains on (response_time, error_flag) only
+    # Columns the models see, from feature_engineering.FEATURE_NAMES (response_time and
+    # error_flag first). Extra columns without signal dilute the forest: the generator's
+    # uniform payload sizes cut high_latency recall from 1.0 to 0.13 in `benchmark.py replay
+    # --skip-system --seed 7`, so the size and frequency features are opt-in for data where
+    # they are stable
+    MODEL_FEATURES = ['response_time', 'error_flag', 'latency_z', 'user_rate_short']
+    FEATURE_USER_RATE_WINDOWS = (60, 600)  # (short, long) trailing windows in seconds for the per-user request rates
+    FEATURE_USER_TAIL_ROWS = 200000  # recent requests carried between batches for the user rates
+    
+    # Model Registry
+    MODEL_DIR = os.getenv('MODEL_DIR', 'models')
+    # joblib mmap_mode for loaded models; None loads them into process memory. 'r' keeps one
+    # open file per tree array (~300 per IsolationForest), so a handful of models exhausts
+    # the usual `ulimit -n 1024`; only map them with a raised descriptor limit
+    MODEL_MMAP_MODE = None
+    MODEL_KEEP_VERSIONS = 5
+    
+    # Columnar Log Store (log_store.py)
+    LOG_STORE_DIR = os.getenv('LOG_STORE_DIR', 'data/log_store')
+    LOG_STORE_ROW_GROUP_SIZE = 64 * 1024  # rows per Parquet row group; the unit of time-range pruning
+    
+    # Sliding-window Model Refresh
+    REFRESH_ENABLED = True
+    REFRESH_INTERVAL = 300  # seconds between drift checks
+    REFRESH_WINDOW_SIZE = 2000  # recent rows kept per service-environment
+    REFRESH_MIN_ROWS = 500  # new rows needed before a partition is re-checked
+    DRIFT_KS_THRESHOLD = 0.2  # KS statistic on response time
+    DRIFT_ERROR_RATE_DELTA = 0.05
+    REFRESH_PERSIST = True  # save refreshed models as a new registry version
+    
+    # Streaming Traffic Spike Detection
+    TRAFFIC_RING_BUCKETS = 288  # 5-minute buckets kept per service-environment (one day)
+    SEASONAL_MIN_SAMPLES = 12  # buckets per hour-of-week slot before it replaces the flat baseline
+    TRAFFIC_SPIKE_Z = 3
+    # Requests over the expected count a bucket also needs: with a near-empty baseline the
+    # std floor of 1 alone would make 4 requests a z=4 spike
+    TRAFFIC_SPIKE_MIN_EXCESS = 50
+    
+    # Per-user / Per-endpoint Rate Anomalies (rate_monitor.py)
+    RATE_DETECTION = True
+    RATE_SKETCH_WIDTH = 2**15  # count-min counters per row (power of two)
+    RATE_SKETCH_DEPTH = 4  # memory: 2 kinds x 2 half-lives x depth x width x 8 bytes (~4MB)
+    RATE_HALF_LIVES = (60, 3600)  # seconds: short-window rate, long-window baseline
+    RATE_SPIKE_RATIO = 4  # short-window rate vs the key's own baseline
+    RATE_USER_MIN_RPM = 60  # requests per minute a (service, environment, user) needs before it can be flagged
+    RATE_USER_MAX_RPM = 600  # flagged whatever its baseline; 0 disables
+    RATE_ENDPOINT_MIN_RPM = 120
+    RATE_ENDPOINT_MAX_RPM = 0
+    RATE_HEAVY_HITTERS = 100  # top keys per kind kept for reporting
+    RATE_ALERT_INTERVAL = 300  # seconds of event time before the same key is reported again
+    RATE_ALERT_KEYS = 10000  # reported keys remembered for the interval; oldest forgotten first
     
     # Alerting Thresholds
     RESPONSE_TIME_THRESHOLD = 1000  # ms
     ERROR_RATE_THRESHOLD = 0.05  # 5%
     
+    # Real Log Ingestion (used with --real)
+    LOG_SOURCES = [
+        {"path": os.getenv('DJANGO_LOG_PATH', 'logs/django_api.log'), "format": "json",
+         "service": "django-api", "environment": "on-prem", "language": "python"},
+        {"path": os.getenv('API_LOG_CSV_PATH', 'data/api_logs.csv'), "format": "csv"},
+    ]
+    INGEST_STATE_FILE = os.getenv('INGEST_STATE_FILE', 'data/ingest_offsets.json')
+    INGEST_BATCH_SIZE = 500  # max records handed to the detector per cycle
+    
+    # HTTP Ingestion (http_ingestion.py, main.py --http)
+    INGEST_HTTP_HOST = os.getenv('INGEST_HTTP_HOST', '127.0.0.1')
+    INGEST_HTTP_PORT = int(os.getenv('INGEST_HTTP_PORT', '8089'))
+    INGEST_HTTP_QUEUE_SIZE = 256  # accepted requests waiting for the detector before clients get 429
+    INGEST_HTTP_MAX_BODY_BYTES = 8 * 2**20
+    INGEST_HTTP_BATCH_SECONDS = 1.0  # longest a record waits for its micro-batch to fill
+    INGEST_HTTP_RETRY_AFTER = 1  # seconds, sent with 429
+    
+    # Anomaly Classification
+    # Checked in order, first match wins. Conditions within a rule are ANDed:
+    # status_min/status_max (status code range), latency_multiplier (x RESPONSE_TIME_THRESHOLD),
+    # latency_min_ms, error_rate_min (4xx/5xx share of the service-environment in the batch)
+    ANOMALY_RULES = [
+        {"type": "server_error", "status_min": 500},
+        {"type": "high_latency", "latency_multiplier": 2},
+        {"type": "client_error", "status_min": 400},
+    ]
+    ANOMALY_DEFAULT_TYPE = 'behavioral'
+    
     # Gemini Settings
     GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
     GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-1.5-pro')
+    GEMINI_USE_STUB = os.getenv('GEMINI_USE_STUB', '0') == '1'  # offline stand-in model
+    GEMINI_STUB_LATENCY = float(os.getenv('GEMINI_STUB_LATENCY', '0.5'))  # seconds per call
+    
+    # Concurrent Alert Generation
+    GEMINI_CONCURRENCY = 8  # in-flight Gemini calls
+    GEMINI_TIMEOUT = 30  # seconds per call
+    GEMINI_QUEUE_SIZE = 64  # pending requests before the producer blocks
+    GEMINI_BATCH_MODE = False  # fold several anomalies into one prompt
+    GEMINI_BATCH_SIZE = 20
+    
+    # Monitoring Pipeline
+    PIPELINE_QUEUE_SIZE = 8  # batches buffered between stages
+    ALERT_QUEUE_POLICY = 'coalesce'  # block | drop_newest | drop_oldest | coalesce
+    PIPELINE_COALESCE_LIMIT = 5000  # max anomalies held in one coalesced alert batch
+    PIPELINE_METRICS_INTERVAL = 60  # seconds between stage metric reports
+    
+    # Sharded Detection (sharded_detection.py)
+    SHARD_WORKERS = int(os.getenv('SHARD_WORKERS', '1'))  # >1 scores in worker processes, one shard of keys each
+    SHARD_START_METHOD = 'spawn'  # the pipeline is threaded; a forked worker could inherit held locks
+    SHARD_MAX_INFLIGHT = 8  # batches submitted to the workers but not yet merged
+    SHARD_MAX_RETRIES = 2  # times a sub-batch is re-sent after its worker died before it is dropped
+    
+    # Alert Deduplication and Caching
+    ALERT_LATENCY_BUCKET_MS = 250  # response times in the same bucket share an alert
+    ALERT_CACHE_SIZE = 1024
+    ALERT_CACHE_TTL = 900  # seconds a generated alert is reused
+    ALERT_DEDUP_WINDOW = 300  # seconds a signature stays suppressed after alerting
     
     # Safety Settings for Gemini
     GEMINI_SAFETY_SETTINGS = {
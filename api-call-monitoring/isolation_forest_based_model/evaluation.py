@@ -0,0 +1,207 @@
+import os
+import json
+import time
+import resource
+import subprocess
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from batch_scorer import to_columns, columns_to_records
+from traffic_monitor import BUCKET_SECONDS, to_epoch_seconds
+
+NORMAL_LABEL = 'normal'
+
+
+def load_dataset(path):
+    """Read a CSV or Parquet log file; a 'label' column, if present, is the ground truth"""
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+def iter_batches(columns, batch_size):
+    """Yield (row offset, column slices) of at most batch_size rows"""
+    n = len(columns['timestamp'])
+    for lo in range(0, n, batch_size):
+        yield lo, {name: values[lo:lo + batch_size] for name, values in columns.items()}
+
+
+def peak_rss_mb():
+    """High-water resident set size of this process (ru_maxrss is KB on Linux)"""
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def latency_summary(seconds):
+    if len(seconds) == 0:
+        return {'batches': 0, 'p50_ms': None, 'p99_ms': None, 'max_ms': None}
+    ms = np.asarray(seconds) * 1000
+    return {
+        'batches': len(ms),
+        'p50_ms': round(float(np.percentile(ms, 50)), 3),
+        'p99_ms': round(float(np.percentile(ms, 99)), 3),
+        'max_ms': round(float(ms.max()), 3)
+    }
+
+
+def detection_report(labels, predicted):
+    """Precision/recall of row-level predictions against ground-truth labels.
+
+    ``labels`` holds 'normal' or the injected anomaly type, ``predicted``
+    holds 'normal' or the detector's anomaly_type. The generator's labels
+    and the detector's types are different vocabularies, so recall is
+    reported per labelled type (share of those rows flagged as anything)
+    and precision per predicted type (share of those flags that hit a
+    labelled anomaly).
+    """
+    labels = np.asarray(labels, dtype=object)
+    predicted = np.asarray(predicted, dtype=object)
+    actual = labels != NORMAL_LABEL
+    flagged = predicted != NORMAL_LABEL
+    true_positives = int((actual & flagged).sum())
+
+    def ratio(num, den):
+        return round(num / den, 4) if den else None
+
+    precision = ratio(true_positives, int(flagged.sum()))
+    recall = ratio(true_positives, int(actual.sum()))
+    report = {
+        'rows': len(labels),
+        'labelled_anomalies': int(actual.sum()),
+        'flagged': int(flagged.sum()),
+        'precision': precision,
+        'recall': recall,
+        'f1': round(2 * precision * recall / (precision + recall), 4) if precision and recall else None,
+        'recall_by_label': {},
+        'precision_by_type': {}
+    }
+    for label in sorted(set(labels[actual])):
+        rows = labels == label
+        report['recall_by_label'][label] = {
+            'rows': int(rows.sum()), 'recall': ratio(int((rows & flagged).sum()), int(rows.sum()))
+        }
+    for anomaly_type in sorted(set(predicted[flagged])):
+        rows = predicted == anomaly_type
+        report['precision_by_type'][anomaly_type] = {
+            'flagged': int(rows.sum()), 'precision': ratio(int((rows & actual).sum()), int(rows.sum()))
+        }
+    return report
+
+
+def replay_detector(detector, frame, batch_size):
+    """Run labelled rows through score, classify and spike detection in batches.
+
+    Returns (predicted types per row, per-batch seconds). Rows in a
+    (service, environment, bucket) reported as a traffic spike count as
+    'traffic_spike' unless the row scorer already flagged them; rows of a
+    user or endpoint reported as a rate anomaly count as 'rate_anomaly'
+    from one short half-life before the report until the key may be
+    reported again.
+    """
+    columns = to_columns(frame.drop(columns=['label', 'incident_id'], errors='ignore'))
+    columns['row_id'] = np.arange(len(frame))
+    predicted = np.full(len(frame), NORMAL_LABEL, dtype=object)
+    spike_keys = set()
+    rate_anomalies = []
+    batch_seconds = []
+
+    for _, batch in iter_batches(columns, batch_size):
+        start = time.perf_counter()
+        result = detector.score(batch)
+        anomalies = detector.classify(result) if len(result['anomaly_score']) else []
+        spikes = detector.detect_traffic_spikes(batch)
+        rate_anomalies += detector.detect_rate_anomalies(batch)
+        batch_seconds.append(time.perf_counter() - start)
+
+        for anomaly in anomalies:
+            predicted[anomaly['row_id']] = anomaly['anomaly_type']
+        spike_keys.update((s['service'], s['environment'], pd.Timestamp(s['timestamp'])) for s in spikes)
+
+    epochs = to_epoch_seconds(columns['timestamp'])
+    before, after = detector.config.RATE_HALF_LIVES[0], detector.config.RATE_ALERT_INTERVAL
+    for anomaly in rate_anomalies:
+        column = 'user_id' if anomaly['rate_key'] == 'user' else 'endpoint'
+        at = pd.Timestamp(anomaly['timestamp']).timestamp()
+        rows = (
+            (columns['service'] == anomaly['service']) & (columns['environment'] == anomaly['environment'])
+            & (columns[column] == anomaly[column]) & (epochs >= at - before) & (epochs < at + after)
+        )
+        predicted[rows & (predicted == NORMAL_LABEL)] = 'rate_anomaly'
+
+    if spike_keys:
+        buckets = pd.to_datetime(epochs // BUCKET_SECONDS * BUCKET_SECONDS, unit='s')
+        in_spike = np.fromiter(
+            ((s, e, b) in spike_keys for s, e, b in zip(columns['service'], columns['environment'], buckets)),
+            dtype=bool, count=len(frame)
+        )
+        predicted[in_spike & (predicted == NORMAL_LABEL)] = 'traffic_spike'
+    return predicted, batch_seconds
+
+
+class ReplaySource:
+    """Stands in for LogIngestor: hands out a frame's rows as record batches"""
+
+    def __init__(self, frame, batch_size):
+        self.columns = to_columns(frame.drop(columns=['label', 'incident_id'], errors='ignore'))
+        self.batches = iter_batches(self.columns, batch_size)
+        self.batch_size = batch_size
+        self.emitted = 0
+        self.exhausted = False
+
+    def poll(self):
+        batch = next(self.batches, None)
+        if batch is None:
+            self.exhausted = True
+            return []
+        self.emitted += 1
+        return columns_to_records(batch[1])
+
+    def close(self):
+        self.exhausted = True
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(path, benchmark, params, results):
+    """Write one benchmark run as JSON, tagged with the commit it ran on"""
+    document = {
+        'benchmark': benchmark,
+        'revision': git_revision(),
+        'created_at': datetime.now().isoformat(),
+        'params': params,
+        'results': results
+    }
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=2, default=str)
+    return document
+
+
+def flatten(results, prefix=''):
+    """Nested result dict -> {'a.b.c': number} for comparing runs"""
+    flat = {}
+    for name, value in results.items():
+        key = f"{prefix}{name}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[key] = value
+    return flat
+
+
+def compare_results(baseline, current):
+    """Relative change of every numeric metric present in both runs"""
+    before, after = flatten(baseline['results']), flatten(current['results'])
+    return {
+        key: {'baseline': before[key], 'current': after[key],
+              'change': round((after[key] - before[key]) / before[key], 4) if before[key] else None}
+        for key in sorted(before.keys() & after.keys())
+    }
@@ -0,0 +1,222 @@
+import time
+import numpy as np
+import pandas as pd
+from config import Config
+from traffic_monitor import to_epoch_seconds
+
+# Every feature the stage can compute; Config.MODEL_FEATURES picks the ones
+# the models see. Columns 0 and 1 are always the original (response_time,
+# error_flag) pair: drift checks and the per-partition error rate read them
+# by position
+FEATURE_NAMES = (
+    'response_time',
+    'error_flag',
+    'latency_z',               # log response time against its (service, endpoint) mean, in std units
+    'request_size_z',          # same for the request size
+    'response_size_z',         # same for the response size
+    'response_request_ratio',  # log response size - log request size
+    'user_rate_short',         # requests per minute by the row's user, short trailing window
+    'user_rate_long',          # same over the long window
+    'endpoint_frequency',      # share of the service's training traffic on this endpoint (0 = unseen)
+    'language_frequency',      # same for the client language
+)
+INPUT_COLUMNS = [
+    'timestamp', 'service', 'status_code', 'response_time', 'user_id',
+    'endpoint', 'request_size', 'response_size', 'language'
+]
+_LOG_COLUMNS = ('response_time', 'request_size', 'response_size')
+_MIN_STD = 0.05  # on log1p values; keeps constant-size endpoints from blowing up z-scores
+
+
+class FeatureEngineer:
+    """Vectorized per-request features for the IsolationForest models.
+
+    ``fit``/``partial_fit`` accumulate mergeable sums per (service, endpoint)
+    and (service, language), so statistics can be built from one partition
+    at a time. ``transform`` looks rows up against those cached tables and
+    computes per-user request rates over trailing windows; with
+    ``stateful=True`` (detection) the last window of requests is kept and
+    carried into the next batch, so a user's rate spans batch boundaries.
+    The cost of every transform is recorded for ``stats()``.
+
+    ``feature_names`` (default Config.MODEL_FEATURES) selects the output
+    columns and is saved with the fitted statistics, so a loaded model
+    keeps getting the columns it was trained on.
+    """
+
+    def __init__(self, feature_names=None, rate_windows=None, max_tail_rows=None):
+        self.config = Config()
+        self.feature_names = tuple(feature_names or self.config.MODEL_FEATURES)
+        if self.feature_names[:2] != FEATURE_NAMES[:2]:
+            raise ValueError(f"Model features must start with {FEATURE_NAMES[:2]}")
+        unknown = set(self.feature_names) - set(FEATURE_NAMES)
+        if unknown:
+            raise ValueError(f"Unknown features: {', '.join(sorted(unknown))}")
+        self._selected = [FEATURE_NAMES.index(name) for name in self.feature_names]
+        self.rate_windows = tuple(rate_windows or self.config.FEATURE_USER_RATE_WINDOWS)
+        self.max_tail_rows = max_tail_rows or self.config.FEATURE_USER_TAIL_ROWS
+        self.reset()
+
+    def reset(self):
+        self._endpoint_sums = None
+        self._language_counts = None
+        self._endpoint_index = pd.MultiIndex.from_arrays([[], []])
+        self._endpoint_table = np.empty((0, 2 * len(_LOG_COLUMNS) + 1))
+        self._language_index = pd.MultiIndex.from_arrays([[], []])
+        self._language_frequency = np.empty(0)
+        self._global = np.zeros(2 * len(_LOG_COLUMNS))
+        self._tail_users = np.empty(0, dtype=object)
+        self._tail_seconds = np.empty(0)
+        self.batches = 0
+        self.rows = 0
+        self.seconds = 0.0
+        self.last_cost = None
+
+    @property
+    def n_features(self):
+        return len(self.feature_names)
+
+    def fit(self, columns):
+        self.reset()
+        return self.partial_fit(columns)
+
+    def partial_fit(self, columns):
+        """Add a batch of training rows to the per-endpoint and per-language statistics"""
+        frame = pd.DataFrame({
+            'service': columns['service'],
+            'endpoint': columns['endpoint'],
+            'language': columns['language'],
+        })
+        for name in _LOG_COLUMNS:
+            values = np.log1p(np.asarray(columns[name], dtype=np.float64).clip(min=0))
+            frame[name] = values
+            frame[f'{name}_sq'] = values * values
+        frame['count'] = 1.0
+
+        sums = frame.drop(columns='language').groupby(['service', 'endpoint']).sum()
+        languages = frame.groupby(['service', 'language'])['count'].sum()
+        if self._endpoint_sums is not None:
+            sums = sums.add(self._endpoint_sums, fill_value=0)
+            languages = languages.add(self._language_counts, fill_value=0)
+        self._endpoint_sums, self._language_counts = sums, languages
+        self._finalize()
+        return self
+
+    def _finalize(self):
+        sums = self._endpoint_sums
+        count = sums['count'].to_numpy()
+        table = []
+        global_stats = []
+        for name in _LOG_COLUMNS:
+            total, total_sq = sums[name].to_numpy(), sums[f'{name}_sq'].to_numpy()
+            mean = total / count
+            table += [mean, np.sqrt(np.maximum(total_sq / count - mean * mean, 0)).clip(min=_MIN_STD)]
+            g_mean = total.sum() / count.sum()
+            global_stats += [g_mean, max(np.sqrt(max(total_sq.sum() / count.sum() - g_mean ** 2, 0)), _MIN_STD)]
+        service_totals = sums['count'].groupby(level='service').transform('sum').to_numpy()
+        table.append(count / service_totals)
+
+        self._endpoint_index = sums.index
+        self._endpoint_table = np.column_stack(table)
+        self._global = np.array(global_stats)
+        languages = self._language_counts
+        self._language_index = languages.index
+        self._language_frequency = (languages / languages.groupby(level='service').transform('sum')).to_numpy()
+
+    def transform(self, columns, stateful=True):
+        """Feature matrix (rows x n_features) for a batch of columns"""
+        start = time.perf_counter()
+        status = np.asarray(columns['status_code'])
+        n = len(status)
+        X = np.empty((n, len(FEATURE_NAMES)), dtype=np.float64)
+        X[:, 0] = np.asarray(columns['response_time'], dtype=np.float64)
+        X[:, 1] = status >= 400
+
+        services = np.asarray(columns['service'], dtype=object)
+        rows = self._endpoint_index.get_indexer(pd.MultiIndex.from_arrays([services, columns['endpoint']]))
+        known = rows >= 0
+        # Unseen endpoints are compared with the global distribution
+        if len(self._endpoint_table):
+            table = np.where(known[:, None], self._endpoint_table[rows.clip(min=0)], 0.0)
+        else:
+            table = np.zeros((n, self._endpoint_table.shape[1]))
+        logs = {}
+        for i, name in enumerate(_LOG_COLUMNS):
+            logs[name] = np.log1p(np.asarray(columns[name], dtype=np.float64).clip(min=0))
+            mean = np.where(known, table[:, 2 * i], self._global[2 * i])
+            std = np.where(known, table[:, 2 * i + 1], self._global[2 * i + 1])
+            X[:, 2 + i] = (logs[name] - mean) / std
+        X[:, 5] = logs['response_size'] - logs['request_size']
+
+        seconds = to_epoch_seconds(columns['timestamp']).astype(np.float64)
+        X[:, 6:8] = self._user_rates(np.asarray(columns['user_id'], dtype=object), seconds, stateful)
+
+        X[:, 8] = table[:, -1]
+        languages = self._language_index.get_indexer(pd.MultiIndex.from_arrays([services, columns['language']]))
+        X[:, 9] = 0.0
+        if len(self._language_frequency):
+            X[languages >= 0, 9] = self._language_frequency[languages[languages >= 0]]
+        if len(self._selected) < len(FEATURE_NAMES):
+            X = X[:, self._selected]
+
+        elapsed = time.perf_counter() - start
+        self.batches += 1
+        self.rows += n
+        self.seconds += elapsed
+        self.last_cost = {'rows': n, 'ms': round(elapsed * 1000, 3)}
+        return X
+
+    def _user_rates(self, users, seconds, stateful):
+        """Requests per minute of each row's user over each trailing window.
+
+        Rows are sorted by (user, time) once; a row's count in a window is
+        its position minus the position of the first row of the same user
+        inside the window, found with one searchsorted per window.
+        """
+        n = len(users)
+        rates = np.zeros((n, len(self.rate_windows)))
+        if n == 0:
+            return rates
+        n_tail = len(self._tail_users) if stateful else 0
+        if n_tail:
+            users = np.concatenate((self._tail_users, users))
+            seconds = np.concatenate((self._tail_seconds, seconds))
+
+        codes, _ = pd.factorize(users)
+        order = np.lexsort((seconds, codes))
+        t0 = seconds.min()
+        span = seconds.max() - t0 + max(self.rate_windows) + 1
+        # One sorted key: users are laid out span seconds apart, so windows never cross users
+        composite = codes[order] * span + (seconds[order] - t0)
+        positions = np.arange(len(order))
+        for j, window in enumerate(self.rate_windows):
+            first = np.searchsorted(composite, composite - window, side='left')
+            counts = np.empty(len(order))
+            counts[order] = positions - first + 1
+            rates[:, j] = counts[n_tail:] * 60.0 / window
+
+        if stateful:
+            keep = seconds >= seconds.max() - max(self.rate_windows)
+            keep_users, keep_seconds = users[keep], seconds[keep]
+            self._tail_users = keep_users[-self.max_tail_rows:]
+            self._tail_seconds = keep_seconds[-self.max_tail_rows:]
+        return rates
+
+    def stats(self):
+        """Feature computation cost so far: batches, rows, per-batch and per-row time"""
+        return {
+            'batches': self.batches,
+            'rows': self.rows,
+            'last_batch': self.last_cost,
+            'mean_batch_ms': round(self.seconds / self.batches * 1000, 3) if self.batches else None,
+            'us_per_row': round(self.seconds / self.rows * 1e6, 3) if self.rows else None,
+            'tail_rows': len(self._tail_users),
+        }
+
+    def __getstate__(self):
+        # Persist the fitted statistics, not the live sliding-window tail or counters
+        state = self.__dict__.copy()
+        state['_tail_users'] = np.empty(0, dtype=object)
+        state['_tail_seconds'] = np.empty(0)
+        state.update(batches=0, rows=0, seconds=0.0, last_cost=None)
+        return state
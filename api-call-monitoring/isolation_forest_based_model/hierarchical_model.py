@@ -0,0 +1,128 @@
+import pickle
+from collections.abc import MutableMapping
+import numpy as np
+from batch_scorer import decision_scores
+
+GLOBAL_KEY = ('*', '*')
+
+
+def model_nbytes(model):
+    """Serialized size of a fitted model, the figure the memory budget is checked against"""
+    return len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def normalizer(X):
+    """Robust (center, scale) per column: median and IQR / 1.349.
+
+    Columns without spread in X (the error flag, mostly-constant rates)
+    get (0, 1) and pass through unchanged.
+    """
+    center = np.median(X, axis=0)
+    q25, q75 = np.percentile(X, [25, 75], axis=0)
+    scale = (q75 - q25) / 1.349
+    flat = scale <= 0
+    center[flat] = 0.0
+    scale[flat] = 1.0
+    return center, scale
+
+
+def key_normalizer(X, prior_rows, fallback=None):
+    """A key's (center, scale), shrunk towards ``fallback`` with weight n / (n + prior_rows)"""
+    center, scale = normalizer(X)
+    if fallback is not None:
+        weight = len(X) / (len(X) + prior_rows)
+        center = weight * center + (1 - weight) * fallback['center']
+        scale = weight * scale + (1 - weight) * fallback['scale']
+    return center, scale
+
+
+def calibrate(model, X, contamination, prior_rows, fallback=None):
+    """Per-key calibration of the shared model: feature center/scale and a score offset.
+
+    The shared model is trained on rows normalized by their own key's
+    center and scale, so "slow for this key" looks the same everywhere.
+    The offset is the key's ``contamination`` quantile of the shared
+    model's scores, so about that share of the key's rows score below zero
+    after subtracting it. Keys with few rows lean on ``fallback`` (the
+    pooled calibration) and the shared model's own threshold (offset 0).
+    """
+    center, scale = key_normalizer(X, prior_rows, fallback)
+    scores = decision_scores(model, (X - center) / scale)
+    weight = len(X) / (len(X) + prior_rows)
+    return {
+        'center': center,
+        'scale': scale,
+        'offset': float(weight * np.quantile(scores, contamination)),
+        'rows': int(len(X)),
+    }
+
+
+class CalibratedModel:
+    """The shared model seen through one key's calibration"""
+
+    def __init__(self, model, calibration):
+        self.model = model
+        self.center = calibration['center']
+        self.scale = calibration['scale']
+        self.offset = calibration['offset']
+
+    def decision_function(self, X):
+        return decision_scores(self.model, (X - self.center) / self.scale) - self.offset
+
+
+class HierarchicalModels(MutableMapping):
+    """(service, environment) -> model for score_batch, backed by one shared model.
+
+    Keys with a dedicated model (the largest ones, as far as the memory
+    budget allows) use it; every other key gets the shared model through
+    its own calibration, and keys never seen in training get the pooled
+    ``fallback`` calibration, so new services are scored instead of
+    skipped. Memory is one shared model, the dedicated ones and a few
+    floats per key.
+    """
+
+    def __init__(self, global_model, calibration, fallback, dedicated=None):
+        self.global_model = global_model
+        self.calibration = dict(calibration)
+        self.fallback = fallback
+        self.dedicated = dedicated if dedicated is not None else {}
+
+    def __getitem__(self, key):
+        if key in self.dedicated:
+            return self.dedicated[key]
+        return CalibratedModel(self.global_model, self.calibration.get(key, self.fallback))
+
+    def __setitem__(self, key, model):
+        # A refreshed model replaces a dedicated one; shared keys are recalibrated instead
+        self.dedicated[key] = model
+
+    def __delitem__(self, key):
+        found = self.calibration.pop(key, None) is not None
+        if key in self.dedicated:
+            del self.dedicated[key]
+            found = True
+        if not found:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self.calibration or key in self.dedicated
+
+    def __iter__(self):
+        return iter(set(self.calibration) | set(self.dedicated))
+
+    def __len__(self):
+        return len(set(self.calibration) | set(self.dedicated))
+
+    def is_dedicated(self, key):
+        return key in self.dedicated
+
+    def recalibrate(self, key, X, contamination, prior_rows):
+        self.calibration[key] = calibrate(self.global_model, X, contamination, prior_rows, self.fallback)
+
+    def shared_state(self):
+        """What the registry stores besides the dedicated models"""
+        return {'global_model': self.global_model, 'calibration': self.calibration, 'fallback': self.fallback}
+
+    def nbytes(self):
+        """Estimated model memory; dedicated models are the same shape as the shared one"""
+        return model_nbytes(self.global_model) * (1 + len(self.dedicated))
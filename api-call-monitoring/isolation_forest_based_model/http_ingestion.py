@@ -0,0 +1,208 @@
+import json
+import time
+import logging
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config import Config
+from log_ingestion import validate_record
+from pipeline import BoundedQueue, Envelope
+
+MAX_REPORTED_ERRORS = 10  # per response; the rest are only counted
+
+
+class RateMeter:
+    """Events per second over a sliding window of one-second buckets"""
+
+    def __init__(self, window=10):
+        self.window = window
+        self._buckets = deque()
+        self._lock = threading.Lock()
+
+    def add(self, n):
+        second = int(time.monotonic())
+        with self._lock:
+            if self._buckets and self._buckets[-1][0] == second:
+                self._buckets[-1][1] += n
+            else:
+                self._buckets.append([second, n])
+            while self._buckets[0][0] <= second - self.window:
+                self._buckets.popleft()
+
+    def rate(self):
+        now = int(time.monotonic())
+        with self._lock:
+            return sum(n for second, n in self._buckets if second > now - self.window) / self.window
+
+
+class IngestHandler(BaseHTTPRequestHandler):
+    """POST /ingest takes NDJSON log records; GET /metrics and /health report on the ingestor"""
+
+    server_version = 'api-monitoring-ingest'
+    protocol_version = 'HTTP/1.1'  # keep-alive: log shippers post many small bodies
+
+    def do_POST(self):
+        if self.path.split('?')[0] != '/ingest':
+            return self._reply(404, {'error': 'not found'})
+        ingestor = self.server.ingestor
+        try:
+            length = int(self.headers['Content-Length'])
+        except (TypeError, ValueError):
+            return self._reply(411, {'error': 'Content-Length required'})
+        if length < 0:
+            return self._reply(400, {'error': 'invalid Content-Length'})
+        if length > ingestor.config.INGEST_HTTP_MAX_BODY_BYTES:
+            return self._reply(413, {'error': f"body over {ingestor.config.INGEST_HTTP_MAX_BODY_BYTES} bytes"})
+        status, body = ingestor.accept(self.rfile.read(length))
+        headers = {'Retry-After': str(ingestor.config.INGEST_HTTP_RETRY_AFTER)} if status == 429 else {}
+        self._reply(status, body, headers)
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        if path == '/metrics':
+            return self._reply(200, self.server.ingestor.metrics())
+        if path == '/health':
+            return self._reply(200, {'status': 'ok'})
+        self._reply(404, {'error': 'not found'})
+
+    def _reply(self, status, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        # Per-request access logs would drown the monitoring output
+        pass
+
+
+class HttpIngestor:
+    """Receives pushed logs over HTTP and hands them out as micro-batches.
+
+    Drop-in for LogIngestor in MonitoringSystem. Each POST /ingest body is
+    NDJSON, one APILogGenerator-shaped record per line; valid records are
+    queued as one unit and invalid lines are reported back (202). When
+    INGEST_HTTP_QUEUE_SIZE requests are already waiting, the whole request
+    is refused with 429 and Retry-After, so a slow detector pushes back on
+    the clients instead of growing the buffer. ``poll`` returns up to
+    batch_size records, waiting at most INGEST_HTTP_BATCH_SECONDS after
+    the first of them arrived.
+    """
+
+    blocking = True  # poll waits for its micro-batch; the ingest stage needs no pause
+
+    def __init__(self, host=None, port=None, batch_size=None, batch_seconds=None, queue_size=None):
+        self.config = Config()
+        self.host = host or self.config.INGEST_HTTP_HOST
+        self.port = self.config.INGEST_HTTP_PORT if port is None else port
+        self.batch_size = batch_size or self.config.INGEST_BATCH_SIZE
+        self.batch_seconds = batch_seconds or self.config.INGEST_HTTP_BATCH_SECONDS
+        self.queue = BoundedQueue(queue_size or self.config.INGEST_HTTP_QUEUE_SIZE, policy='drop_newest')
+        self.server = None
+        self._thread = None
+        self._carry = []
+        self._carry_since = None
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.throttled = 0
+        self.buffered = 0
+        self.batches = 0
+        self.record_rate = RateMeter()
+        self.request_rate = RateMeter()
+        self.logger = logging.getLogger(__name__)
+
+    def start(self):
+        self.server = ThreadingHTTPServer((self.host, self.port), IngestHandler)
+        self.server.daemon_threads = True
+        self.server.ingestor = self
+        self.port = self.server.server_address[1]
+        self._thread = threading.Thread(target=self.server.serve_forever, name='http-ingest', daemon=True)
+        self._thread.start()
+        self.logger.info(f"Accepting NDJSON logs on http://{self.host}:{self.port}/ingest")
+        return self
+
+    def accept(self, body):
+        """Validate and queue one request body; returns (HTTP status, response body)"""
+        self.request_rate.add(1)
+        records, errors, rejected = [], [], 0
+        for number, line in enumerate(body.split(b'\n'), 1):
+            if not line.strip():
+                continue
+            try:
+                log, error = validate_record(json.loads(line))
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                log, error = None, "invalid JSON"
+            if log is None:
+                rejected += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({'line': number, 'error': error})
+            else:
+                records.append(log)
+
+        with self._lock:
+            self.requests += 1
+            self.rejected += rejected
+        if not records:
+            return 400, {'accepted': 0, 'rejected': rejected, 'errors': errors or [{'error': 'no records'}]}
+        # Counted before the put so a fast poll can never take it below zero
+        with self._lock:
+            self.buffered += len(records)
+        if not self.queue.put(Envelope(records)):
+            with self._lock:
+                self.buffered -= len(records)
+                self.throttled += 1
+            return 429, {'error': 'ingestion queue full, retry later', 'queue_depth': len(self.queue)}
+        with self._lock:
+            self.accepted += len(records)
+        self.record_rate.add(len(records))
+        return 202, {'accepted': len(records), 'rejected': rejected, 'errors': errors}
+
+    def poll(self):
+        """Next micro-batch: batch_size records, or fewer once the oldest has waited batch_seconds"""
+        batch, since = self._carry, self._carry_since
+        while len(batch) < self.batch_size:
+            timeout = self.batch_seconds if since is None else since + self.batch_seconds - time.monotonic()
+            if timeout <= 0:
+                break
+            envelope = self.queue.get(timeout)
+            if envelope is None:
+                break
+            if since is None:
+                since = envelope.created_at
+            batch = batch + envelope.payload
+        self._carry = batch[self.batch_size:]
+        self._carry_since = since if self._carry else None
+        batch = batch[:self.batch_size]
+        if batch:
+            with self._lock:
+                self.buffered -= len(batch)
+                self.batches += 1
+        return batch
+
+    def metrics(self):
+        """Ingestion QPS (records and requests per second, 10s window), queue depth and totals"""
+        with self._lock:
+            return {
+                'records_per_sec': round(self.record_rate.rate(), 1),
+                'requests_per_sec': round(self.request_rate.rate(), 1),
+                'queue_depth': len(self.queue),
+                'queue_capacity': self.queue.maxsize,
+                'buffered_records': self.buffered,
+                'requests': self.requests,
+                'accepted': self.accepted,
+                'rejected': self.rejected,
+                'throttled': self.throttled,
+                'batches': self.batches,
+            }
+
+    def close(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
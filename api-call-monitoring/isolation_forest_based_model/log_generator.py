@@ -2,11 +2,13 @@ import random
 import json
 from datetime import datetime, timedelta
 import numpy as np
+import pandas as pd
 from config import Config
 
 class APILogGenerator:
-    def __init__(self):
+    def __init__(self, seed=None):
         self.config = Config()
+        self.seed = seed
         self.services = ["user-service", "payment-service", "inventory-service", "auth-service"]
         self.environments = ["on-prem", "aws-cloud", "azure-cloud", "gcp-cloud"]
         self.status_codes = [200, 201, 400, 401, 403, 404, 500, 503]
@@ -17,6 +19,16 @@ class APILogGenerator:
             "inventory-service": ["/products", "/products/{id}", "/inventory"],
             "auth-service": ["/auth/login", "/auth/register", "/auth/token"]
         }
+        self.languages = ["nodejs", "golang", "python", "java"]
+        self.error_codes = [c for c in self.status_codes if c >= 400]
+        self.success_codes = [c for c in self.status_codes if c < 400]
+        # Base response time varies by environment
+        self.base_response = {
+            "on-prem": 80,
+            "aws-cloud": 120,
+            "azure-cloud": 150,
+            "gcp-cloud": 100
+        }
         
     def _generate_timestamp(self):
         base_time = datetime.now() - timedelta(days=random.randint(0, 30))
@@ -26,13 +38,7 @@ class APILogGenerator:
         service = random.choice(self.services)
         environment = random.choice(self.environments)
         
-        # Base response time varies by environment
-        base_response = {
-            "on-prem": 80,
-            "aws-cloud": 120,
-            "azure-cloud": 150,
-            "gcp-cloud": 100
-        }[environment]
+        base_response = self.base_response[environment]
         
         response_time = max(10, np.random.normal(
             base_response,
@@ -41,10 +47,10 @@ class APILogGenerator:
         
         # 5% chance of error
         if random.random() < 0.05:
-            status = random.choice([c for c in self.status_codes if c >= 400])
+            status = random.choice(self.error_codes)
             response_time *= 1.5
         else:
-            status = random.choice([c for c in self.status_codes if c < 400])
+            status = random.choice(self.success_codes)
             
         return {
             "timestamp": self._generate_timestamp(),
@@ -56,7 +62,7 @@ class APILogGenerator:
             "endpoint": random.choice(self.endpoints[service]),
             "request_size": random.randint(100, 5000),
             "response_size": random.randint(50, 3000),
-            "language": random.choice(["nodejs", "golang", "python", "java"])
+            "language": random.choice(self.languages)
         }
     
     def generate_anomalous_log(self):
@@ -81,4 +87,214 @@ class APILogGenerator:
                 logs.append(self.generate_anomalous_log())
             else:
                 logs.append(self.generate_normal_log())
-        return logs
\ No newline at end of file
+        return logs
+    
+    def _draw_normal_columns(self, rng, service_idx, env_idx):
+        """Vectorized generate_normal_log for given service/environment indices (no timestamps)"""
+        count = len(service_idx)
+        base_response = np.array([self.base_response[e] for e in self.environments], dtype=np.float64)
+        response_time = np.maximum(10, rng.normal(base_response[env_idx], self.config.NORMAL_TRAFFIC_STD))
+        
+        # 5% chance of error
+        is_error = rng.random(count) < 0.05
+        status = np.where(
+            is_error,
+            np.array(self.error_codes)[rng.integers(0, len(self.error_codes), count)],
+            np.array(self.success_codes)[rng.integers(0, len(self.success_codes), count)]
+        )
+        response_time = np.round(np.where(is_error, response_time * 1.5, response_time), 2)
+        
+        endpoints = np.array([self.endpoints[s] for s in self.services], dtype=object)
+        return {
+            "service": np.array(self.services, dtype=object)[service_idx],
+            "environment": np.array(self.environments, dtype=object)[env_idx],
+            "status_code": status,
+            "response_time": response_time,
+            "user_id": np.array(self.users, dtype=object)[rng.integers(0, len(self.users), count)],
+            "endpoint": endpoints[service_idx, rng.integers(0, endpoints.shape[1], count)],
+            "request_size": rng.integers(100, 5001, count),
+            "response_size": rng.integers(50, 3001, count),
+            "language": np.array(self.languages, dtype=object)[rng.integers(0, len(self.languages), count)]
+        }
+    
+    def generate_columns(self, count=1000, anomaly_ratio=None, seed=None, with_labels=False, end_time=None):
+        """Vectorized bulk mode: the same distribution as generate_logs, as NumPy columns.
+
+        Pass a seed (or set one on the generator) and an end_time for
+        reproducible batches; timestamps are spread over the 30 days before
+        end_time (default: now). With with_labels, a 'label' column records
+        the injected anomaly type ('normal', 'response_time', 'error_rate'
+        or 'traffic_spike').
+        """
+        if anomaly_ratio is None:
+            anomaly_ratio = self.config.ANOMALY_RATIO
+        rng = np.random.default_rng(self.seed if seed is None else seed)
+        
+        service_idx = rng.integers(0, len(self.services), count)
+        env_idx = rng.integers(0, len(self.environments), count)
+        columns = self._draw_normal_columns(rng, service_idx, env_idx)
+        status, response_time = columns["status_code"], columns["response_time"]
+        
+        anomaly_types = np.array(["normal", "response_time", "error_rate", "traffic_spike"], dtype=object)
+        label_idx = np.where(rng.random(count) < anomaly_ratio, rng.integers(1, 4, count), 0)
+        slow = label_idx == 1
+        response_time[slow] *= rng.uniform(5, 20, slow.sum())
+        failing = label_idx == 2
+        status[failing] = rng.choice([500, 503], failing.sum())
+        response_time[failing] *= 2
+        
+        # Same spread as _generate_timestamp: a whole number of days back plus up to 10s
+        end = np.datetime64(end_time or datetime.now(), 'us')
+        offsets = (
+            (rng.random(count) * 10_000_000).astype(np.int64)
+            - rng.integers(0, 31, count) * 86_400_000_000
+        )
+        timestamps = np.datetime_as_string(end + offsets.astype('timedelta64[us]'), unit='us')
+        
+        columns = {"timestamp": timestamps.astype(object), **columns}
+        if with_labels:
+            columns["label"] = anomaly_types[label_idx]
+        return columns
+    
+    def generate_frame(self, count=1000, anomaly_ratio=None, seed=None, with_labels=False, end_time=None):
+        return pd.DataFrame(self.generate_columns(count, anomaly_ratio, seed, with_labels, end_time))
+    
+    def iter_chunks(self, total, chunk_size=100_000, anomaly_ratio=None, seed=None, with_labels=False,
+                    end_time=None):
+        """Yield DataFrames of at most chunk_size rows; each chunk gets its own child seed"""
+        seed_sequence = np.random.SeedSequence(self.seed if seed is None else seed)
+        end_time = end_time or datetime.now()
+        n_chunks = -(-total // chunk_size)
+        for i, child in enumerate(seed_sequence.spawn(n_chunks)):
+            count = min(chunk_size, total - i * chunk_size)
+            yield self.generate_frame(count, anomaly_ratio, child, with_labels, end_time)
+    
+    def write_bulk(self, path, total, chunk_size=100_000, anomaly_ratio=None, seed=None, with_labels=False,
+                   end_time=None):
+        """Stream total rows to CSV or Parquet (by file extension) without holding them in memory"""
+        chunks = self.iter_chunks(total, chunk_size, anomaly_ratio, seed, with_labels, end_time)
+        if path.endswith('.parquet'):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            writer = None
+            try:
+                for chunk in chunks:
+                    table = pa.Table.from_pandas(chunk, preserve_index=False)
+                    if writer is None:
+                        writer = pq.ParquetWriter(path, table.schema)
+                    writer.write_table(table)
+            finally:
+                if writer is not None:
+                    writer.close()
+        else:
+            for i, chunk in enumerate(chunks):
+                chunk.to_csv(path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+        return path
+    
+    def rate_curve(self, start, seconds, profile, rng, resolution=1):
+        """Expected requests per bin for every (service, environment), shape (keys, bins).
+
+        Combines per-service QPS, the environment split, a diurnal cosine
+        peaking at profile['peak_hour'], a weekend dip and random short
+        bursts. Incidents are applied separately by generate_event_stream.
+        """
+        n_bins = int(np.ceil(seconds / resolution))
+        bin_start = np.datetime64(start, 's') + (np.arange(n_bins) * resolution).astype('timedelta64[s]')
+        hours = (bin_start - bin_start.astype('datetime64[D]')).astype(np.int64) / 3600
+        weekday = (bin_start.astype('datetime64[D]').astype(np.int64) + 3) % 7  # Monday = 0
+        
+        shape = 1 + profile['diurnal_amplitude'] * np.cos(2 * np.pi * (hours - profile['peak_hour']) / 24)
+        shape *= np.where(weekday >= 5, profile['weekend_factor'], 1.0)
+        
+        qps = np.array([[
+            profile['service_qps'][s] * profile['environment_share'][e]
+            for e in self.environments
+        ] for s in self.services]).reshape(-1, 1)
+        rates = qps * shape * resolution
+        
+        # Unlabelled background bursts: ordinary noise the detector should tolerate
+        n_bursts = rng.poisson(profile['burst_rate_per_hour'] * seconds / 3600)
+        burst_bins = max(1, int(profile['burst_seconds'] / resolution))
+        for key, first in zip(rng.integers(0, len(rates), n_bursts), rng.integers(0, n_bins, n_bursts)):
+            rates[key, first:first + burst_bins] *= profile['burst_multiplier']
+        return rates
+    
+    def generate_event_stream(self, start=None, seconds=3600, profile=None, seed=None, resolution=1):
+        """Time-ordered synthetic traffic with injected incidents and ground-truth labels.
+
+        Returns (events, incidents). events is a DataFrame sorted by
+        timestamp with 'label' ('normal' or the incident type) and
+        'incident_id' (-1 outside incidents). incidents lists each injected
+        incident with absolute start/end timestamps. Incident offsets in the
+        profile are seconds from the stream start; supported types are
+        traffic_spike (rate multiplier), high_latency (latency multiplier),
+        server_error (share of requests failing with 5xx) and user_storm
+        (extra requests at qps from one user_id, optionally on one endpoint).
+        """
+        profile = profile or self.config.TRAFFIC_PROFILE
+        rng = np.random.default_rng(self.seed if seed is None else seed)
+        start = np.datetime64(start or datetime.now() - timedelta(seconds=seconds), 'us')
+        n_keys = len(self.services) * len(self.environments)
+        
+        rates = self.rate_curve(start, seconds, profile, rng, resolution)
+        key_index = {(s, e): i * len(self.environments) + j
+                     for i, s in enumerate(self.services) for j, e in enumerate(self.environments)}
+        incidents = []
+        for incident_id, incident in enumerate(profile.get('incidents', [])):
+            key = key_index[(incident['service'], incident['environment'])]
+            first = int(incident['start'] / resolution)
+            last = int((incident['start'] + incident['duration']) / resolution)
+            if incident['type'] == 'traffic_spike':
+                rates[key, first:last] *= incident.get('multiplier', 10)
+            incidents.append(dict(
+                incident,
+                incident_id=incident_id,
+                start_time=str(start + np.timedelta64(int(incident['start'] * 1e6), 'us')),
+                end_time=str(start + np.timedelta64(int((incident['start'] + incident['duration']) * 1e6), 'us'))
+            ))
+        
+        counts = rng.poisson(rates)
+        flat_counts = counts.ravel()
+        event_bin = np.repeat(np.tile(np.arange(counts.shape[1]), n_keys), flat_counts)
+        event_key = np.repeat(np.repeat(np.arange(n_keys), counts.shape[1]), flat_counts)
+        offset_us = ((event_bin + rng.random(len(event_bin))) * resolution * 1e6).astype(np.int64)
+        # User storms add one user's requests on top of the key's normal traffic
+        storm_id = np.full(len(event_key), -1, dtype=np.int64)
+        for incident in incidents:
+            if incident['type'] != 'user_storm':
+                continue
+            n = rng.poisson(incident.get('qps', 5) * incident['duration'])
+            storm_offsets = (incident['start'] + rng.random(n) * incident['duration']) * 1e6
+            offset_us = np.concatenate((offset_us, storm_offsets.astype(np.int64)))
+            event_key = np.concatenate((event_key, np.full(n, key_index[(incident['service'], incident['environment'])])))
+            storm_id = np.concatenate((storm_id, np.full(n, incident['incident_id'])))
+        order = np.argsort(offset_us, kind='stable')
+        offset_us, event_key, storm_id = offset_us[order], event_key[order], storm_id[order]
+        
+        columns = self._draw_normal_columns(rng, event_key // len(self.environments), event_key % len(self.environments))
+        label = np.full(len(event_key), 'normal', dtype=object)
+        incident_ids = np.full(len(event_key), -1, dtype=np.int64)
+        for incident in incidents:
+            if incident['type'] == 'user_storm':
+                in_window = storm_id == incident['incident_id']
+                columns['user_id'][in_window] = incident['user_id']
+                if incident.get('endpoint'):
+                    columns['endpoint'][in_window] = incident['endpoint']
+            else:
+                in_window = (
+                    (event_key == key_index[(incident['service'], incident['environment'])])
+                    & (offset_us >= incident['start'] * 1e6)
+                    & (offset_us < (incident['start'] + incident['duration']) * 1e6)
+                )
+            if incident['type'] == 'high_latency':
+                columns['response_time'][in_window] *= incident.get('latency_multiplier', 10)
+            elif incident['type'] == 'server_error':
+                in_window &= rng.random(len(in_window)) < incident.get('error_rate', 0.5)
+                columns['status_code'][in_window] = rng.choice([500, 503], in_window.sum())
+            label[in_window] = incident['type']
+            incident_ids[in_window] = incident['incident_id']
+        
+        timestamps = np.datetime_as_string(start + offset_us.astype('timedelta64[us]'), unit='us')
+        events = pd.DataFrame({"timestamp": timestamps.astype(object), **columns,
+                               "label": label, "incident_id": incident_ids})
+        return events, incidents
@@ -0,0 +1,271 @@
+import os
+import csv
+import json
+import math
+import time
+import logging
+from datetime import datetime, timezone
+from itertools import islice
+from config import Config
+
+# Fields of an APILogGenerator record and their types; pushed records must
+# carry the required ones, the rest fall back to these defaults
+RECORD_SCHEMA = {
+    "timestamp": str,
+    "service": str,
+    "environment": str,
+    "status_code": int,
+    "response_time": float,
+    "user_id": str,
+    "endpoint": str,
+    "request_size": int,
+    "response_size": int,
+    "language": str,
+}
+REQUIRED_FIELDS = ("timestamp", "service", "environment", "status_code", "response_time", "endpoint")
+RECORD_DEFAULTS = {"user_id": "anonymous", "request_size": 0, "response_size": 0, "language": "unknown"}
+
+
+def validate_record(record):
+    """Check a pushed record against RECORD_SCHEMA.
+
+    Returns (log, None) with exactly the schema's fields, or (None, reason).
+    Unlike normalize_record nothing is guessed: a record with a missing
+    required field or a value of the wrong type is rejected. Timestamps
+    with a UTC offset are converted to naive UTC.
+    """
+    if not isinstance(record, dict):
+        return None, "record must be a JSON object"
+    missing = [field for field in REQUIRED_FIELDS if record.get(field) in (None, '')]
+    if missing:
+        return None, f"missing {', '.join(missing)}"
+
+    log = {}
+    for field, kind in RECORD_SCHEMA.items():
+        value = record.get(field)
+        if value is None:
+            log[field] = RECORD_DEFAULTS[field]
+            continue
+        if kind is str:
+            valid = isinstance(value, str)
+        elif kind is int:
+            valid = isinstance(value, int) and not isinstance(value, bool)
+        else:
+            try:
+                valid = isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+            except OverflowError:
+                valid = False  # an int too large for a float
+            value = float(value) if valid else value
+        if not valid:
+            return None, f"{field} must be {kind.__name__}"
+        log[field] = value
+
+    try:
+        timestamp = datetime.fromisoformat(log['timestamp'])
+    except ValueError:
+        return None, "timestamp must be ISO 8601"
+    if timestamp.tzinfo is not None:
+        # Batches mix clients; one offset-aware timestamp among naive ones breaks the
+        # datetime columns, so everything is kept as naive UTC
+        log['timestamp'] = timestamp.astimezone(timezone.utc).replace(tzinfo=None).isoformat()
+    if not 100 <= log['status_code'] <= 599:
+        return None, "status_code must be between 100 and 599"
+    if log['response_time'] < 0 or log['request_size'] < 0 or log['response_size'] < 0:
+        return None, "response_time and sizes must not be negative"
+    return log, None
+
+
+def normalize_record(record, defaults):
+    """Map a raw log record onto the APILogGenerator schema.
+
+    Returns None for records that are not API request logs (no status code
+    or response time), e.g. Django startup or error messages.
+    """
+    try:
+        status_code = int(record['status_code'])
+        response_time = float(record['response_time'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+    timestamp = record.get('timestamp') or record.get('asctime') or datetime.now().isoformat()
+    if isinstance(timestamp, str):
+        # logging's asctime uses a comma before the milliseconds
+        timestamp = timestamp.replace(',', '.')
+
+    log = {
+        "timestamp": timestamp,
+        "service": record.get('service') or defaults.get('service', 'unknown'),
+        "environment": record.get('environment') or defaults.get('environment', 'unknown'),
+        "status_code": status_code,
+        "response_time": response_time,
+        "user_id": record.get('user_id') or 'anonymous',
+        "endpoint": record.get('endpoint') or record.get('path') or 'unknown',
+        "request_size": 0,
+        "response_size": 0,
+        "language": record.get('language') or defaults.get('language', 'unknown'),
+    }
+    for field in ('request_size', 'response_size'):
+        try:
+            log[field] = int(record.get(field) or 0)
+        except (TypeError, ValueError):
+            pass
+    return log
+
+
+class TailedFile:
+    """Follows one log file from a stored byte offset, surviving rotation.
+
+    Only complete lines are consumed, so a line that is still being written
+    is picked up on the next poll. Rotation (new inode) and truncation
+    (size below our offset) both restart reading from the top of the file.
+    """
+
+    def __init__(self, path, fmt, defaults=None, state=None):
+        state = state or {}
+        self.path = path
+        self.fmt = fmt
+        self.defaults = defaults or {}
+        self.inode = state.get('inode')
+        self.offset = state.get('offset', 0)
+        self.header = state.get('header')
+        self.skipped = 0
+        self._fh = None
+        self.logger = logging.getLogger(__name__)
+
+    def state(self):
+        return {'inode': self.inode, 'offset': self.offset, 'header': self.header}
+
+    def close(self):
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def _open(self):
+        try:
+            fh = open(self.path, 'rb')
+        except FileNotFoundError:
+            return False
+        stat = os.fstat(fh.fileno())
+        if stat.st_ino != self.inode or stat.st_size < self.offset:
+            if self.inode is not None:
+                self.logger.info(f"Log rotation detected for {self.path}, reading from start")
+            self.inode = stat.st_ino
+            self.offset = 0
+            self.header = None
+        fh.seek(self.offset)
+        self._fh = fh
+        return True
+
+    def _rotated(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        return stat.st_ino != self.inode or stat.st_size < self.offset
+
+    def lines(self):
+        """Yield complete raw lines, advancing the offset as they are consumed"""
+        if self._fh is None and not self._open():
+            return
+        while True:
+            line = self._fh.readline()
+            if not line.endswith(b'\n'):
+                # EOF or a partially written line: rewind and check for rotation
+                self._fh.seek(self.offset)
+                if not self._rotated():
+                    return
+                self.close()
+                if not self._open():
+                    return
+                continue
+            self.offset += len(line)
+            yield line
+
+    def records(self):
+        """Yield normalized log dicts for the complete lines currently available"""
+        for line in self.lines():
+            text = line.decode('utf-8', errors='replace').strip()
+            if not text:
+                continue
+            if self.fmt == 'csv':
+                row = next(csv.reader([text]))
+                if self.header is None:
+                    self.header = row
+                    continue
+                record = dict(zip(self.header, row))
+            else:
+                try:
+                    record = json.loads(text)
+                except json.JSONDecodeError:
+                    self.skipped += 1
+                    continue
+
+            log = normalize_record(record, self.defaults)
+            if log is None:
+                self.skipped += 1
+                continue
+            yield log
+
+
+class LogIngestor:
+    """Streams real logs from tailed files into bounded micro-batches"""
+
+    def __init__(self, sources=None, state_file=None, batch_size=None):
+        self.config = Config()
+        self.logger = logging.getLogger(__name__)
+        self.state_file = state_file or self.config.INGEST_STATE_FILE
+        self.batch_size = batch_size or self.config.INGEST_BATCH_SIZE
+
+        state = self._load_state()
+        self.files = [
+            TailedFile(
+                source['path'],
+                source.get('format', 'json'),
+                defaults=source,
+                state=state.get(source['path'])
+            )
+            for source in (sources if sources is not None else self.config.LOG_SOURCES)
+        ]
+        self._records = self._record_stream()
+
+    def _record_stream(self):
+        """Endless generator over every source; one sweep per pass, never blocks"""
+        while True:
+            for tailed in self.files:
+                yield from tailed.records()
+            yield None  # end of sweep: nothing more available right now
+
+    def poll(self):
+        """Return up to batch_size new records and persist the read offsets"""
+        batch = list(islice(iter(self._records.__next__, None), self.batch_size))
+        if batch:
+            self._save_state()
+        return batch
+
+    def stream(self, poll_interval=1.0):
+        """Yield non-empty micro-batches forever, sleeping while the files are idle"""
+        while True:
+            batch = self.poll()
+            if batch:
+                yield batch
+            else:
+                time.sleep(poll_interval)
+
+    def close(self):
+        self._save_state()
+        for tailed in self.files:
+            tailed.close()
+
+    def _load_state(self):
+        try:
+            with open(self.state_file) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_state(self):
+        state = {tailed.path: tailed.state() for tailed in self.files}
+        tmp_path = f"{self.state_file}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_file)
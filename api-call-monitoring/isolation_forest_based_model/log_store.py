@@ -0,0 +1,149 @@
+import os
+import glob
+import uuid
+import logging
+import argparse
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from config import Config
+from batch_scorer import to_columns
+
+PARTITIONING = ds.partitioning(
+    pa.schema([('service', pa.string()), ('environment', pa.string()), ('date', pa.string())]),
+    flavor='hive'
+)
+FEATURE_COLUMNS = ['timestamp', 'status_code', 'response_time']
+
+
+def _to_timestamp(value):
+    return pd.Timestamp(value).to_datetime64().astype('datetime64[us]')
+
+
+class LogStore:
+    """Parquet log store partitioned as service=/environment=/date=.
+
+    Reads take a time range and service/environment filters that Arrow
+    pushes down: whole directories are skipped on the partition keys and
+    date, and row groups on their timestamp min/max statistics, since
+    every file is written in timestamp order. Only the requested columns
+    are decoded, and numeric columns reach NumPy without a pandas detour.
+    """
+
+    def __init__(self, root=None):
+        self.config = Config()
+        self.root = root or self.config.LOG_STORE_DIR
+        self.logger = logging.getLogger(__name__)
+
+    def write(self, logs):
+        """Append a batch of logs (dicts, DataFrame or columns); returns the row count"""
+        columns = to_columns(logs)
+        if not columns or len(columns['timestamp']) == 0:
+            return 0
+        timestamps = pd.to_datetime(columns['timestamp'], format='ISO8601').to_numpy(dtype='datetime64[us]')
+        order = np.argsort(timestamps, kind='stable')
+        table = pa.table({
+            **{name: values[order] for name, values in columns.items() if name != 'timestamp'},
+            'timestamp': timestamps[order],
+            'date': np.datetime_as_string(timestamps[order], unit='D')
+        })
+        ds.write_dataset(
+            table, self.root, format='parquet', partitioning=PARTITIONING,
+            basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+            existing_data_behavior='overwrite_or_ignore',
+            max_rows_per_group=self.config.LOG_STORE_ROW_GROUP_SIZE
+        )
+        self.logger.info(f"Wrote {table.num_rows} rows to {self.root}")
+        return table.num_rows
+
+    def dataset(self):
+        return ds.dataset(self.root, format='parquet', partitioning=PARTITIONING)
+
+    def partitions(self):
+        """(service, environment) keys present in the store, from the directory layout alone"""
+        keys = set()
+        for path in glob.glob(os.path.join(self.root, 'service=*', 'environment=*')):
+            service = os.path.basename(os.path.dirname(path)).split('=', 1)[1]
+            keys.add((service, os.path.basename(path).split('=', 1)[1]))
+        return sorted(keys)
+
+    def _filter(self, start=None, end=None, services=None, environments=None):
+        conditions = []
+        if start is not None:
+            start = _to_timestamp(start)
+            conditions += [ds.field('date') >= str(start.astype('datetime64[D]')), ds.field('timestamp') >= start]
+        if end is not None:
+            end = _to_timestamp(end)
+            conditions += [ds.field('date') <= str(end.astype('datetime64[D]')), ds.field('timestamp') < end]
+        if services is not None:
+            conditions.append(ds.field('service').isin(list(services)))
+        if environments is not None:
+            conditions.append(ds.field('environment').isin(list(environments)))
+        if not conditions:
+            return None
+        expression = conditions[0]
+        for condition in conditions[1:]:
+            expression &= condition
+        return expression
+
+    def read(self, start=None, end=None, services=None, environments=None, columns=None):
+        """Rows with start <= timestamp < end as an Arrow table, in timestamp order per partition"""
+        if not os.path.isdir(self.root):
+            return None
+        dataset = self.dataset()
+        if columns is None:
+            columns = [name for name in dataset.schema.names if name != 'date']
+        return dataset.to_table(columns=columns, filter=self._filter(start, end, services, environments))
+
+    def read_columns(self, start=None, end=None, services=None, environments=None, columns=None):
+        """Like read, as the dict of NumPy columns the detector works on"""
+        table = self.read(start, end, services, environments, columns)
+        if table is None:
+            return {}
+        return to_columns(table)
+
+    def iter_partitions(self, start=None, end=None, columns=None):
+        """Yield ((service, environment), columns) one partition at a time"""
+        for key in self.partitions():
+            part = self.read_columns(start, end, [key[0]], [key[1]], columns)
+            if len(part.get('timestamp', ())):
+                yield key, part
+
+    def count(self, start=None, end=None):
+        """Rows per (service, environment) in a time range, without decoding any column"""
+        table = self.read(start, end, columns=['service', 'environment'])
+        if table is None or table.num_rows == 0:
+            return {}
+        counts = table.group_by(['service', 'environment']).aggregate([([], 'count_all')])
+        return {
+            (s, e): n for s, e, n in zip(
+                counts.column('service').to_pylist(),
+                counts.column('environment').to_pylist(),
+                counts.column('count_all').to_pylist()
+            )
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import CSV/JSON-lines logs into the columnar log store')
+    parser.add_argument('paths', nargs='+')
+    parser.add_argument('--root', help='Store directory (default: Config.LOG_STORE_DIR)')
+    parser.add_argument('--chunk-size', type=int, default=500_000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    store = LogStore(args.root)
+    for path in args.paths:
+        if path.endswith('.csv'):
+            chunks = pd.read_csv(path, chunksize=args.chunk_size)
+        else:
+            chunks = pd.read_json(path, lines=True, chunksize=args.chunk_size)
+        started = datetime.now()
+        rows = sum(store.write(chunk) for chunk in chunks)
+        print(f"{path}: {rows} rows in {(datetime.now() - started).total_seconds():.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,18 @@
 from monitoring_system import MonitoringSystem
+from http_ingestion import HttpIngestor
 import argparse
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('--real', action='store_true', help='Use real logs')
+    parser.add_argument('--workers', type=int, help='Detection worker processes, sharded by service-environment')
+    parser.add_argument('--http', action='store_true', help='Accept NDJSON logs over HTTP (Config.INGEST_HTTP_PORT)')
+    parser.add_argument('--port', type=int, help='Port for --http')
     args = parser.parse_args()
     
     try:
-        monitor = MonitoringSystem(simulate=not args.real)
+        ingestor = HttpIngestor(port=args.port).start() if args.http else None
+        monitor = MonitoringSystem(simulate=not (args.real or args.http), workers=args.workers, ingestor=ingestor)
         monitor.run_continuous_monitoring()
     except Exception as e:
         print(f"Failed to start monitoring: {str(e)}")
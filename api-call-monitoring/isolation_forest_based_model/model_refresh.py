@@ -0,0 +1,170 @@
+import logging
+import threading
+import numpy as np
+import pandas as pd
+from config import Config
+from batch_scorer import build_features, iter_partitions
+from partition_training import fit_partition, traffic_baseline
+from hierarchical_model import HierarchicalModels
+
+
+def ks_statistic(a, b):
+    """Two-sample Kolmogorov-Smirnov statistic for two sorted 1-D arrays"""
+    values = np.concatenate((a, b))
+    cdf_a = np.searchsorted(a, values, side='right') / len(a)
+    cdf_b = np.searchsorted(b, values, side='right') / len(b)
+    return float(np.max(np.abs(cdf_a - cdf_b)))
+
+
+class RowWindow:
+    """Fixed-size ring buffer holding the most recent feature rows of one partition"""
+
+    def __init__(self, capacity, n_features):
+        self.features = np.empty((capacity, n_features), dtype=np.float64)
+        self.timestamps = np.empty(capacity, dtype='datetime64[ns]')
+        self.capacity = capacity
+        self.size = 0
+        self.pos = 0
+        self.seen = 0  # rows appended since the last refresh of this partition
+
+    def append(self, X, timestamps):
+        if len(X) >= self.capacity:
+            X, timestamps = X[-self.capacity:], timestamps[-self.capacity:]
+        n = len(X)
+        end = self.pos + n
+        if end <= self.capacity:
+            self.features[self.pos:end] = X
+            self.timestamps[self.pos:end] = timestamps
+        else:
+            split = self.capacity - self.pos
+            self.features[self.pos:] = X[:split]
+            self.features[:n - split] = X[split:]
+            self.timestamps[self.pos:] = timestamps[:split]
+            self.timestamps[:n - split] = timestamps[split:]
+        self.pos = end % self.capacity
+        self.size = min(self.capacity, self.size + n)
+        self.seen += n
+
+    def snapshot(self):
+        return self.features[:self.size].copy(), self.timestamps[:self.size].copy()
+
+
+class ModelRefresher:
+    """Sliding-window refresh of the detector's per-partition models.
+
+    Detection feeds every scored batch into a bounded window per
+    (service, environment). A background thread periodically compares each
+    window with the data its current model was trained on (KS statistic on
+    response time, shift in error rate) and retrains only the partitions
+    that drifted. Keys that had no model in training (new services, scored
+    with the fallback model until then) get one, or an offset in
+    hierarchical mode, once their first window fills. Fitting happens off
+    the detection path; the new model and baseline are swapped in with a
+    single dict assignment each.
+    """
+
+    def __init__(self, detector, window_size=None, min_rows=None, registry=None):
+        self.config = Config()
+        self.detector = detector
+        self.registry = registry  # where REFRESH_PERSIST saves; None is the default ModelRegistry
+        self.window_size = window_size or self.config.REFRESH_WINDOW_SIZE
+        self.min_rows = min_rows or self.config.REFRESH_MIN_ROWS
+        self.windows = {}
+        self.references = {}
+        self.refresh_count = 0
+        self.last_drift = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.logger = logging.getLogger(__name__)
+
+    def set_reference(self, key, X):
+        """Remember the training distribution of a partition"""
+        self.references[key] = (np.sort(X[:, 0]), float(X[:, 1].mean()))
+
+    def observe(self, columns, X=None):
+        """Append a scored batch, and its feature matrix if already built, to the per-partition windows"""
+        if X is None:
+            X = build_features(columns)
+        timestamps = pd.to_datetime(columns['timestamp'], format='ISO8601').to_numpy(dtype='datetime64[ns]')
+        with self._lock:
+            for key, idx in iter_partitions(columns):
+                window = self.windows.get(key)
+                if window is None:
+                    window = self.windows[key] = RowWindow(self.window_size, X.shape[1])
+                window.append(X[idx], timestamps[idx])
+
+    def drift(self, key, X):
+        """Return (ks, error_rate_delta) of a window against the training reference"""
+        reference, error_rate = self.references[key]
+        return ks_statistic(reference, np.sort(X[:, 0])), abs(float(X[:, 1].mean()) - error_rate)
+
+    def refresh(self):
+        """Retrain drifted and new partitions; returns the keys that were swapped"""
+        with self._lock:
+            candidates = {
+                key: window.snapshot()
+                for key, window in self.windows.items()
+                if window.size >= self.min_rows and window.seen >= self.min_rows
+            }
+
+        params = {
+            'n_estimators': self.config.ISOLATION_FOREST_ESTIMATORS,
+            'contamination': self.config.CONTAMINATION,
+            'seed': self.config.RANDOM_SEED
+        }
+        refreshed = []
+        for key, (X, timestamps) in candidates.items():
+            models = self.detector.models
+            if key not in models:
+                # Not seen in training and scored with the fallback so far: fit it on its first full window
+                reason = "new key"
+            elif key not in self.references:
+                # Warm-started models carry no training sample: adopt the first full window
+                self.set_reference(key, X)
+                continue
+            else:
+                ks, error_delta = self.drift(key, X)
+                self.last_drift[key] = {'ks': ks, 'error_rate_delta': error_delta}
+                with self._lock:
+                    self.windows[key].seen = 0
+                if ks < self.config.DRIFT_KS_THRESHOLD and error_delta < self.config.DRIFT_ERROR_RATE_DELTA:
+                    continue
+                reason = f"ks={ks:.3f}, error rate delta={error_delta:.3f}"
+
+            if isinstance(models, HierarchicalModels) and not models.is_dedicated(key):
+                # Keys on the shared model only need a new offset, not a forest of their own
+                models.recalibrate(key, X, self.config.CONTAMINATION, self.config.HIERARCHICAL_PRIOR_ROWS)
+                self.detector.traffic_baselines[key] = traffic_baseline(timestamps)
+                action = f"Recalibrated {key[0]}/{key[1]}"
+            else:
+                _, clf, baseline, stats = fit_partition(key, X, timestamps, params)
+                models[key] = clf
+                self.detector.traffic_baselines[key] = baseline
+                action = f"Refreshed {key[0]}/{key[1]} on {stats['rows']} rows in {stats['fit_seconds']:.2f}s"
+            self.set_reference(key, X)
+            refreshed.append(key)
+            self.logger.info(f"{action} ({reason})")
+
+        self.refresh_count += len(refreshed)
+        return refreshed
+
+    def start(self, interval=None):
+        interval = interval or self.config.REFRESH_INTERVAL
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name='model-refresh', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                if self.refresh() and self.config.REFRESH_PERSIST:
+                    self.detector.save_models(self.registry)
+            except Exception as e:
+                self.logger.error(f"Model refresh failed: {str(e)}")
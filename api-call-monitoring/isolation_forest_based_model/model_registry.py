@@ -0,0 +1,258 @@
+import os
+import json
+import glob
+import shutil
+import logging
+import threading
+from collections.abc import MutableMapping
+from datetime import datetime
+import joblib
+import sklearn
+from config import Config
+from hierarchical_model import GLOBAL_KEY
+
+LEGACY_VERSION = 'legacy'
+
+
+def _model_filename(service, env):
+    if (service, env) == GLOBAL_KEY:
+        return "fallback_model.joblib"
+    return f"{service}_{env}_model.joblib"
+
+
+class LazyModelStore(MutableMapping):
+    """Dict of (service, environment) -> model that loads each file on first use.
+
+    Files are opened with joblib's ``mmap_mode``. With a mode set the NumPy
+    arrays inside the estimators are memory-mapped and shared between
+    worker processes through the page cache, at the cost of one open file
+    per tree array. A file that fails to load with an OSError (such as
+    running out of descriptors) is tried again on the next lookup; any
+    other failure drops the key.
+    """
+
+    def __init__(self, paths, mmap_mode=None):
+        self._paths = dict(paths)
+        self._loaded = {}
+        self._lock = threading.Lock()
+        self.mmap_mode = mmap_mode
+        self.logger = logging.getLogger(__name__)
+
+    def __getitem__(self, key):
+        model = self._loaded.get(key)
+        if model is not None:
+            return model
+        with self._lock:
+            if key in self._loaded:
+                return self._loaded[key]
+            path = self._paths[key]
+            try:
+                model = joblib.load(path, mmap_mode=self.mmap_mode)
+            except OSError as e:
+                self.logger.error(f"Failed to load model {path}, will retry: {str(e)}")
+                raise KeyError(key)
+            except Exception as e:
+                self.logger.error(f"Failed to load model {path}: {str(e)}")
+                del self._paths[key]
+                raise KeyError(key)
+            self._loaded[key] = model
+            return model
+
+    def __setitem__(self, key, model):
+        # A single dict assignment, so readers see either the old or the new model
+        self._loaded[key] = model
+
+    def __delitem__(self, key):
+        found = self._loaded.pop(key, None) is not None
+        found = self._paths.pop(key, None) is not None or found
+        if not found:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self._loaded or key in self._paths
+
+    def __iter__(self):
+        return iter(set(self._paths) | set(self._loaded))
+
+    def __len__(self):
+        return len(set(self._paths) | set(self._loaded))
+
+    @property
+    def loaded_count(self):
+        return len(self._loaded)
+
+
+class ModelRegistry:
+    """Versioned on-disk store for per-(service, environment) models and baselines.
+
+    Layout::
+
+        models/
+            LATEST                  name of the current version
+            v0001/manifest.json     keys, files and training metadata
+            v0001/<service>_<env>_model.joblib
+            v0001/fallback_model.joblib  model for keys without their own (per_key mode)
+            v0001/traffic_baselines.json
+            v0001/features.joblib   fitted FeatureEngineer, if the models use one
+            v0001/shared_model.joblib  shared model and per-key offsets (hierarchical mode)
+
+    Model files sitting directly in ``models/`` (the pre-registry layout)
+    are still readable as the ``legacy`` version.
+    """
+
+    def __init__(self, root=None, mmap_mode=None):
+        self.config = Config()
+        self.root = root or self.config.MODEL_DIR
+        self.mmap_mode = mmap_mode if mmap_mode is not None else self.config.MODEL_MMAP_MODE
+        self.logger = logging.getLogger(__name__)
+
+    def versions(self):
+        return sorted(
+            name for name in os.listdir(self.root)
+            if name.startswith('v') and os.path.isfile(os.path.join(self.root, name, 'manifest.json'))
+        ) if os.path.isdir(self.root) else []
+
+    def latest(self):
+        try:
+            with open(os.path.join(self.root, 'LATEST')) as f:
+                version = f.read().strip()
+            if version:
+                return version
+        except FileNotFoundError:
+            pass
+        if glob.glob(os.path.join(self.root, '*_model.joblib')):
+            return LEGACY_VERSION
+        return None
+
+    def save(self, models, baselines, metadata=None, features=None, shared=None):
+        """Write a new version atomically and point LATEST at it.
+
+        ``shared`` is HierarchicalModels.shared_state(); ``models`` then
+        holds just the dedicated models.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        versions = self.versions()
+        version = f"v{int(versions[-1][1:]) + 1 if versions else 1:04d}"
+        tmp_dir = os.path.join(self.root, f".{version}.tmp")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        entries = []
+        for (service, env), model in models.items():
+            filename = _model_filename(service, env)
+            # Uncompressed so the arrays can be memory-mapped on load
+            joblib.dump(model, os.path.join(tmp_dir, filename))
+            entries.append({'service': service, 'environment': env, 'file': filename})
+
+        with open(os.path.join(tmp_dir, 'traffic_baselines.json'), 'w') as f:
+            json.dump({f"{service}_{env}": baseline for (service, env), baseline in baselines.items()}, f)
+        if features is not None:
+            joblib.dump(features, os.path.join(tmp_dir, 'features.joblib'))
+        if shared is not None:
+            joblib.dump(shared, os.path.join(tmp_dir, 'shared_model.joblib'))
+
+        manifest = {
+            'version': version,
+            'created_at': datetime.now().isoformat(),
+            'sklearn_version': sklearn.__version__,
+            'models': entries,
+            'features_file': 'features.joblib' if features is not None else None,
+            'shared_file': 'shared_model.joblib' if shared is not None else None,
+            'baseline_keys': [[service, env] for service, env in baselines],
+            **(metadata or {})
+        }
+        with open(os.path.join(tmp_dir, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        os.rename(tmp_dir, os.path.join(self.root, version))
+        self._write_latest(version)
+        self.prune()
+        self.logger.info(f"Saved {len(entries)} models as {version}")
+        return version
+
+    def load(self, version=None, keys=None):
+        """Return (models, baselines, manifest) without reading any model file yet.
+
+        ``keys`` restricts the result to a subset of (service, environment)
+        pairs, e.g. one shard of a multi-process deployment.
+        """
+        version = version or self.latest()
+        if version is None:
+            return None
+        if version == LEGACY_VERSION:
+            directory = self.root
+            manifest = {'version': LEGACY_VERSION, 'models': self._legacy_entries()}
+        else:
+            directory = os.path.join(self.root, version)
+            with open(os.path.join(directory, 'manifest.json')) as f:
+                manifest = json.load(f)
+            if manifest.get('sklearn_version') != sklearn.__version__:
+                self.logger.warning(
+                    f"Models in {version} were trained with scikit-learn "
+                    f"{manifest.get('sklearn_version')}, running {sklearn.__version__}"
+                )
+
+        by_name = {}
+        paths = {}
+        for entry in manifest['models']:
+            key = (entry['service'], entry['environment'])
+            if keys is not None and key not in keys:
+                continue
+            by_name[f"{key[0]}_{key[1]}"] = key
+            paths[key] = os.path.join(directory, entry['file'])
+        # Hierarchical versions have baselines for keys without a model file of their own
+        for service, env in manifest.get('baseline_keys', []):
+            if keys is None or (service, env) in keys:
+                by_name[f"{service}_{env}"] = (service, env)
+
+        baselines = {}
+        try:
+            with open(os.path.join(directory, 'traffic_baselines.json')) as f:
+                for name, baseline in json.load(f).items():
+                    if name in by_name:
+                        baselines[by_name[name]] = baseline
+        except FileNotFoundError:
+            self.logger.warning(f"No traffic baselines stored with {version}")
+
+        return LazyModelStore(paths, mmap_mode=self.mmap_mode), baselines, manifest
+
+    def version_keys(self, manifest):
+        """Every (service, environment) a version was trained on, with or without its own model file"""
+        keys = {(entry['service'], entry['environment']) for entry in manifest['models']}
+        keys.update((service, env) for service, env in manifest.get('baseline_keys', []))
+        return keys
+
+    def load_features(self, manifest):
+        """The FeatureEngineer a loaded version was trained with, or None for plain build_features"""
+        return self._load_extra(manifest, 'features_file')
+
+    def load_shared(self, manifest):
+        """Shared model and per-key offsets of a hierarchical version, or None"""
+        return self._load_extra(manifest, 'shared_file')
+
+    def _load_extra(self, manifest, field):
+        filename = manifest.get(field)
+        if not filename:
+            return None
+        return joblib.load(os.path.join(self.root, manifest['version'], filename))
+
+    def prune(self, keep=None):
+        keep = keep or self.config.MODEL_KEEP_VERSIONS
+        current = self.latest()
+        for version in self.versions()[:-keep]:
+            if version != current:
+                shutil.rmtree(os.path.join(self.root, version), ignore_errors=True)
+
+    def _write_latest(self, version):
+        tmp_path = os.path.join(self.root, 'LATEST.tmp')
+        with open(tmp_path, 'w') as f:
+            f.write(version)
+        os.replace(tmp_path, os.path.join(self.root, 'LATEST'))
+
+    def _legacy_entries(self):
+        entries = []
+        for path in sorted(glob.glob(os.path.join(self.root, '*_model.joblib'))):
+            filename = os.path.basename(path)
+            service, env = filename[:-len('_model.joblib')].split('_', 1)
+            entries.append({'service': service, 'environment': env, 'file': filename})
+        return entries
@@ -4,15 +4,34 @@ import logging
 from log_generator import APILogGenerator
 from anomaly_detector import AnomalyDetector
 from ai_analyzer import AIAnalyzer
+from async_analyzer import AsyncAIAnalyzer
+from alert_cache import AlertDeduplicator
+from log_ingestion import LogIngestor
+from pipeline import Pipeline, BoundedQueue
+from sharded_detection import ShardedDetector
+from model_registry import ModelRegistry
 from config import Config
 
 class MonitoringSystem:
-    def __init__(self, simulate=True):
+    def __init__(self, simulate=True, detector=None, analyzer=None, ingestor=None, workers=None, registry=None):
+        """Pass a trained detector, an analyzer or an ingestor to replace the defaults (benchmarks, replays).
+
+        With workers > 1 (default Config.SHARD_WORKERS) scoring runs in a
+        ShardedDetector over the latest registry version instead of in
+        this process. ``registry`` is where models are loaded from and
+        refreshed versions are saved (default Config.MODEL_DIR).
+        """
         self.config = Config()
-        self.simulate = simulate
+        self.workers = workers or self.config.SHARD_WORKERS
+        self.registry = registry or ModelRegistry()
+        self.sharded = None
+        self.simulate = simulate and ingestor is None
         self.generator = APILogGenerator()
-        self.detector = AnomalyDetector()
-        self.analyzer = AIAnalyzer()
+        self.detector = detector or AnomalyDetector()
+        self.analyzer = analyzer or AIAnalyzer()
+        self.alerter = AsyncAIAnalyzer(self.analyzer)
+        self.deduplicator = AlertDeduplicator()
+        self.ingestor = ingestor or (None if self.simulate else LogIngestor())
         
         logging.basicConfig(
             level=logging.INFO,
@@ -20,37 +39,118 @@ class MonitoringSystem:
         )
         self.logger = logging.getLogger(__name__)
         
-        initial_logs = self.generator.generate_logs(count=1000)
-        self.detector.train_models(initial_logs)
+        if detector is None and not self.detector.load_models(self.registry):
+            initial_logs = self.generator.generate_logs(count=1000)
+            self.detector.train_models(initial_logs)
+            self.detector.save_models(self.registry)
+        if self.config.REFRESH_ENABLED and self.workers > 1:
+            self.logger.info("Model refresh is not available with sharded detection")
+        elif self.config.REFRESH_ENABLED:
+            self.detector.enable_refresh(registry=self.registry)
         self.logger.info("System initialized")
 
     def run_continuous_monitoring(self, interval=60):
+        """Run ingest -> score -> classify -> alert as threads joined by bounded queues.
+
+        A slow LLM only backs up the alert queue, which drops or coalesces
+        work according to Config.ALERT_QUEUE_POLICY; ingestion and scoring
+        keep their own pace.
+        """
         self.logger.info("Starting monitoring...")
+        self.pipeline = self.build_pipeline(interval)
+        self.pipeline.start()
         try:
             while True:
-                new_logs = self._get_new_logs()
-                anomalies = self.detector.detect_anomalies(new_logs)
-                
-                if anomalies:
-                    report = self.analyzer.generate_anomaly_report(anomalies)
-                    self.logger.info("\n=== ANOMALY REPORT ===")
-                    self.logger.info(report['analysis'])
-                    
-                    for anomaly in anomalies:
-                        alert = self.analyzer.generate_alert_message(anomaly)
-                        for line in alert.split('\n'):
-                            if line.startswith("ALERT:"):
-                                self.logger.warning(line)
-                            else:
-                                self.logger.info(line)
-                
-                time.sleep(interval)
+                time.sleep(self.config.PIPELINE_METRICS_INTERVAL)
+                for name, metrics in self.pipeline.metrics().items():
+                    self.logger.info(f"Stage {name}: {metrics}")
+                if hasattr(self.ingestor, 'metrics'):
+                    self.logger.info(f"Ingestion: {self.ingestor.metrics()}")
+                if self.sharded is not None:
+                    # Features and rates are computed in the workers; this process never sees them
+                    self.logger.info(f"Detection shards: {self.sharded.metrics()}")
+                else:
+                    self.logger.info(f"Feature computation: {self.detector.feature_stats()}")
+                    self.logger.info(f"Rate sketches: {self.detector.rate_stats()}")
+                    self.logger.info(f"Model coverage: {self.detector.coverage_stats()}")
                 
         except KeyboardInterrupt:
             self.logger.info("Monitoring stopped")
         except Exception as e:
             self.logger.error(f"Monitoring failed: {str(e)}")
             raise
+        finally:
+            self.pipeline.stop()
+            self.alerter.close()
+            if self.sharded is not None:
+                self.sharded.stop()
+            if self.ingestor is not None:
+                self.ingestor.close()
+
+    def build_pipeline(self, interval=60):
+        size = self.config.PIPELINE_QUEUE_SIZE
+        pipeline = Pipeline()
+        pipeline.add_stage('ingest', lambda: self._ingest(interval))
+        if self.workers > 1:
+            # Batches are submitted up to SHARD_MAX_INFLIGHT ahead and collected as they
+            # complete; the workers classify too, so their anomalies go straight to alerting
+            self.sharded = ShardedDetector(self.workers, self.registry).start()
+            pipeline.add_stage('submit', self._submit_sharded, BoundedQueue(size))
+            pipeline.add_stage('collect', self._collect_sharded)
+        else:
+            pipeline.add_stage('score', self._score, BoundedQueue(size))
+            pipeline.add_stage('classify', self._classify, BoundedQueue(size))
+        pipeline.add_stage('alert', self._alert, BoundedQueue(
+            size, policy=self.config.ALERT_QUEUE_POLICY, merge=self._coalesce_anomalies
+        ))
+        return pipeline
+
+    def _ingest(self, interval):
+        new_logs = self._get_new_logs()
+        # Keep draining real logs without pausing while a backlog remains;
+        # a blocking ingestor already waited for its micro-batch
+        if self.ingestor is not None and (
+            len(new_logs) >= self.ingestor.batch_size or getattr(self.ingestor, 'blocking', False)
+        ):
+            return new_logs, 0
+        return new_logs, interval
+
+    def _score(self, new_logs):
+        result = self.detector.score(new_logs)
+        return result, self.detector.detect_traffic_spikes(new_logs) + self.detector.detect_rate_anomalies(new_logs)
+
+    def _submit_sharded(self, new_logs):
+        self.sharded.submit(new_logs, tag=time.monotonic())
+
+    def _collect_sharded(self):
+        done = self.sharded.collect(timeout=0.5)
+        anomalies = [anomaly for _, batch in done for anomaly in batch]
+        # Lag is counted from the oldest batch's submission
+        return anomalies or None, 0, min((tag for tag, _ in done), default=None)
+
+    def _classify(self, scored):
+        result, events = scored
+        anomalies = self.detector.classify(result) if len(result['anomaly_score']) else []
+        return anomalies + events or None
+
+    def _coalesce_anomalies(self, queued, incoming):
+        # The alert stage groups by signature anyway; keep the newest anomalies
+        return (queued + incoming)[-self.config.PIPELINE_COALESCE_LIMIT:]
+
+    def _alert(self, anomalies):
+        report = self.analyzer.generate_anomaly_report(anomalies)
+        self.logger.info("\n=== ANOMALY REPORT ===")
+        self.logger.info(report['analysis'])
+        
+        groups = self.deduplicator.group(anomalies)
+        for group, alert in zip(groups, self.alerter.generate_alerts(groups)):
+            for line in alert.split('\n'):
+                if line.startswith("ALERT:"):
+                    count = f" (x{group['count']})" if group['count'] > 1 else ""
+                    self.logger.warning(line + count)
+                else:
+                    self.logger.info(line)
+        self.logger.info(f"Alert cache: {self.analyzer.cache.stats()}, dedup: {self.deduplicator.stats()}")
 
     def _get_new_logs(self):
         if self.simulate:
@@ -58,4 +158,4 @@ class MonitoringSystem:
                 count=random.randint(50, 200),
                 anomaly_ratio=self.config.ANOMALY_RATIO
             )
-        raise NotImplementedError("Real log collection not implemented")
\ No newline at end of file
+        return self.ingestor.poll()
\ No newline at end of file
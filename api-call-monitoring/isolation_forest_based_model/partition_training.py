@@ -0,0 +1,79 @@
+import os
+import time
+import zlib
+import resource
+import tracemalloc
+import pandas as pd
+from sklearn.ensemble import IsolationForest
+
+
+def partition_seed(key, base_seed):
+    """Stable per-partition random_state, independent of worker count and ordering"""
+    service, env = key
+    return (zlib.crc32(f"{service}|{env}".encode()) ^ base_seed) & 0x7FFFFFFF
+
+
+def traffic_baseline(timestamps):
+    """Mean/std of request counts per 5-minute bucket"""
+    index = pd.DatetimeIndex(pd.to_datetime(timestamps))
+    traffic = pd.Series(0, index=index).resample('5min').size()
+    return {'mean': traffic.mean(), 'std': traffic.std()}
+
+
+def fit_partition(key, X, timestamps, params):
+    """Fit one (service, environment) partition; safe to run in a worker process.
+
+    Returns (key, model, baseline, stats) where stats carries the fit time
+    and memory figures used to size training nodes. Allocation tracing via
+    tracemalloc slows fitting down by an order of magnitude, so it only
+    runs when params['trace_memory'] is set.
+    """
+    if params.get('trace_memory'):
+        tracemalloc.start()
+    start = time.perf_counter()
+
+    clf = IsolationForest(
+        n_estimators=params['n_estimators'],
+        contamination=params['contamination'],
+        random_state=partition_seed(key, params['seed'])
+    )
+    clf.fit(X)
+    fit_seconds = time.perf_counter() - start
+    baseline = traffic_baseline(timestamps) if timestamps is not None else None
+
+    stats = {
+        'service': key[0],
+        'environment': key[1],
+        'rows': len(X),
+        'fit_seconds': round(fit_seconds, 4),
+        # ru_maxrss is in KiB on Linux: the high-water mark of the whole worker
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'pid': os.getpid()
+    }
+    if params.get('trace_memory'):
+        _, peak_alloc = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        stats['peak_alloc_mb'] = round(peak_alloc / 2**20, 2)
+    return key, clf, baseline, stats
+
+
+def fit_stored_partition(root, key, start, end, params):
+    """fit_partition on rows read from a LogStore inside the worker.
+
+    Only the key's directory and the feature columns are read, so the
+    parent process never holds the training data and nothing large is
+    pickled to the pool. A fitted FeatureEngineer in params['features']
+    builds the model input; without one it is build_features. Returns None
+    when the range has no rows.
+    """
+    from log_store import LogStore, FEATURE_COLUMNS
+    from batch_scorer import build_features
+    from feature_engineering import INPUT_COLUMNS
+
+    features = params.get('features')
+    names = INPUT_COLUMNS if features is not None else FEATURE_COLUMNS
+    columns = LogStore(root).read_columns(start, end, [key[0]], [key[1]], names)
+    if not len(columns.get('timestamp', ())):
+        return None
+    X = features.transform(columns, stateful=False) if features is not None else build_features(columns)
+    return fit_partition(key, X, columns['timestamp'], params)
@@ -0,0 +1,194 @@
+import time
+import logging
+import threading
+from collections import deque
+import numpy as np
+
+POLICIES = ('block', 'drop_newest', 'drop_oldest', 'coalesce')
+LAG_SAMPLES = 1024
+
+
+class Envelope:
+    """A payload travelling between stages, stamped for lag accounting"""
+    __slots__ = ('payload', 'created_at', 'enqueued_at')
+
+    def __init__(self, payload, created_at=None):
+        self.payload = payload
+        self.created_at = created_at or time.monotonic()
+        self.enqueued_at = None
+
+
+class BoundedQueue:
+    """Bounded hand-off between two stages with an overflow policy.
+
+    ``block`` makes the producer wait, ``drop_newest`` discards the incoming
+    item, ``drop_oldest`` discards the head of the queue, and ``coalesce``
+    merges the incoming payload into the newest queued one with ``merge``.
+    """
+
+    def __init__(self, maxsize, policy='block', merge=None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown queue policy: {policy}")
+        if policy == 'coalesce' and merge is None:
+            raise ValueError("The coalesce policy needs a merge function")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.merge = merge
+        self.dropped = 0
+        self.coalesced = 0
+        self._items = deque()
+        self._cond = threading.Condition()
+
+    def put(self, envelope, stop_event=None):
+        with self._cond:
+            while len(self._items) >= self.maxsize:
+                if self.policy == 'drop_newest':
+                    self.dropped += 1
+                    return False
+                if self.policy == 'drop_oldest':
+                    self._items.popleft()
+                    self.dropped += 1
+                    break
+                if self.policy == 'coalesce':
+                    newest = self._items[-1]
+                    newest.payload = self.merge(newest.payload, envelope.payload)
+                    newest.created_at = min(newest.created_at, envelope.created_at)
+                    self.coalesced += 1
+                    return True
+                self._cond.wait(0.1)
+                if stop_event is not None and stop_event.is_set():
+                    return False
+            envelope.enqueued_at = time.monotonic()
+            self._items.append(envelope)
+            self._cond.notify_all()
+            return True
+
+    def get(self, timeout=None):
+        with self._cond:
+            if not self._items:
+                self._cond.wait(timeout)
+                if not self._items:
+                    return None
+            envelope = self._items.popleft()
+            self._cond.notify_all()
+            return envelope
+
+    def __len__(self):
+        return len(self._items)
+
+
+class Stage(threading.Thread):
+    """Runs ``fn`` on every item of ``inbox`` and forwards non-empty results.
+
+    A stage without an inbox is a source: ``fn`` is called in a loop and
+    returns (payload, pause_seconds), or (payload, pause_seconds,
+    created_at) when the payload was ingested earlier than the call.
+    """
+
+    def __init__(self, name, fn, inbox=None, outbox=None):
+        super().__init__(name=f"stage-{name}", daemon=True)
+        self.stage_name = name
+        self.fn = fn
+        self.inbox = inbox
+        self.outbox = outbox
+        self.stop_event = threading.Event()
+        self.processed = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.queue_lag = 0.0  # seconds the last item waited in the inbox
+        self.max_queue_lag = 0.0
+        self.end_to_end_lag = 0.0  # seconds since the last item was ingested
+        self.lag_samples = deque(maxlen=LAG_SAMPLES)
+        self.working = False
+        self.logger = logging.getLogger(__name__)
+
+    def run(self):
+        while not self.stop_event.is_set():
+            if self.inbox is None:
+                envelope = Envelope(None)
+            else:
+                envelope = self.inbox.get(timeout=0.5)
+                if envelope is None:
+                    continue
+                self.working = True
+                self.queue_lag = time.monotonic() - envelope.enqueued_at
+                self.max_queue_lag = max(self.max_queue_lag, self.queue_lag)
+
+            start = time.monotonic()
+            pause = 0
+            try:
+                if self.inbox is None:
+                    result, pause, *created_at = self.fn()
+                    if created_at and created_at[0] is not None:
+                        envelope.created_at = created_at[0]
+                else:
+                    result = self.fn(envelope.payload)
+            except Exception as e:
+                self.errors += 1
+                self.logger.error(f"Stage {self.stage_name} failed: {str(e)}")
+                result = None
+            finished = time.monotonic()
+            self.busy_seconds += finished - start
+            self.processed += 1
+            self.end_to_end_lag = finished - envelope.created_at
+            self.lag_samples.append(self.end_to_end_lag)
+
+            if result and self.outbox is not None:
+                self.outbox.put(Envelope(result, envelope.created_at), self.stop_event)
+            self.working = False
+            if pause:
+                self.stop_event.wait(pause)
+
+    def stop(self):
+        self.stop_event.set()
+
+    def metrics(self):
+        lags = np.asarray(self.lag_samples) if self.lag_samples else np.zeros(1)
+        return {
+            'processed': self.processed,
+            'errors': self.errors,
+            'busy_seconds': round(self.busy_seconds, 3),
+            'queue_depth': len(self.inbox) if self.inbox is not None else 0,
+            'queue_lag': round(self.queue_lag, 3),
+            'max_queue_lag': round(self.max_queue_lag, 3),
+            'end_to_end_lag': round(self.end_to_end_lag, 3),
+            'end_to_end_p50': round(float(np.percentile(lags, 50)), 3),
+            'end_to_end_p99': round(float(np.percentile(lags, 99)), 3),
+            'dropped': self.inbox.dropped if self.inbox is not None else 0,
+            'coalesced': self.inbox.coalesced if self.inbox is not None else 0
+        }
+
+
+class Pipeline:
+    """A chain of stages connected by bounded queues"""
+
+    def __init__(self):
+        self.stages = []
+
+    def add_stage(self, name, fn, queue=None):
+        """Append a stage; ``queue`` feeds it from the previous stage (None for a source)"""
+        if self.stages:
+            self.stages[-1].outbox = queue
+        stage = Stage(name, fn, inbox=queue)
+        self.stages.append(stage)
+        return stage
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+
+    def stop(self, timeout=5):
+        for stage in self.stages:
+            stage.stop()
+        for stage in self.stages:
+            stage.join(timeout)
+
+    def idle(self):
+        """True when every queue is empty and no stage is processing an item"""
+        return all(
+            len(stage.inbox) == 0 and not stage.working
+            for stage in self.stages if stage.inbox is not None
+        )
+
+    def metrics(self):
+        return {stage.stage_name: stage.metrics() for stage in self.stages}
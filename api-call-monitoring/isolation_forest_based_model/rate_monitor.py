@@ -0,0 +1,234 @@
+import time
+import logging
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from config import Config
+from traffic_monitor import to_epoch_seconds
+
+# Key kinds tracked next to (service, environment), and the column holding the key
+KEY_COLUMNS = {'user': 'user_id', 'endpoint': 'endpoint'}
+
+
+def key_hashes(columns, column):
+    """64-bit hash of (service, environment, column) per row"""
+    frame = pd.DataFrame({
+        'service': columns['service'],
+        'environment': columns['environment'],
+        column: columns[column]
+    })
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+
+class DecayedCountMin:
+    """Count-min sketch of exponentially decayed event counts, one table per half-life.
+
+    Forward decay: an event at time t adds exp((t - landmark) / tau) to
+    its cells, so nothing is touched as time passes and a count is read
+    back by scaling with exp(-(now - landmark) / tau). The landmark moves
+    forward (one multiply over the tables) before the weights can
+    overflow. Memory is half_lives x depth x width floats, whatever the
+    number of distinct keys; estimates only ever overcount.
+    """
+
+    def __init__(self, width, depth, half_lives, seed):
+        if width & (width - 1):
+            raise ValueError("Sketch width must be a power of two")
+        self.width = width
+        self.tau = np.array(half_lives, dtype=np.float64) / np.log(2)
+        self.shift = np.uint64(64 - (width.bit_length() - 1))
+        # Multiply-shift hashing: one odd 64-bit multiplier per row
+        rng = np.random.default_rng(seed)
+        self.multipliers = (rng.integers(0, 2**63, depth, dtype=np.uint64) << np.uint64(1)) | np.uint64(1)
+        self.tables = np.zeros((len(half_lives), depth, width))
+        self.landmark = None
+
+    @property
+    def nbytes(self):
+        return self.tables.nbytes
+
+    def _cells(self, hashes):
+        return ((hashes[None, :] * self.multipliers[:, None]) >> self.shift).astype(np.intp)
+
+    def add(self, hashes, seconds):
+        if self.landmark is None:
+            self.landmark = float(seconds.min())
+        latest = float(seconds.max())
+        if (latest - self.landmark) / self.tau.min() > 50:
+            self.tables *= np.exp(-(latest - self.landmark) / self.tau)[:, None, None]
+            self.landmark = latest
+        cells = self._cells(hashes)
+        for window, tau in enumerate(self.tau):
+            weights = np.exp((seconds - self.landmark) / tau)
+            for row, idx in enumerate(cells):
+                self.tables[window, row] += np.bincount(idx, weights, minlength=self.width)
+
+    def estimate(self, hashes, now):
+        """Decayed counts at ``now``, one row per half-life"""
+        if self.landmark is None:
+            return np.zeros((len(self.tau), len(hashes)))
+        cells = self._cells(hashes)
+        rows = np.arange(cells.shape[0])[:, None]
+        counts = np.stack([table[rows, cells].min(axis=0) for table in self.tables])
+        return counts * np.exp(-(now - self.landmark) / self.tau)[:, None]
+
+    def rates(self, hashes, now, elapsed):
+        """Requests per minute over each decay window.
+
+        A steady rate r builds up a decayed count of r * tau * (1 - exp(-elapsed / tau));
+        dividing by that keeps the long window unbiased while it is still filling.
+        """
+        span = self.tau * -np.expm1(-max(elapsed, 1.0) / self.tau)
+        return self.estimate(hashes, now) / span[:, None] * 60.0
+
+
+class RateAnomalyDetector:
+    """Streaming request-rate anomalies per user and per endpoint.
+
+    Every (service, environment, user_id) and (service, environment,
+    endpoint) is counted in a decayed count-min sketch with a short and a
+    long half-life. A key is reported when its short-window rate reaches
+    the kind's minimum and RATE_SPIKE_RATIO times its own long-window
+    baseline, or crosses the kind's hard ceiling. The heaviest keys by
+    short-window rate are kept in a bounded table for ``heavy_hitters``.
+    Memory is fixed by the sketch size and the table limits, not by the
+    number of distinct users or endpoints.
+    """
+
+    def __init__(self):
+        self.config = Config()
+        self.sketches = {
+            kind: DecayedCountMin(self.config.RATE_SKETCH_WIDTH, self.config.RATE_SKETCH_DEPTH,
+                                  self.config.RATE_HALF_LIVES, self.config.RANDOM_SEED)
+            for kind in KEY_COLUMNS
+        }
+        self.limits = {
+            'user': (self.config.RATE_USER_MIN_RPM, self.config.RATE_USER_MAX_RPM),
+            'endpoint': (self.config.RATE_ENDPOINT_MIN_RPM, self.config.RATE_ENDPOINT_MAX_RPM),
+        }
+        self.heavy = {kind: {} for kind in KEY_COLUMNS}  # key hash -> (service, environment, value)
+        self.reported = OrderedDict()  # (kind, key hash) -> event time of the last report
+        self.start = None
+        self.now = None
+        self.batches = 0
+        self.rows = 0
+        self.seconds = 0.0
+        self.logger = logging.getLogger(__name__)
+
+    def observe(self, columns):
+        """Count a batch of events; returns rate anomalies for keys that just crossed their limits"""
+        if not columns or len(columns['timestamp']) == 0:
+            return []
+        started = time.perf_counter()
+        seconds = to_epoch_seconds(columns['timestamp']).astype(np.float64)
+        if self.start is None:
+            self.start = self.now = float(seconds.min())
+        self.now = max(self.now, float(seconds.max()))
+        elapsed = self.now - self.start
+
+        anomalies = []
+        for kind, column in KEY_COLUMNS.items():
+            hashes = key_hashes(columns, column)
+            sketch = self.sketches[kind]
+            sketch.add(hashes, seconds)
+            keys, first, inverse = np.unique(hashes, return_index=True, return_inverse=True)
+            short, long = sketch.rates(keys, self.now, elapsed)
+            self._update_heavy_hitters(kind, keys, first, columns, column, short)
+
+            min_rpm, max_rpm = self.limits[kind]
+            flagged = (short >= min_rpm) & (short >= self.config.RATE_SPIKE_RATIO * long)
+            if max_rpm:
+                flagged |= short >= max_rpm
+            if not flagged.any():
+                continue
+            last_seen = np.full(len(keys), -np.inf)
+            np.maximum.at(last_seen, inverse.ravel(), seconds)
+            for i in np.flatnonzero(flagged):
+                if not self._should_report((kind, int(keys[i]))):
+                    continue
+                row = first[i]
+                anomalies.append({
+                    'timestamp': pd.Timestamp(last_seen[i], unit='s').isoformat(),
+                    'service': columns['service'][row],
+                    'environment': columns['environment'][row],
+                    column: columns[column][row],
+                    'rate_key': kind,
+                    'request_rate_rpm': round(float(short[i]), 3),
+                    'baseline_rate_rpm': round(float(long[i]), 3),
+                    'anomaly_type': 'rate_anomaly'
+                })
+
+        self.batches += 1
+        self.rows += len(seconds)
+        self.seconds += time.perf_counter() - started
+        return anomalies
+
+    def _should_report(self, key):
+        """Report a key at most once per RATE_ALERT_INTERVAL of event time"""
+        interval = self.config.RATE_ALERT_INTERVAL
+        while self.reported:
+            oldest, at = next(iter(self.reported.items()))
+            if self.now - at < interval and len(self.reported) < self.config.RATE_ALERT_KEYS:
+                break
+            del self.reported[oldest]
+        if key in self.reported:
+            return False
+        self.reported[key] = self.now
+        return True
+
+    def _update_heavy_hitters(self, kind, keys, first, columns, column, short):
+        """Keep the RATE_HEAVY_HITTERS keys with the highest short-window rate"""
+        limit = self.config.RATE_HEAVY_HITTERS
+        table = self.heavy[kind]
+        tracked = np.fromiter(table, dtype=np.uint64, count=len(table))
+        candidates = np.flatnonzero(~np.isin(keys, tracked))
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-short[candidates], limit)[:limit]]
+        if len(tracked):
+            tracked_rates = self.sketches[kind].rates(tracked, self.now, self.now - self.start)[0]
+        else:
+            tracked_rates = np.empty(0)
+
+        all_keys = np.concatenate((tracked, keys[candidates]))
+        all_rates = np.concatenate((tracked_rates, short[candidates]))
+        labels = list(table.values()) + [
+            (columns['service'][first[i]], columns['environment'][first[i]], columns[column][first[i]])
+            for i in candidates
+        ]
+        keep = np.argsort(-all_rates, kind='stable')[:limit]
+        self.heavy[kind] = {int(all_keys[i]): labels[i] for i in keep}
+
+    def heavy_hitters(self, kind='user', n=10):
+        """Top keys of a kind by short-window request rate, highest first"""
+        table = self.heavy[kind]
+        if not table:
+            return []
+        keys = np.fromiter(table, dtype=np.uint64, count=len(table))
+        short, long = self.sketches[kind].rates(keys, self.now, self.now - self.start)
+        column = KEY_COLUMNS[kind]
+        labels = list(table.values())
+        return [
+            {
+                'service': labels[i][0],
+                'environment': labels[i][1],
+                column: labels[i][2],
+                'request_rate_rpm': round(float(short[i]), 3),
+                'baseline_rate_rpm': round(float(long[i]), 3)
+            }
+            for i in np.argsort(-short, kind='stable')[:n]
+        ]
+
+    def nbytes(self):
+        return sum(sketch.nbytes for sketch in self.sketches.values())
+
+    def stats(self):
+        """Sketch memory and per-batch cost so far"""
+        return {
+            'batches': self.batches,
+            'rows': self.rows,
+            'mean_batch_ms': round(self.seconds / self.batches * 1000, 3) if self.batches else None,
+            'us_per_row': round(self.seconds / self.rows * 1e6, 3) if self.rows else None,
+            'sketch_mb': round(self.nbytes() / 2**20, 3),
+            'heavy_hitters': {kind: len(table) for kind, table in self.heavy.items()},
+            'reported_keys': len(self.reported),
+        }
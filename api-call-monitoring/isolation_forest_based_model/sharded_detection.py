@@ -0,0 +1,297 @@
+import time
+import zlib
+import logging
+import threading
+import multiprocessing as mp
+from multiprocessing.connection import wait
+import numpy as np
+from config import Config
+from batch_scorer import to_columns, iter_partitions
+from model_registry import ModelRegistry
+from hierarchical_model import GLOBAL_KEY
+
+
+def shard_of(key, n_shards):
+    """Stable shard of a (service, environment); hash() is salted per process"""
+    return zlib.crc32(f"{key[0]}\x1f{key[1]}".encode()) % n_shards
+
+
+def split_batch(columns, n_shards):
+    """Row indices per shard, rows kept in their original order"""
+    parts = {}
+    for key, idx in iter_partitions(columns):
+        parts.setdefault(shard_of(key, n_shards), []).append(idx)
+    return {shard: np.sort(np.concatenate(idx)) for shard, idx in parts.items()}
+
+
+def detect_shard(detector, columns):
+    """Everything MonitoringSystem's score and classify stages do for one batch"""
+    result = detector.score(columns)
+    anomalies = detector.classify(result) if len(result['anomaly_score']) else []
+    return anomalies + detector.detect_traffic_spikes(columns) + detector.detect_rate_anomalies(columns)
+
+
+def _worker_main(shard, inbox, results, registry_root, version, keys):
+    """Detection loop of one worker: load the shard's models, then score sub-batches until None"""
+    from anomaly_detector import AnomalyDetector
+
+    detector = AnomalyDetector()
+    detector.load_models(ModelRegistry(registry_root), version=version, keys=keys)
+    while True:
+        message = inbox.get()
+        if message is None:
+            break
+        batch_id, columns = message
+        start = time.perf_counter()
+        try:
+            anomalies, error = detect_shard(detector, columns), None
+        except Exception as e:
+            anomalies, error = [], str(e)
+        results.send((batch_id, anomalies, time.perf_counter() - start, error))
+
+
+class ShardedDetector:
+    """Detection spread over worker processes, each holding one shard of the models.
+
+    A batch is split by a stable hash of (service, environment), so every
+    key always lands on the same worker together with its model, spike
+    counters and rate sketches; each worker loads only its shard from a
+    pinned registry version. Work goes out on a local queue per worker and
+    results come back on a pipe per worker; the anomalies of a batch are
+    merged into one list in timestamp order.
+
+    ``submit`` queues up to SHARD_MAX_INFLIGHT batches ahead, so workers
+    never wait for the caller between batches; ``collect`` hands back
+    whatever batches completed since, and may run in another thread than
+    ``submit`` (the pipeline's submit and collect stages). ``detect`` is
+    the synchronous submit-and-wait for one batch.
+
+    Sub-batches stay pending until their worker answers. A worker that
+    dies is started again on a fresh queue and its pending sub-batches are
+    re-sent, up to SHARD_MAX_RETRIES times each; its in-memory state
+    (feature tails, counters, sketches) starts over. Per-user features only
+    see the requests within the user's shard, and model refresh runs only
+    in single-process mode.
+    """
+
+    def __init__(self, n_workers=None, registry=None, version=None):
+        self.config = Config()
+        self.n_workers = n_workers or self.config.SHARD_WORKERS
+        self.registry = registry or ModelRegistry()
+        self.version = version or self.registry.latest()
+        if self.version is None:
+            raise ValueError(f"No model version in {self.registry.root} to shard")
+        manifest = self.registry.load(self.version)[2]
+        keys = self.registry.version_keys(manifest)
+        # Every shard scores keys it has no model for with the fallback model
+        self.shard_keys = [
+            {key for key in keys if shard_of(key, self.n_workers) == shard} | (keys & {GLOBAL_KEY})
+            for shard in range(self.n_workers)
+        ]
+        self.context = mp.get_context(self.config.SHARD_START_METHOD)
+        self.workers = [None] * self.n_workers  # (process, inbox, results reader) per shard
+        self.pending = {}  # batch_id -> {'parts': {shard: columns}, 'attempts': {shard: n}, 'anomalies': [...]}
+        self.completed = {}
+        self.next_batch = 0
+        self.restarts = 0
+        self.dropped_parts = 0
+        self.errors = 0
+        self.shard_rows = [0] * self.n_workers
+        self.shard_seconds = [0.0] * self.n_workers
+        self._lock = threading.RLock()  # pending, completed and workers
+        self._room = threading.Condition(self._lock)  # a batch completed
+        self._polling = threading.Lock()  # one thread reads the pipes at a time
+        self.logger = logging.getLogger(__name__)
+
+    def start(self):
+        for shard in range(self.n_workers):
+            self._spawn(shard)
+        self.logger.info(
+            f"Started {self.n_workers} detection workers on {self.version}, "
+            f"keys per shard: {[len(keys) for keys in self.shard_keys]}"
+        )
+        return self
+
+    def _spawn(self, shard):
+        inbox = self.context.Queue()
+        reader, writer = self.context.Pipe(duplex=False)
+        process = self.context.Process(
+            target=_worker_main, name=f"detect-shard-{shard}", daemon=True,
+            args=(shard, inbox, writer, self.registry.root, self.version, self.shard_keys[shard])
+        )
+        process.start()
+        writer.close()  # the worker holds the only write end, so its death shows up as EOF
+        self.workers[shard] = (process, inbox, reader)
+        # Anything the previous worker of this shard never answered, in batch order
+        for batch_id in sorted(self.pending):
+            part = self.pending[batch_id]['parts'].get(shard)
+            if part is not None:
+                inbox.put((batch_id, part))
+
+    def submit(self, logs, tag=None):
+        """Queue a batch on the workers, waiting while SHARD_MAX_INFLIGHT are pending.
+
+        Returns the id to pass to ``result``; ``tag`` comes back with the
+        batch from ``collect``.
+        """
+        columns = to_columns(logs)
+        parts = {}
+        if columns and len(next(iter(columns.values()))):
+            for shard, idx in split_batch(columns, self.n_workers).items():
+                parts[shard] = {name: col[idx] for name, col in columns.items()}
+        while True:
+            with self._room:
+                if len(self.pending) < self.config.SHARD_MAX_INFLIGHT:
+                    break
+                # Some other thread is reading the pipes; wait for it to complete a batch
+                if self._polling.locked():
+                    self._room.wait(0.5)
+                    continue
+            self._poll(0.5)
+
+        with self._lock:
+            batch_id = self.next_batch
+            self.next_batch += 1
+            self.pending[batch_id] = {'parts': parts, 'attempts': dict.fromkeys(parts, 0), 'anomalies': [],
+                                      'tag': tag}
+            for shard, part in parts.items():
+                self.workers[shard][1].put((batch_id, part))
+            if not parts:
+                self._complete(batch_id)
+        return batch_id
+
+    def result(self, batch_id):
+        """Wait for a submitted batch and return its merged anomalies"""
+        while True:
+            with self._lock:
+                if batch_id in self.completed:
+                    return self.completed.pop(batch_id)[1]
+            self._poll(0.5)
+
+    def collect(self, timeout=0.5):
+        """(tag, anomalies) of every batch completed so far, in submission order.
+
+        Waits up to ``timeout`` for the pipes when nothing has completed yet.
+        """
+        with self._lock:
+            ready = bool(self.completed)
+        if not ready:
+            self._poll(timeout)
+        with self._lock:
+            done = [self.completed.pop(batch_id) for batch_id in sorted(self.completed)]
+        return done
+
+    def detect(self, logs):
+        return self.result(self.submit(logs))
+
+    def _poll(self, timeout):
+        if not self._polling.acquire(timeout=timeout):
+            return
+        try:
+            with self._lock:
+                workers = list(self.workers)
+            readers = {worker[2]: shard for shard, worker in enumerate(workers)}
+            sentinels = {worker[0].sentinel: shard for shard, worker in enumerate(workers)}
+            for ready in wait(list(readers) + list(sentinels), timeout):
+                shard = readers.get(ready, sentinels.get(ready))
+                with self._lock:
+                    if self.workers[shard][2] is not ready and self.workers[shard][0].sentinel is not ready:
+                        continue  # already restarted in this round
+                    if ready in readers:
+                        try:
+                            self._receive(shard, ready.recv())
+                            continue
+                        except (EOFError, OSError):
+                            pass
+                    self._recover(shard)
+        finally:
+            self._polling.release()
+
+    def _receive(self, shard, message):
+        batch_id, anomalies, seconds, error = message
+        batch = self.pending.get(batch_id)
+        if batch is None or shard not in batch['parts']:
+            return  # answered twice around a restart
+        part = batch['parts'].pop(shard)
+        self.shard_rows[shard] += len(next(iter(part.values())))
+        self.shard_seconds[shard] += seconds
+        if error is not None:
+            self.errors += 1
+            self.logger.error(f"Shard {shard} failed on batch {batch_id}: {error}")
+        batch['anomalies'].extend(anomalies)
+        if not batch['parts']:
+            self._complete(batch_id)
+
+    def _complete(self, batch_id):
+        batch = self.pending.pop(batch_id)
+        anomalies = sorted(batch['anomalies'], key=lambda anomaly: str(anomaly.get('timestamp')))
+        self.completed[batch_id] = (batch['tag'], anomalies)
+        self._room.notify_all()
+
+    def _recover(self, shard):
+        process, inbox, reader = self.workers[shard]
+        # Answers the worker sent before it died are still valid
+        try:
+            while reader.poll():
+                self._receive(shard, reader.recv())
+        except (EOFError, OSError):
+            pass
+        process.join(timeout=1)
+        if process.is_alive():
+            process.kill()
+            process.join()
+        inbox.cancel_join_thread()
+        inbox.close()
+        reader.close()
+        self.restarts += 1
+        self.logger.error(f"Detection worker for shard {shard} exited with {process.exitcode}, restarting")
+
+        for batch_id in sorted(self.pending):
+            batch = self.pending[batch_id]
+            if shard not in batch['parts']:
+                continue
+            batch['attempts'][shard] += 1
+            if batch['attempts'][shard] > self.config.SHARD_MAX_RETRIES:
+                del batch['parts'][shard]
+                self.dropped_parts += 1
+                self.logger.error(f"Dropped shard {shard} of batch {batch_id} after repeated worker crashes")
+                if not batch['parts']:
+                    self._complete(batch_id)
+        self._spawn(shard)
+
+    def stop(self):
+        with self._polling:
+            self._stop()
+
+    def _stop(self):
+        # Slots are None before start() and after a previous stop()
+        workers = [worker for worker in self.workers if worker is not None]
+        for process, inbox, _ in workers:
+            if process.is_alive():
+                inbox.put(None)
+        for process, inbox, reader in workers:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.kill()
+                process.join()
+            inbox.close()
+            reader.close()
+        self.workers = [None] * self.n_workers
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def metrics(self):
+        return {
+            'workers': self.n_workers,
+            'alive': sum(1 for worker in self.workers if worker is not None and worker[0].is_alive()),
+            'inflight_batches': len(self.pending),
+            'restarts': self.restarts,
+            'dropped_parts': self.dropped_parts,
+            'errors': self.errors,
+            'shard_rows': list(self.shard_rows),
+            'shard_busy_seconds': [round(seconds, 3) for seconds in self.shard_seconds],
+        }
@@ -0,0 +1,63 @@
+import unittest
+from unittest import mock
+from alert_cache import AlertCache, AlertDeduplicator, anomaly_signature
+
+LATENCY = {'service': 'auth', 'environment': 'prod', 'anomaly_type': 'high_latency', 'status_code': 200}
+RATE = {'service': 'auth', 'environment': 'prod', 'anomaly_type': 'rate_anomaly', 'rate_key': 'user'}
+
+
+class AnomalySignatureTest(unittest.TestCase):
+    def test_latency_is_bucketed(self):
+        self.assertEqual(anomaly_signature({**LATENCY, 'response_time': 260}, 250),
+                         anomaly_signature({**LATENCY, 'response_time': 499.9}, 250))
+        self.assertNotEqual(anomaly_signature({**LATENCY, 'response_time': 260}, 250),
+                            anomaly_signature({**LATENCY, 'response_time': 500}, 250))
+
+    def test_status_and_type_split_signatures(self):
+        self.assertNotEqual(anomaly_signature({**LATENCY, 'response_time': 10}),
+                            anomaly_signature({**LATENCY, 'response_time': 10, 'status_code': 503}))
+        self.assertNotEqual(anomaly_signature(LATENCY), anomaly_signature({**LATENCY, 'anomaly_type': 'behavioral'}))
+
+    def test_missing_or_bad_latency(self):
+        self.assertEqual(anomaly_signature(LATENCY)[-1], None)
+        self.assertEqual(anomaly_signature({**LATENCY, 'response_time': 'slow'})[-1], None)
+
+    def test_rate_anomalies_keep_their_key(self):
+        self.assertNotEqual(anomaly_signature({**RATE, 'user_id': 'u1'}), anomaly_signature({**RATE, 'user_id': 'u2'}))
+        self.assertNotEqual(anomaly_signature({**RATE, 'rate_key': 'endpoint', 'endpoint': '/a'}),
+                            anomaly_signature({**RATE, 'rate_key': 'endpoint', 'endpoint': '/b'}))
+        self.assertEqual(anomaly_signature({**RATE, 'user_id': 'u1', 'request_rate_rpm': 900}),
+                         anomaly_signature({**RATE, 'user_id': 'u1', 'request_rate_rpm': 1200}))
+
+
+class AlertCacheTest(unittest.TestCase):
+    def test_lru_eviction_and_ttl(self):
+        cache = AlertCache(maxsize=2, ttl=10)
+        with mock.patch('alert_cache.time.monotonic', return_value=100.0):
+            cache.put('a', 'A')
+            cache.put('b', 'B')
+            self.assertEqual(cache.get('a'), 'A')
+            cache.put('c', 'C')  # evicts b, the least recently used
+            self.assertIsNone(cache.get('b'))
+        with mock.patch('alert_cache.time.monotonic', return_value=111.0):
+            self.assertIsNone(cache.get('a'))
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['evictions'], stats['expirations']), (1, 1, 1))
+
+
+class AlertDeduplicatorTest(unittest.TestCase):
+    def test_groups_then_suppresses_within_window(self):
+        dedup = AlertDeduplicator(window=60)
+        batch = [{**RATE, 'user_id': 'u1', 'timestamp': 't1'}, {**RATE, 'user_id': 'u1', 'timestamp': 't2'},
+                 {**RATE, 'user_id': 'u2', 'timestamp': 't3'}]
+        with mock.patch('alert_cache.time.monotonic', return_value=100.0):
+            groups = dedup.group(batch)
+            self.assertEqual([(g['user_id'], g['count'], g['last_seen']) for g in groups], [('u1', 2, 't2'), ('u2', 1, 't3')])
+            self.assertEqual(dedup.group(batch), [])
+        with mock.patch('alert_cache.time.monotonic', return_value=161.0):
+            self.assertEqual(len(dedup.group(batch)), 2)
+        self.assertEqual(dedup.stats()['suppressed'], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
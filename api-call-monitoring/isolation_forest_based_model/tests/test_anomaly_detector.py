@@ -0,0 +1,83 @@
+import logging
+import os
+import tempfile
+import unittest
+import numpy as np
+from anomaly_detector import AnomalyDetector
+from hierarchical_model import GLOBAL_KEY
+from log_generator import APILogGenerator
+from model_refresh import ModelRefresher
+from model_registry import ModelRegistry
+
+DJANGO_KEY = ('django-api', 'on-prem')
+
+
+def django_rows(columns):
+    """The same rows, relabelled as a key no model was trained for"""
+    columns = dict(columns)
+    n = len(columns['service'])
+    columns['service'] = np.full(n, DJANGO_KEY[0], dtype=object)
+    columns['environment'] = np.full(n, DJANGO_KEY[1], dtype=object)
+    return columns
+
+
+class UnseenKeyTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        logging.disable(logging.WARNING)
+        cls.detector = AnomalyDetector()
+        cls.detector.train_models(APILogGenerator(seed=5).generate_columns(5000, anomaly_ratio=0))
+        cls.models = dict(cls.detector.models)
+
+    @classmethod
+    def tearDownClass(cls):
+        logging.disable(logging.NOTSET)
+
+    def setUp(self):
+        self.generator = APILogGenerator(seed=6)
+        self.detector.models = dict(self.models)
+        self.detector.fallback_rows.clear()
+        self.detector.skipped_rows.clear()
+
+    def test_fallback_model_is_trained(self):
+        self.assertIn(GLOBAL_KEY, self.detector.models)
+        self.assertNotIn(GLOBAL_KEY, self.detector.traffic_baselines)
+
+    def test_unseen_key_is_scored_with_the_fallback(self):
+        batch = django_rows(self.generator.generate_columns(1000, anomaly_ratio=0.1))
+        result = self.detector.score(batch)
+        self.assertGreater(len(result['service']), 0)
+        self.assertEqual(set(result['service']), {DJANGO_KEY[0]})
+        self.assertEqual(self.detector.coverage_stats(), {'fallback_rows': {'django-api/on-prem': 1000},
+                                                          'skipped_rows': {}})
+
+    def test_without_a_fallback_rows_are_counted_as_skipped(self):
+        del self.detector.models[GLOBAL_KEY]
+        result = self.detector.score(django_rows(self.generator.generate_columns(300)))
+        self.assertEqual(len(result['service']), 0)
+        self.assertEqual(self.detector.coverage_stats()['skipped_rows'], {'django-api/on-prem': 300})
+
+    def test_fallback_is_saved_and_loaded(self):
+        with tempfile.TemporaryDirectory() as root:
+            registry = ModelRegistry(root)
+            version = self.detector.save_models(registry)
+            self.assertTrue(os.path.isfile(os.path.join(root, version, 'fallback_model.joblib')))
+            loaded = AnomalyDetector()
+            self.assertTrue(loaded.load_models(registry))
+            self.assertIn(GLOBAL_KEY, loaded.models)
+            loaded.score(django_rows(self.generator.generate_columns(200)))
+            self.assertEqual(loaded.coverage_stats()['fallback_rows'], {'django-api/on-prem': 200})
+
+    def test_refresh_fits_a_model_for_a_new_key(self):
+        refresher = ModelRefresher(self.detector, window_size=1000, min_rows=500)
+        batch = django_rows(self.generator.generate_columns(600, anomaly_ratio=0))
+        refresher.observe(batch, self.detector.build_features(batch, stateful=False))
+        self.assertEqual(refresher.refresh(), [DJANGO_KEY])
+        self.assertIn(DJANGO_KEY, self.detector.models)
+        self.assertIn(DJANGO_KEY, self.detector.traffic_baselines)
+        self.detector.score(django_rows(self.generator.generate_columns(100)))
+        self.assertEqual(self.detector.coverage_stats()['fallback_rows'], {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import logging
+import threading
+import time
+import unittest
+from ai_analyzer import AIAnalyzer, StubResponse, fallback_alert
+from async_analyzer import AsyncAIAnalyzer
+
+
+class BlockingModel:
+    """A model with only the blocking call, recording how many run at once"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.running = 0
+        self.most_running = 0
+        self.lock = threading.Lock()
+
+    def generate_content(self, prompt):
+        with self.lock:
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+        time.sleep(self.latency)
+        with self.lock:
+            self.running -= 1
+        return StubResponse("ALERT: slow reply")
+
+
+def anomalies(n):
+    return [{'service': f"svc-{i}", 'environment': 'prod', 'endpoint': '/api/v1/users', 'status_code': 500,
+             'response_time': 3000 + i, 'anomaly_type': 'server_error'} for i in range(n)]
+
+
+class AsyncAIAnalyzerTest(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+
+    def test_timed_out_calls_keep_their_thread(self):
+        model = BlockingModel(latency=0.3)
+        alerter = AsyncAIAnalyzer(AIAnalyzer(model=model), concurrency=2, timeout=0.05)
+        self.addCleanup(alerter.close)
+        batch = anomalies(6)
+        self.assertEqual(alerter.generate_alerts(batch, batched=False), [fallback_alert(a) for a in batch])
+        self.assertEqual(alerter.stats['timeouts'], 6)
+        # Later rounds find both threads still busy with the first two calls
+        alerter.generate_alerts(anomalies(4), batched=False)
+        time.sleep(0.5)
+        self.assertEqual(model.most_running, 2)
+        self.assertEqual(model.running, 0)
+
+    def test_blocking_model_reply(self):
+        alerter = AsyncAIAnalyzer(AIAnalyzer(model=BlockingModel(latency=0)), concurrency=2, timeout=5)
+        self.addCleanup(alerter.close)
+        self.assertEqual(alerter.generate_alerts(anomalies(3), batched=False), ["ALERT: slow reply"] * 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import json
+import unittest
+from http_ingestion import HttpIngestor
+from log_ingestion import validate_record
+
+RECORD = {
+    "timestamp": "2026-10-18T10:00:00",
+    "service": "auth",
+    "environment": "prod",
+    "endpoint": "/login",
+    "user_id": "u1",
+    "response_time": 12.5,
+    "status_code": 200,
+}
+
+
+class ValidateRecordTest(unittest.TestCase):
+    def test_valid_record_gets_defaults(self):
+        log, error = validate_record(RECORD)
+        self.assertIsNone(error)
+        self.assertEqual(log["response_time"], 12.5)
+        self.assertEqual((log["request_size"], log["response_size"], log["language"]), (0, 0, "unknown"))
+
+    def test_int_response_time_becomes_float(self):
+        log, _ = validate_record({**RECORD, "response_time": 12})
+        self.assertIsInstance(log["response_time"], float)
+
+    def test_missing_and_mistyped_fields(self):
+        cases = [
+            ([], "record must be a JSON object"),
+            ({**RECORD, "service": ""}, "missing service"),
+            ({k: v for k, v in RECORD.items() if k != "endpoint"}, "missing endpoint"),
+            ({**RECORD, "status_code": "200"}, "status_code must be int"),
+            ({**RECORD, "status_code": True}, "status_code must be int"),
+            ({**RECORD, "response_time": float("nan")}, "response_time must be float"),
+            ({**RECORD, "user_id": 7}, "user_id must be str"),
+        ]
+        for record, reason in cases:
+            self.assertEqual(validate_record(record), (None, reason))
+
+    def test_out_of_range_values(self):
+        self.assertEqual(validate_record({**RECORD, "status_code": 42})[1], "status_code must be between 100 and 599")
+        self.assertIsNotNone(validate_record({**RECORD, "response_time": -1})[1])
+        self.assertIsNotNone(validate_record({**RECORD, "request_size": -1})[1])
+
+    def test_number_too_large_for_float_is_rejected(self):
+        self.assertEqual(validate_record({**RECORD, "response_time": 10 ** 400}),
+                         (None, "response_time must be float"))
+
+    def test_timestamps(self):
+        self.assertEqual(validate_record({**RECORD, "timestamp": "yesterday"})[1], "timestamp must be ISO 8601")
+        for timestamp, expected in (("2026-10-18T10:00:01Z", "2026-10-18T10:00:01"),
+                                    ("2026-10-18T15:30:02+05:00", "2026-10-18T10:30:02"),
+                                    ("2026-10-18T10:00:03", "2026-10-18T10:00:03")):
+            self.assertEqual(validate_record({**RECORD, "timestamp": timestamp})[0]["timestamp"], expected)
+
+
+
+def ndjson(*records):
+    return "\n".join(record if isinstance(record, str) else json.dumps(record) for record in records).encode()
+
+
+class HttpIngestorAcceptTest(unittest.TestCase):
+    def test_partial_accept_and_errors(self):
+        ingestor = HttpIngestor(port=0, batch_size=10, batch_seconds=0.05, queue_size=2)
+        status, body = ingestor.accept(ndjson(RECORD, "not json", {**RECORD, "status_code": 42}, ""))
+        self.assertEqual(status, 202)
+        self.assertEqual((body["accepted"], body["rejected"]), (1, 2))
+        self.assertEqual([error["line"] for error in body["errors"]], [2, 3])
+        self.assertEqual(ingestor.accept(ndjson("[]"))[0], 400)
+
+    def test_full_queue_is_429(self):
+        ingestor = HttpIngestor(port=0, batch_size=10, batch_seconds=0.05, queue_size=1)
+        self.assertEqual(ingestor.accept(ndjson(RECORD))[0], 202)
+        self.assertEqual(ingestor.accept(ndjson(RECORD))[0], 429)
+        self.assertEqual(ingestor.metrics()["throttled"], 1)
+
+    def test_poll_splits_micro_batches(self):
+        ingestor = HttpIngestor(port=0, batch_size=3, batch_seconds=0.05, queue_size=4)
+        ingestor.accept(ndjson(*[RECORD] * 2))
+        ingestor.accept(ndjson(*[RECORD] * 2))
+        self.assertEqual([len(ingestor.poll()) for _ in range(3)], [3, 1, 0])
+        self.assertEqual(ingestor.metrics()["buffered_records"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
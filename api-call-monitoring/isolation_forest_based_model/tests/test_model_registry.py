@@ -0,0 +1,52 @@
+import logging
+import tempfile
+import unittest
+from unittest import mock
+import joblib
+from model_registry import LazyModelStore
+
+
+class LazyModelStoreTest(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.ERROR)
+        self.addCleanup(logging.disable, logging.NOTSET)
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.root.cleanup)
+        self.path = f"{self.root.name}/model.joblib"
+        joblib.dump({'model': 1}, self.path)
+        self.store = LazyModelStore({('auth', 'prod'): self.path})
+
+    def test_loads_once_on_first_use(self):
+        self.assertEqual(self.store.loaded_count, 0)
+        self.assertEqual(self.store[('auth', 'prod')], {'model': 1})
+        self.assertIs(self.store[('auth', 'prod')], self.store[('auth', 'prod')])
+        self.assertEqual(self.store.loaded_count, 1)
+
+    def test_os_error_is_retried(self):
+        too_many = OSError(24, 'Too many open files')
+        with mock.patch('model_registry.joblib.load', side_effect=too_many):
+            with self.assertRaises(KeyError):
+                self.store[('auth', 'prod')]
+        self.assertIn(('auth', 'prod'), self.store)
+        self.assertIsNone(self.store.get(('auth', 'unknown')))
+        self.assertEqual(self.store[('auth', 'prod')], {'model': 1})
+
+    def test_broken_file_is_dropped(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'not a joblib file')
+        with self.assertRaises(KeyError):
+            self.store[('auth', 'prod')]
+        self.assertNotIn(('auth', 'prod'), self.store)
+        self.assertEqual(len(self.store), 0)
+
+    def test_assignment_replaces_and_delete_forgets(self):
+        self.store[('auth', 'prod')] = 'refreshed'
+        self.assertEqual(self.store[('auth', 'prod')], 'refreshed')
+        del self.store[('auth', 'prod')]
+        self.assertNotIn(('auth', 'prod'), self.store)
+        with self.assertRaises(KeyError):
+            del self.store[('auth', 'prod')]
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import logging
+import tempfile
+import unittest
+from unittest import mock
+from anomaly_detector import AnomalyDetector
+from batch_scorer import columns_to_records
+from log_generator import APILogGenerator
+from model_registry import ModelRegistry
+from sharded_detection import ShardedDetector, shard_of, split_batch
+
+
+class ShardingTest(unittest.TestCase):
+    def test_shard_of_is_stable(self):
+        self.assertEqual(shard_of(('auth', 'prod'), 4), shard_of(('auth', 'prod'), 4))
+        self.assertTrue(all(0 <= shard_of((f"svc-{i}", 'prod'), 3) < 3 for i in range(50)))
+
+    def test_split_batch_keeps_rows_in_order(self):
+        columns = APILogGenerator(seed=1).generate_columns(500)
+        parts = split_batch(columns, 3)
+        rows = sorted(i for idx in parts.values() for i in idx.tolist())
+        self.assertEqual(rows, list(range(500)))
+        for shard, idx in parts.items():
+            self.assertTrue((idx[1:] > idx[:-1]).all())
+            keys = set(zip(columns['service'][idx], columns['environment'][idx]))
+            self.assertTrue(all(shard_of(key, 3) == shard for key in keys))
+
+
+class ShardedDetectorTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        logging.disable(logging.ERROR)
+        cls.root = tempfile.TemporaryDirectory()
+        cls.registry = ModelRegistry(cls.root.name)
+        generator = APILogGenerator(seed=3)
+        detector = AnomalyDetector()
+        detector.train_models(generator.generate_columns(10000, anomaly_ratio=0))
+        detector.save_models(cls.registry)
+        cls.batches = [columns_to_records(generator.generate_columns(1000, anomaly_ratio=0.05)) for _ in range(4)]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.root.cleanup()
+        logging.disable(logging.NOTSET)
+
+    def test_stop_before_start_and_twice(self):
+        sharded = ShardedDetector(2, self.registry)
+        sharded.stop()
+        sharded.start()
+        sharded.stop()
+        sharded.stop()
+        self.assertEqual(sharded.metrics()['alive'], 0)
+
+    def test_submit_ahead_and_collect(self):
+        # Workers keep per-key state between batches, so each run gets fresh workers
+        with ShardedDetector(2, self.registry) as sharded:
+            expected = [sharded.detect(batch) for batch in self.batches]
+        with mock.patch('config.Config.SHARD_MAX_INFLIGHT', 2), ShardedDetector(2, self.registry) as sharded:
+            ids = [sharded.submit(batch, tag=n) for n, batch in enumerate(self.batches)]
+            self.assertEqual(ids, list(range(len(self.batches))))
+            done = []
+            while len(done) < len(self.batches):
+                done.extend(sharded.collect(timeout=1))
+        self.assertEqual([tag for tag, _ in done], list(range(len(self.batches))))
+        self.assertEqual([anomalies for _, anomalies in done], expected)
+
+    def test_missing_version_is_an_error(self):
+        with tempfile.TemporaryDirectory() as root:
+            with self.assertRaises(ValueError):
+                ShardedDetector(2, ModelRegistry(root))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+import numpy as np
+from config import Config
+from traffic_monitor import (
+    BUCKET_SECONDS, HOURS_PER_WEEK, SeasonalBaseline, StreamingSpikeDetector, TrafficCounter, hour_of_week
+)
+
+MONDAY = 4 * 86400  # 1970-01-05 00:00, a Monday
+
+
+class HourOfWeekTest(unittest.TestCase):
+    def test_monday_midnight_is_slot_zero(self):
+        self.assertEqual(hour_of_week(np.int64(MONDAY)), 0)
+        self.assertEqual(hour_of_week(np.int64(MONDAY + 3600 * 25)), 25)
+        self.assertEqual(hour_of_week(np.int64(MONDAY - 3600)), HOURS_PER_WEEK - 1)
+
+
+class SeasonalBaselineTest(unittest.TestCase):
+    def test_flat_fallback_with_floors(self):
+        baseline = SeasonalBaseline({'mean': 0.03, 'std': 0.01})
+        self.assertEqual(baseline.expected(0, min_samples=12), (0.03, 1.0))
+        self.assertEqual(SeasonalBaseline({'mean': 100.0, 'std': 2.0}).expected(0, 12), (100.0, 10.0))
+        self.assertEqual(SeasonalBaseline({'mean': float('nan')}).expected(0, 12), (0.0, 1.0))
+
+    def test_welford_updates_replace_fallback(self):
+        baseline = SeasonalBaseline({'mean': 5.0, 'std': 1.0})
+        for value in [40, 60] * 6:
+            baseline.update(3, value)
+        mean, std = baseline.expected(3, min_samples=12)
+        self.assertAlmostEqual(mean, 50.0)
+        self.assertAlmostEqual(std, np.std([40, 60] * 6, ddof=1))
+
+    def test_same_hour_pooled_across_weekdays(self):
+        baseline = SeasonalBaseline()
+        for day in range(7):
+            for _ in range(2):
+                baseline.update(day * 24 + 9, 30)
+        mean, _ = baseline.expected(9, min_samples=12)
+        self.assertAlmostEqual(mean, 30.0)
+        self.assertEqual(baseline.expected(10, min_samples=12), (0.0, 1.0))
+
+    def test_fit_seeds_slots_from_history(self):
+        rng = np.random.default_rng(0)
+        epochs = np.sort(MONDAY + rng.integers(0, 14 * 86400, 14 * 24 * 120))
+        baseline = SeasonalBaseline()
+        baseline.fit(epochs)
+        self.assertTrue((baseline.count[1:-1] > 0).all())
+        mean, _ = baseline.expected(50, min_samples=12)
+        self.assertAlmostEqual(mean, 10.0, delta=3.0)  # 120 events an hour, 12 buckets
+
+
+class TrafficCounterTest(unittest.TestCase):
+    def test_counts_and_closes_buckets(self):
+        baseline = SeasonalBaseline()
+        counter = TrafficCounter(4, baseline)
+        start = MONDAY // BUCKET_SECONDS
+        self.assertTrue(counter.add(start, 5))
+        self.assertTrue(counter.add(start, 2))
+        self.assertEqual(counter.count(start), 7)
+        self.assertTrue(counter.add(start + 2))
+        # The closed bucket and the skipped empty one went into the baseline
+        self.assertEqual(baseline.count[0], 2)
+        self.assertAlmostEqual(baseline.mean[0], 3.5)
+
+    def test_ring_reuse_and_late_events(self):
+        counter = TrafficCounter(4, SeasonalBaseline())
+        start = MONDAY // BUCKET_SECONDS
+        counter.add(start, 9)
+        counter.add(start + 4)  # reuses the slot of start
+        self.assertEqual(counter.count(start + 4), 1)
+        self.assertFalse(counter.add(start, 1))
+        self.assertTrue(counter.add(start + 1, 1))
+
+
+class StreamingSpikeDetectorTest(unittest.TestCase):
+    def columns(self, offsets):
+        timestamps = (np.datetime64(MONDAY, 's') + np.asarray(offsets, dtype='timedelta64[s]')).astype(str)
+        n = len(timestamps)
+        return {'timestamp': timestamps, 'service': np.full(n, 'svc'), 'environment': np.full(n, 'prod')}
+
+    def test_small_counts_on_an_empty_baseline_are_not_spikes(self):
+        detector = StreamingSpikeDetector({('svc', 'prod'): {'mean': 0.03, 'std': 0.1}})
+        self.assertEqual(detector.observe(self.columns([1, 2, 3, 4])), [])
+
+    def test_spike_reported_once_per_bucket(self):
+        detector = StreamingSpikeDetector({('svc', 'prod'): {'mean': 10.0, 'std': 3.0}})
+        excess = Config.TRAFFIC_SPIKE_MIN_EXCESS
+        spikes = detector.observe(self.columns(np.arange(excess + 20) % BUCKET_SECONDS))
+        self.assertEqual(len(spikes), 1)
+        self.assertEqual((spikes[0]['request_count'], spikes[0]['expected_count']), (excess + 20, 10.0))
+        self.assertEqual(detector.observe(self.columns([5, 6])), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,202 @@
+import logging
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.seasonal import STL
+from config import Config
+from batch_scorer import iter_partitions
+
+BUCKET_SECONDS = 300
+BUCKETS_PER_HOUR = 3600 // BUCKET_SECONDS
+HOURS_PER_WEEK = 7 * 24
+
+
+def to_epoch_seconds(timestamps):
+    return pd.to_datetime(timestamps, format='ISO8601').to_numpy(dtype='datetime64[s]').astype(np.int64)
+
+
+def hour_of_week(epoch_seconds):
+    """Monday 00:00 is slot 0; 1970-01-01 was a Thursday"""
+    hours = epoch_seconds // 3600
+    return ((hours // 24 + 3) % 7) * 24 + hours % 24
+
+
+class SeasonalBaseline:
+    """Expected 5-minute request count and spread for every hour of the week.
+
+    Seeded from history with an STL decomposition of hourly counts
+    (daily period) and kept current with Welford updates as live buckets
+    close. Slots without enough samples fall back to the same hour of the
+    day pooled over the week, then to the flat baseline.
+    """
+
+    def __init__(self, flat=None):
+        flat = flat or {}
+        self.flat_mean = float(np.nan_to_num(flat.get('mean') or 0.0))
+        self.flat_std = float(np.nan_to_num(flat.get('std') or 0.0))
+        self.count = np.zeros(HOURS_PER_WEEK, dtype=np.int64)
+        self.mean = np.zeros(HOURS_PER_WEEK)
+        self.m2 = np.zeros(HOURS_PER_WEEK)
+
+    def fit(self, epoch_seconds):
+        """Seed the slots from historical event times"""
+        hours = pd.Series(1, index=pd.to_datetime(epoch_seconds, unit='s')).resample('1h').size()
+        if len(hours) > 2:
+            hours = hours.iloc[1:-1]  # the first and last hours are usually partial
+        if len(hours) >= 2 * 24:
+            stl = STL(hours.to_numpy(dtype=np.float64), period=24, robust=True).fit()
+            expected = np.clip(stl.trend + stl.seasonal, 0, None) / BUCKETS_PER_HOUR
+            resid = stl.resid / BUCKETS_PER_HOUR
+        else:
+            expected = hours.to_numpy(dtype=np.float64) / BUCKETS_PER_HOUR
+            resid = np.zeros(len(hours))
+
+        slots = hour_of_week(hours.index.to_numpy(dtype='datetime64[s]').astype(np.int64))
+        for slot in np.unique(slots):
+            mask = slots == slot
+            n = int(mask.sum()) * BUCKETS_PER_HOUR
+            self.count[slot] = n
+            self.mean[slot] = expected[mask].mean()
+            # Residual spread of the hourly fit plus Poisson noise within the hour
+            self.m2[slot] = (np.mean(resid[mask] ** 2) + self.mean[slot]) * (n - 1)
+
+    def update(self, slot, value):
+        self.count[slot] += 1
+        delta = value - self.mean[slot]
+        self.mean[slot] += delta / self.count[slot]
+        self.m2[slot] += delta * (value - self.mean[slot])
+
+    def _pooled(self, slot):
+        """Count, mean and M2 of the same hour of the day across all weekdays"""
+        slots = np.arange(slot % 24, HOURS_PER_WEEK, 24)
+        count = self.count[slots]
+        n = count.sum()
+        if n == 0:
+            return 0, 0.0, 0.0
+        mean = (count * self.mean[slots]).sum() / n
+        return n, mean, (self.m2[slots] + count * (self.mean[slots] - mean) ** 2).sum()
+
+    def expected(self, slot, min_samples):
+        if self.count[slot] >= min_samples:
+            mean = self.mean[slot]
+            std = np.sqrt(self.m2[slot] / (self.count[slot] - 1))
+        else:
+            n, mean, m2 = self._pooled(slot)
+            if n >= min_samples:
+                std = np.sqrt(m2 / (n - 1))
+            else:
+                mean, std = self.flat_mean, self.flat_std
+        # Counts are Poisson-like: never trust a spread tighter than sqrt(mean), or below 1
+        return mean, max(std, np.sqrt(mean), 1.0)
+
+
+class TrafficCounter:
+    """Ring buffer of 5-minute request counts for one (service, environment)"""
+
+    def __init__(self, capacity, baseline):
+        self.counts = np.zeros(capacity, dtype=np.int64)
+        self.capacity = capacity
+        self.current = None
+        self.flagged = None  # bucket already reported as a spike
+        self.baseline = baseline
+
+    def add(self, bucket, n=1):
+        """Count n events in a bucket; returns False for events older than the ring"""
+        if self.current is None:
+            self.current = bucket
+        elif bucket > self.current:
+            # Close the bucket we move past, plus any empty ones skipped over,
+            # into the seasonal stats, then clear the slots being reused
+            self.baseline.update(hour_of_week(self.current * BUCKET_SECONDS), self.count(self.current))
+            for skipped in range(max(self.current + 1, bucket - self.capacity), bucket):
+                self.baseline.update(hour_of_week(skipped * BUCKET_SECONDS), 0)
+            for reused in range(max(self.current + 1, bucket - self.capacity + 1), bucket + 1):
+                self.counts[reused % self.capacity] = 0
+            self.current = bucket
+        elif bucket <= self.current - self.capacity:
+            return False
+        self.counts[bucket % self.capacity] += n
+        return True
+
+    def count(self, bucket):
+        return int(self.counts[bucket % self.capacity])
+
+
+class StreamingSpikeDetector:
+    """Online traffic spike detection per (service, environment).
+
+    Each event costs one counter increment. A bucket is compared with the
+    seasonal expectation of its hour of the week as soon as its count
+    changes, so a spike is reported while the bucket is still open rather
+    than after a resample of the finished window. A spike needs both a
+    z-score over TRAFFIC_SPIKE_Z and TRAFFIC_SPIKE_MIN_EXCESS requests
+    above the expected count.
+    """
+
+    def __init__(self, flat_baselines=None):
+        self.config = Config()
+        self.flat_baselines = flat_baselines if flat_baselines is not None else {}
+        self.baselines = {}
+        self.counters = {}
+        self.logger = logging.getLogger(__name__)
+
+    def _counter(self, key):
+        counter = self.counters.get(key)
+        if counter is None:
+            baseline = self.baselines.get(key)
+            if baseline is None:
+                baseline = self.baselines[key] = SeasonalBaseline(self.flat_baselines.get(key))
+            counter = self.counters[key] = TrafficCounter(self.config.TRAFFIC_RING_BUCKETS, baseline)
+        return counter
+
+    def fit(self, columns):
+        """Seed seasonal baselines from historical logs"""
+        epochs = to_epoch_seconds(columns['timestamp'])
+        for key, idx in iter_partitions(columns):
+            self.fit_key(key, epochs[idx])
+
+    def fit_key(self, key, epoch_seconds):
+        """Seed one (service, environment) from its historical event times"""
+        baseline = SeasonalBaseline(self.flat_baselines.get(key))
+        baseline.fit(epoch_seconds)
+        self.baselines[key] = baseline
+        self.counters.pop(key, None)
+
+    def observe(self, columns):
+        """Count a batch of events; returns spikes for buckets that just crossed the threshold"""
+        if not columns or len(columns['timestamp']) == 0:
+            return []
+        buckets = to_epoch_seconds(columns['timestamp']) // BUCKET_SECONDS
+        spikes = []
+        for key, idx in iter_partitions(columns):
+            counter = self._counter(key)
+            # One increment per distinct bucket, in time order
+            part_buckets, counts = np.unique(buckets[idx], return_counts=True)
+            for bucket, n in zip(part_buckets.tolist(), counts.tolist()):
+                if not counter.add(bucket, n):
+                    continue
+                spike = self._check(key, counter, bucket)
+                if spike is not None:
+                    spikes.append(spike)
+        return spikes
+
+    def _check(self, key, counter, bucket):
+        if counter.flagged == bucket:
+            return None
+        count = counter.count(bucket)
+        mean, std = counter.baseline.expected(
+            hour_of_week(bucket * BUCKET_SECONDS), self.config.SEASONAL_MIN_SAMPLES
+        )
+        z_score = (count - mean) / std
+        if z_score <= self.config.TRAFFIC_SPIKE_Z or count - mean < self.config.TRAFFIC_SPIKE_MIN_EXCESS:
+            return None
+        counter.flagged = bucket
+        return {
+            'timestamp': pd.Timestamp(bucket * BUCKET_SECONDS, unit='s').isoformat(),
+            'service': key[0],
+            'environment': key[1],
+            'request_count': count,
+            'expected_count': round(float(mean), 3),
+            'z_score': float(z_score),
+            'bucket_open': bucket == counter.current,
+            'anomaly_type': 'traffic_spike'
+        }